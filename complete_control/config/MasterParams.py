@@ -2,7 +2,7 @@ import os
 from pathlib import Path
 from typing import ClassVar
 
-from pydantic import BaseModel, Field, computed_field
+from pydantic import BaseModel, Field, computed_field, model_validator
 
 from .bsb_models import BSBConfigCopies, BSBConfigPaths
 from .connection_params import ConnectionsParams
@@ -10,10 +10,13 @@ from .core_models import (
     BrainParams,
     ExperimentParams,
     MetaInfo,
+    PlantBackend,
     PlottingParams,
+    RecordingParams,
     SimulationParams,
+    WeightHistoryParams,
 )
-from .module_params import ModuleContainerConfig
+from .module_params import ModuleContainerConfig, TrajGeneratorType
 from .paths import RunPaths
 from .population_params import PopulationsParams
 
@@ -29,6 +32,7 @@ class MasterParams(BaseModel):
 
     USE_CEREBELLUM: bool = False
     GUI_PYBULLET: bool = False
+    PLANT_BACKEND: PlantBackend = PlantBackend.PYBULLET
     SAVE_WEIGHTS_CEREB: bool = True
 
     NJT: int = 1
@@ -37,6 +41,10 @@ class MasterParams(BaseModel):
     simulation: SimulationParams = Field(default_factory=lambda: SimulationParams())
     experiment: ExperimentParams = Field(default_factory=lambda: ExperimentParams())
     brain: BrainParams = Field(default_factory=lambda: BrainParams())
+    recording: RecordingParams = Field(default_factory=lambda: RecordingParams())
+    weight_history: WeightHistoryParams = Field(
+        default_factory=lambda: WeightHistoryParams()
+    )
     bsb_config_paths: BSBConfigPaths = Field(default_factory=lambda: BSBConfigPaths())
 
     @computed_field
@@ -61,6 +69,41 @@ class MasterParams(BaseModel):
     populations: PopulationsParams = Field(default_factory=lambda: PopulationsParams())
     connections: ConnectionsParams = Field(default_factory=lambda: ConnectionsParams())
 
+    @model_validator(mode="after")
+    def check_cosim_window(self):
+        window_ms = self.simulation.cosim_window_steps * self.simulation.resolution
+        if self.simulation.cosim_window_steps < 1:
+            raise ValueError("simulation.cosim_window_steps must be at least 1")
+        # sensory and motor exchanges are delayed by up to K-1 steps, which is
+        # compensated on the spine connections; their delay can't go below 1 step
+        if window_ms > self.modules.spine.fbk_delay:
+            raise ValueError(
+                f"co-simulation window ({window_ms} ms) longer than "
+                f"spine fbk_delay ({self.modules.spine.fbk_delay} ms)"
+            )
+        return self
+
+    @model_validator(mode="after")
+    def check_plant_backend(self):
+        # the GLE planner reads the input image, which only PyBullet renders
+        if (
+            self.PLANT_BACKEND == PlantBackend.NUMPY
+            and self.modules.planner.trajgen_type != TrajGeneratorType.MOCKED
+        ):
+            raise ValueError(
+                f"PLANT_BACKEND={PlantBackend.NUMPY.value} requires the "
+                f"{TrajGeneratorType.MOCKED.value} planner"
+            )
+        return self
+
+    @property
+    def spine_io_delay(self) -> float:
+        """fbk_delay of the NRP proxy connections, minus the co-simulation lag."""
+        return (
+            self.modules.spine.fbk_delay
+            - (self.simulation.cosim_window_steps - 1) * self.simulation.resolution
+        )
+
     def save_to_json(self, filepath: Path, indent: int = 2) -> None:
         """Serializes the MasterConfig instance to a JSON file."""
         with open(filepath, "w") as f:
@@ -72,5 +115,5 @@ class MasterParams(BaseModel):
             run_paths=run_paths,
             run_id=run_paths.run.name,
             parent_id=parent_id,
-            **kwargs
+            **kwargs,
         )
@@ -1,12 +1,21 @@
+import sqlite3
 from pathlib import Path
 
+import structlog
 from config import paths
 from config.MasterParams import MasterParams
 from config.paths import RunPaths
-from neural.result_models import NeuralResultManifest
+from config.run_catalog import RunCatalog
+from neural.result_models import (
+    POP_CACHE_SIZE,
+    LazyNeuralResultManifest,
+    NeuralResultManifest,
+)
 from plant.plant_models import PlantPlotData
 from pydantic import BaseModel
 
+_log: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
+
 
 def extract_id(id: str):
     return id.partition("-")[0]
@@ -33,6 +42,12 @@ class ResultMeta(BaseModel):
         with open(self.neural, "r") as f:
             return NeuralResultManifest.model_validate_json(f.read())
 
+    def load_neural_lazy(
+        self, cache_size: int = POP_CACHE_SIZE
+    ) -> LazyNeuralResultManifest:
+        """Manifest metadata only; populations are decoded on `get_pop`."""
+        return LazyNeuralResultManifest(self.neural, cache_size)
+
     def load_robotic(self) -> PlantPlotData:
         with open(self.robotic, "r") as f:
             return PlantPlotData.model_validate_json(f.read())
@@ -42,19 +57,58 @@ class ResultMeta(BaseModel):
             return MasterParams.model_validate_json(f.read())
 
     def save(self, paths: RunPaths) -> None:
+        meta_json = self.model_dump_json(indent=2)
         with open(paths.meta_result, "w") as f:
-            f.write(self.model_dump_json(indent=2))
+            f.write(meta_json)
+        _add_to_catalog(meta_json)
 
     @classmethod
     def from_id(cls, id: str):
         id = extract_id(id)
+        try:
+            found = RunCatalog().find(id)
+        except sqlite3.Error as e:
+            _log.warning("Run catalog unavailable, searching RUNS_DIR", error=str(e))
+            found = []
+        if len(found) == 1:
+            return ResultMeta.model_validate_json(found[0])
+
+        # not indexed (yet): look it up on disk, and index it
         p = [i for i in paths.RUNS_DIR.glob(f"{id}*") if i.is_dir()]
         if len(p) != 1:
             raise ValueError(f"found {len(p)} result(s) for key='{id}'")
 
         rp = paths.RunPaths.from_run_id(p[0].name, create_if_not_present=False)
         with open(rp.meta_result, "r") as f:
-            return ResultMeta.model_validate_json(f.read())
+            meta_json = f.read()
+        _add_to_catalog(meta_json)
+        return ResultMeta.model_validate_json(meta_json)
+
+    @classmethod
+    def chain_from_id(cls, id: str) -> list["ResultMeta"]:
+        """`id` and its ancestors, newest first."""
+        head = cls.from_id(id)
+        try:
+            chain = [
+                ResultMeta.model_validate_json(m) for m in RunCatalog().chain(head.id)
+            ]
+        except sqlite3.Error as e:
+            _log.warning(
+                "Run catalog unavailable, resolving runs one by one", error=str(e)
+            )
+            chain = [head]
+        # runs missing from the catalog are resolved (and indexed) one by one
+        while chain[-1].parent:
+            chain.append(cls.from_id(chain[-1].parent))
+        return chain
 
     class Config:
         arbitrary_types_allowed = True
+
+
+def _add_to_catalog(meta_json: str) -> None:
+    # the catalog is an index only: a run is saved (and found) without it
+    try:
+        RunCatalog().add(meta_json)
+    except sqlite3.Error as e:
+        _log.warning("Could not add run to the catalog", error=str(e))
@@ -32,6 +32,13 @@ class RobotSpecParams(BaseModel, frozen=True):
     I: List[float] = [0.00189]
 
 
+class PlantBackend(str, Enum):
+    # arm URDF simulated in PyBullet
+    PYBULLET = "pybullet"
+    # analytic elbow dynamics in NumPy (plant.numpy_plant): no rendering
+    NUMPY = "numpy"
+
+
 class ExperimentParams(BaseModel, frozen=True):
     enable_gravity: bool = False
     z_gravity_magnitude: float = 2  # m/s^2
@@ -67,6 +74,9 @@ class SimulationParams(BaseModel, frozen=True):
     time_locked_with_feedback: float = 150.0  # ms - MUST BE KEPT SAME AS SENSORY_DELAY
     time_grasp: float = 100.0  # ms
     time_post: float = 100.0  # ms
+    # co-simulation window: resolution steps advanced by each engine per NRP
+    # exchange; K * resolution must not exceed the spine fbk_delay
+    cosim_window_steps: int = 1
 
     oracle: OracleData = Field(default_factory=lambda: OracleData())
 
@@ -101,6 +111,15 @@ class SimulationParams(BaseModel, frozen=True):
     def sim_steps(self) -> int:
         return int(self.duration_ms / self.resolution)
 
+    @property
+    def cosim_windows(self) -> int:
+        """Number of NRP exchanges per trial; the last window may be shorter."""
+        return -(-self.sim_steps // self.cosim_window_steps)
+
+    def window_steps(self, step: int) -> int:
+        """Length of the co-simulation window starting at `step`."""
+        return min(self.cosim_window_steps, self.sim_steps - step)
+
     @property
     def neural_control_steps(self) -> int:
         return int((self.time_prep + self.time_move) / self.resolution)
@@ -122,3 +141,61 @@ class PlottingParams(BaseModel, frozen=True):
     PLOT_AFTER_SIMULATE: bool = True
     CAPTURE_VIDEO: list[str] = []  # ["x", "y", "z"]
     NUM_STEPS_CAPTURE_VIDEO: int = 10
+
+
+class CollapseMode(str, Enum):
+    SERIAL = "serial"
+    # process pool on rank 0
+    PROCESSES = "processes"
+    # populations spread round-robin over MPI ranks
+    MPI = "mpi"
+
+
+class RecordingBackend(str, Enum):
+    # NEST writes text files, merged at the end of the run
+    ASCII = "ascii"
+    # NEST keeps events in memory, drained to binary files during the run
+    MEMORY = "memory"
+
+
+class RecordingPolicyMode(str, Enum):
+    OFF = "off"  # no recorder at all
+    SAMPLED = "sampled"  # recorder on a random subset of the population
+    SECTIONS = "sections"  # recorder active only during some trial sections
+    FULL = "full"
+
+
+class RecordingPolicy(BaseModel, frozen=True):
+    mode: RecordingPolicyMode = RecordingPolicyMode.FULL
+    n_sampled: int = 100  # SAMPLED: number of recorded neurons
+    sections: list[str] = []  # SECTIONS: TrialSection names, e.g. "TIME_MOVE"
+
+
+class RecordingParams(BaseModel, frozen=True):
+    backend: RecordingBackend = RecordingBackend.ASCII
+    drain_every_steps: int = 100  # only used by the MEMORY backend
+    # PROCESSES and MPI are opt-in: PROCESSES forks the (MPI, threaded NEST)
+    # neural engine process
+    collapse_mode: CollapseMode = CollapseMode.SERIAL
+    collapse_workers: int | None = None  # None: one per virtual process
+    # population label -> policy; populations not listed are fully recorded
+    populations: dict[str, RecordingPolicy] = {}
+    # widths (ms) of the spike counts saved at collapse, multiples of the
+    # smallest one; empty to skip them
+    rate_bin_widths_ms: list[float] = [1.0, 15.0, 100.0]
+
+    def policy(self, label: str) -> RecordingPolicy:
+        return self.populations.get(label, RecordingPolicy())
+
+
+class WeightHistoryParams(BaseModel, frozen=True):
+    enabled: bool = True
+    # step weight changes are rounded to; None stores them exactly
+    quantum: float | None = None
+    # every this many trials a full snapshot is stored instead of a delta
+    keyframe_every: int = 50
+    # remove the parent's weight checkpoints once they are in the history:
+    # read_weights exports them again when needed (rounded to `quantum`, if
+    # set). Opt-in, as it deletes data of another run; without it a chain
+    # stores every checkpoint on top of the history
+    prune_parent_checkpoints: bool = False
@@ -52,7 +52,15 @@ class SimulationConfig(BaseModel):
 
     @classmethod
     def from_masterparams(cls, mp: MasterParams, **kwargs):
+        engine_timestep = (
+            mp.simulation.cosim_window_steps * mp.simulation.resolution / 1000
+        )
+        engines = [
+            e.model_copy(update={"EngineTimestep": engine_timestep})
+            for e in cls.model_fields["EngineConfigs"].default
+        ]
         return SimulationConfig(
-            SimulationTimeout=mp.simulation.duration_ms / 1000,
+            SimulationTimeout=mp.simulation.cosim_windows * engine_timestep,
+            EngineConfigs=engines,
             **kwargs,
         )
@@ -0,0 +1,192 @@
+"""
+SQLite catalog of the runs in RUNS_DIR, kept up to date by ResultMeta.save.
+
+Indexes, for every run: id, parent, label, run directory, save time and a few
+config fields, next to the ResultMeta itself. ID resolution, chain
+reconstruction and "latest run" queries are then single indexed queries
+instead of directory listings and one JSON read per run. The final error is
+only read from the plant data, once, when first asked for.
+
+Rows of run directories that no longer exist are dropped when a query meets
+them.
+
+Runs saved before the catalog existed are added the first time they are
+resolved, or all at once with `python -m config.run_catalog --rebuild`.
+"""
+
+import argparse
+import datetime
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from config import paths
+
+CATALOG_FILE = "runs.sqlite"
+# above any character of a run id, to turn id prefixes into index ranges
+_PREFIX_END = "\U0010ffff"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    label TEXT NOT NULL,
+    run_dir TEXT NOT NULL,
+    saved_at TEXT NOT NULL,
+    use_cerebellum INTEGER,
+    njt INTEGER,
+    duration_ms REAL,
+    init_joint_angle REAL,
+    tgt_joint_angle REAL,
+    seed INTEGER,
+    final_error REAL,
+    meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_parent ON runs (parent);
+"""
+
+
+class RunCatalog:
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path or paths.RUNS_DIR / CATALOG_FILE)
+
+    def _connect(self) -> sqlite3.Connection:
+        # concurrent trials may save at the same time: wait for the lock
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def add(self, meta_json: str):
+        """
+        Indexes (or re-indexes) the run described by the ResultMeta JSON
+        `meta_json`, in a single transaction.
+        """
+        meta = json.loads(meta_json)
+        params = _read_json(meta["params"]) or {}
+        simulation = params.get("simulation", {})
+        oracle = simulation.get("oracle", {})
+        row = {
+            "id": meta["id"],
+            "parent": meta["parent"],
+            "label": meta["id"].partition("-")[2],
+            "run_dir": str(Path(meta["params"]).parent),
+            "saved_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "use_cerebellum": params.get("USE_CEREBELLUM"),
+            "njt": params.get("NJT"),
+            "duration_ms": simulation.get("duration_ms"),
+            "init_joint_angle": oracle.get("init_joint_angle"),
+            "tgt_joint_angle": oracle.get("tgt_joint_angle"),
+            "seed": simulation.get("seed"),
+            # filled in by final_error: the plant data is large to parse
+            "final_error": None,
+            "meta": meta_json,
+        }
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(row)}) "
+                f"VALUES ({', '.join(':' + k for k in row)})",
+                row,
+            )
+
+    def find(self, id_prefix: str) -> list[str]:
+        """ResultMeta JSON of the runs whose id starts with `id_prefix`."""
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT id, run_dir, meta FROM runs WHERE id >= ? AND id < ?",
+                (id_prefix, id_prefix + _PREFIX_END),
+            ).fetchall()
+            rows = _drop_missing(conn, rows)
+        return [r[2] for r in rows[:2]]
+
+    def chain(self, id: str) -> list[str]:
+        """
+        ResultMeta JSON of run `id` and all its ancestors, newest first.
+        Stops at the first ancestor missing from the catalog or from disk.
+        """
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                """
+                WITH RECURSIVE chain(id, parent, run_dir, meta, depth) AS (
+                    SELECT id, parent, run_dir, meta, 0 FROM runs WHERE id = ?
+                    UNION ALL
+                    SELECT r.id, r.parent, r.run_dir, r.meta, c.depth + 1
+                    FROM runs r JOIN chain c
+                    ON c.parent != '' AND r.id >= c.parent AND r.id < c.parent || ?
+                )
+                SELECT id, run_dir, meta FROM chain ORDER BY depth
+                """,
+                (id, _PREFIX_END),
+            ).fetchall()
+            existing = _drop_missing(conn, rows)
+        chain = []
+        for row, kept in zip(rows, existing + [None]):
+            if row != kept:
+                break
+            chain.append(row[2])
+        return chain
+
+    def latest(self) -> Path | None:
+        """Directory of the most recent run (ids are time-sortable)."""
+        with closing(self._connect()) as conn, conn:
+            for id, run_dir in conn.execute(
+                "SELECT id, run_dir FROM runs ORDER BY id DESC"
+            ).fetchall():
+                if Path(run_dir).is_dir():
+                    return Path(run_dir)
+                conn.execute("DELETE FROM runs WHERE id = ?", (id,))
+        return None
+
+    def final_error(self, id: str) -> float | None:
+        """Final elbow error of run `id`, read from its plant data the first time."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT final_error, meta FROM runs WHERE id = ?", (id,)
+            ).fetchone()
+            if row is None:
+                return None
+            error, meta = row
+            if error is None:
+                robotic = _read_json(json.loads(meta)["robotic"]) or {}
+                error = (robotic.get("error") or [None])[0]
+                conn.execute(
+                    "UPDATE runs SET final_error = ? WHERE id = ?", (error, id)
+                )
+        return error
+
+    def rebuild(self) -> int:
+        """Indexes every run of RUNS_DIR with a saved ResultMeta."""
+        n = 0
+        for run_dir in paths.RUNS_DIR.iterdir():
+            meta = run_dir / f"{run_dir.name.partition('-')[0]}.json"
+            if run_dir.is_dir() and meta.exists():
+                self.add(meta.read_text())
+                n += 1
+        return n
+
+
+def _drop_missing(conn: sqlite3.Connection, rows: list) -> list:
+    """Deletes the rows (id, run_dir, ...) whose run directory is gone."""
+    existing = []
+    for r in rows:
+        if Path(r[1]).is_dir():
+            existing.append(r)
+        else:
+            conn.execute("DELETE FROM runs WHERE id = ?", (r[0],))
+    return existing
+
+
+def _read_json(path) -> dict | None:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"indexed {RunCatalog().rebuild()} runs in {paths.RUNS_DIR}")
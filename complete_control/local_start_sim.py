@@ -0,0 +1,169 @@
+"""
+In-process co-simulation runner: NEST controller and plant stepped in
+lock-step in a single Python process, without NRP.
+
+Engines exchange the same data as the NRP engines (nrp_neural_engine,
+nrp_bullet_engine) with the same one-window lag: in every window each side
+consumes what the other produced in the previous one. The open-loop end of the
+trial is fast-forwarded by the plant, as in nrp_bullet_engine.
+
+`run_chain` runs several chained trials on a network built once (persistent
+multi-trial mode).
+"""
+
+import datetime
+import os
+import shutil
+from timeit import default_timer as timer
+
+import structlog
+from config.MasterParams import MasterParams
+from config.paths import RunPaths
+from config.plant_config import PlantConfig
+from config.ResultMeta import ResultMeta, extract_id
+from neural.nest_adapter import initialize_nest, nest
+from neural_simulation_lib import (
+    NeuralLoop,
+    create_controller,
+    setup_environment,
+    setup_nest_kernel,
+)
+from plant.plant_plotting import plot_plant_outputs
+from plant.plant_simulator import PlantSimulator
+from tqdm import tqdm
+from utils_common.draw_schema_svg import draw_schema
+from utils_common.results import make_trial_id
+from utils_common.utils import TrialChain, first_open_loop_step
+
+NANO_SEC = 1e-9
+
+
+def run_trial(parent_id: str = "", label: str = "") -> str:
+    return run_chain(1, parent_id, label)[-1]
+
+
+def run_chain(num_trials: int, parent_id: str = "", label: str = "") -> list[str]:
+    """
+    Runs `num_trials` chained trials, each one continuing from the previous.
+    The network is built once, for the whole chain: trials are run back to back
+    on it without resetting the NEST kernel, so plastic weights stay live in
+    NEST instead of being saved and loaded again. Each trial gets its own run
+    (plant, results, metadata) with the previous trial as parent.
+    """
+    log = structlog.get_logger("local_sim")
+    run_ids = []
+    controller = None
+
+    for trial in range(num_trials):
+        run_id = make_trial_id(label=label)
+        run_paths = RunPaths.from_run_id(run_id)
+        master_config = MasterParams.from_runpaths(
+            run_paths=run_paths, parent_id=parent_id
+        )
+        with open(run_paths.params_json, "w") as f:
+            f.write(master_config.model_dump_json(indent=2))
+
+        start_time = timer()
+
+        # plant first: it renders the input image the planner may wait for
+        plant_config = PlantConfig(master_config)
+        simulator = PlantSimulator(config=plant_config)
+
+        if controller is None:
+            initialize_nest()
+            nest.ResetKernel()
+            setup_environment(master_config)
+            setup_nest_kernel(master_config, run_paths.data_nest)
+            chain = TrialChain.from_params(master_config, num_trials)
+            controller = create_controller(master_config, chain=chain)
+            trajectory = run_paths.trajectory
+        else:
+            nest.SetKernelStatus({"data_path": str(run_paths.data_nest)})
+            controller.start_next_trial()
+            # the planner ran once, for the whole chain
+            shutil.copyfile(trajectory, run_paths.trajectory)
+        neural = NeuralLoop(controller, master_config)
+        nest.Prepare()
+        log.debug("Controller and plant initialized", trial=trial + 1)
+
+        joint_pos_rad = _run_cosim(master_config, neural, simulator)
+
+        neural.save_results()
+        nest.Cleanup()
+        simulator.finalize_and_process_data(joint_pos_rad)
+        simulator.plant.disconnect()
+
+        result = ResultMeta.create(master_config)
+        result.save(master_config.run_paths)
+
+        if master_config.plotting.PLOT_AFTER_SIMULATE:
+            log.info("--- Generating Plots (Standalone) ---")
+            plot_start_time = timer()
+            plot_plant_outputs([result])
+            draw_schema([result])
+            total_plot_time = datetime.timedelta(seconds=timer() - plot_start_time)
+            log.info(f"Plotting Finished. {total_plot_time.total_seconds():.1f} s")
+
+        total_time = datetime.timedelta(seconds=timer() - start_time)
+        log.info(
+            f"Simulation completed. Total execution time: {total_time.total_seconds():.1f} s"
+        )
+        run_ids.append(run_id)
+        parent_id = run_id
+
+    return run_ids
+
+
+def _run_cosim(
+    master_config: MasterParams, neural: NeuralLoop, simulator: PlantSimulator
+) -> list[float]:
+    """Runs one trial in lock-step; returns the last joint position."""
+    log = structlog.get_logger("local_sim")
+    sim = master_config.simulation
+    window = sim.cosim_window_steps
+    # initial datapacks of the NRP engines (the angle is in degrees there too)
+    joint_positions = [sim.oracle.init_joint_angle] * window
+    commands = [(0.0, 0.0)] * window
+    plant_time_s = 0
+    joint_pos_rad = None
+
+    open_loop_step = first_open_loop_step(master_config)
+
+    loop_start_time = timer()
+    step = 0
+    with tqdm(total=sim.sim_steps, desc="Simulation", unit="step", leave=False) as pbar:
+        while step < sim.sim_steps:
+            n_steps = sim.window_steps(step)
+            # same clock as NRP: integer nanoseconds
+            time_ns = round(step * sim.resolution * 1e6)
+            next_commands = neural.run_window(joint_positions, time_ns * NANO_SEC)
+            joint_positions, _, plant_time_s = simulator.run_simulation_window(
+                commands[:n_steps], plant_time_s, step
+            )
+            joint_pos_rad = joint_positions[-1]
+            window_start, step = step, step + n_steps
+            pbar.update(n_steps)
+
+            # same fast-forward as the bullet engine: once the plant consumed
+            # open-loop commands, the neural side has nothing left to do
+            if window_start - 1 >= open_loop_step and step < sim.sim_steps:
+                joint_pos_rad, _, plant_time_s = simulator.run_open_loop(
+                    commands[-1], plant_time_s, step
+                )
+                pbar.update(sim.sim_steps - step)
+                step = sim.sim_steps
+            commands = next_commands
+
+    total_loop_time = datetime.timedelta(seconds=timer() - loop_start_time)
+    log.debug(f"Simulation time: {total_loop_time.total_seconds():.1f} s")
+    return joint_pos_rad
+
+
+def main():
+    parent_id = extract_id(os.environ.get("PARENT_ID") or "")
+    run_id = run_trial(parent_id)
+    print(f"__SIMULATION_RUN_ID__:{run_id}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
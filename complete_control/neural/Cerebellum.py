@@ -10,7 +10,7 @@ from config.bsb_models import BSBConfigPaths
 from config.connection_params import ConnectionsParams
 from mpi4py import MPI
 from neural.nest_adapter import nest
-from neural.neural_models import SynapseBlock, SynapseRecording
+from neural.neural_models import iter_weight_shards
 from utils_common.profile import Profile
 
 from .CerebellumPopulations import CerebellumPopulations
@@ -151,18 +151,18 @@ class Cerebellum:
         pairs = self.populations.get_plastic_pairs()
         tot_syn = 0
         for pre_pop, post_pop in pairs:
+            # one SynapseCollection per plasticity type, to be read in bulk
             c = []
             for p in PLASTICITY_TYPES:
-                c.extend(
-                    nest.GetConnections(
-                        source=pre_pop.pop,
-                        target=post_pop.pop,
-                        synapse_model=p,
-                    )
-                    or []
+                syn = nest.GetConnections(
+                    source=pre_pop.pop,
+                    target=post_pop.pop,
+                    synapse_model=p,
                 )
+                if len(syn):
+                    c.append(syn)
+                    tot_syn += len(syn)
             conns[(pre_pop.label, post_pop.label)] = c
-            tot_syn += len(c)
 
         self.log.debug(
             f"total number of synapses (per process): {tot_syn}", log_all_ranks=True
@@ -177,49 +177,42 @@ class Cerebellum:
             return
         create_plastic = Profile()
 
-        num_conns_curr_proc = applied_weights = 0
+        applied_weights = 0
         add_kwargs = {}
         if self.comm:
             add_kwargs = {"local_only": True}
         with create_plastic.time():
-            loc_nodes = set(nest.GetNodes(**add_kwargs).get("global_id"))
-            curr_proc_recordings: defaultdict[str, list[SynapseRecording]] = (
-                defaultdict(list)
-            )
+            loc_nodes = np.asarray(nest.GetNodes(**add_kwargs).get("global_id"))
             self.log.debug(f"loading all connections, split by synapse model...")
-            # load all connections, split by synapse model
+            # load all connections, keep those targeting this process
+            curr_proc_recordings: defaultdict[str, list[np.ndarray]] = defaultdict(list)
             for path in weights:
-                with open(path, "r") as f:
-                    block = SynapseBlock.model_validate_json(f.read())
-                for conn in block.synapse_recordings:
-                    if conn.syn.target in loc_nodes:
-                        curr_proc_recordings[conn.syn.synapse_model].append(conn)
-                        num_conns_curr_proc += 1
+                for synapses, models in iter_weight_shards(path):
+                    synapses = synapses[np.isin(synapses["target"], loc_nodes)]
+                    for model_id, syn_model in enumerate(models):
+                        curr_proc_recordings[syn_model].append(
+                            synapses[synapses["model_id"] == model_id]
+                        )
             self.log.debug(f"{curr_proc_recordings.keys()}")
+            num_conns_curr_proc = sum(
+                len(s) for recs in curr_proc_recordings.values() for s in recs
+            )
 
             # iterate based on synapse model
-            for syn_model, connections in curr_proc_recordings.items():
-                rec_sources, rec_targets = (set(), set())
-                recordings: dict[tuple, SynapseRecording] = {}
-
-                # index connections based on key, save sources/targets
-                for conn in connections:
-                    rec_sources.add(conn.syn.source)
-                    rec_targets.add(conn.syn.target)
-                    recordings[
-                        (
-                            conn.syn.source,
-                            conn.syn.target,
-                            conn.syn.synapse_model,
-                            conn.syn.port,
-                        )
-                    ] = conn
+            for syn_model, recs in curr_proc_recordings.items():
+                recordings = np.concatenate(recs)
+                if len(recordings) == 0:
+                    continue
 
                 # collect nest SynapseCollection of this synapse model
                 conn_nest = nest.GetConnections(
                     # nest wants a sorted unique list
-                    source=nest.NodeCollection(sorted(rec_sources)),
-                    target=nest.NodeCollection(sorted(rec_targets)),
+                    source=nest.NodeCollection(
+                        np.unique(recordings["source"]).tolist()
+                    ),
+                    target=nest.NodeCollection(
+                        np.unique(recordings["target"]).tolist()
+                    ),
                     synapse_model=syn_model,
                 )
 
@@ -228,28 +221,42 @@ class Cerebellum:
                         f"collected inconsistent connections: {len(conn_nest)} collected vs {len(recordings)} recordings"
                     )
 
-                # sort weights according to collected nest connections
-                source = conn_nest.get("source")
-                target = conn_nest.get("target")
-                synapse_model = conn_nest.get("synapse_model")
-                port = conn_nest.get("port")
-                weights_sorted = []
-                for conn, source, target, model, port in zip(
-                    conn_nest,
-                    source,
-                    target,
-                    synapse_model,
-                    port,
-                ):
-                    weights_sorted.append(
-                        recordings.pop((source, target, model, port)).weight
-                    )
+                weights_sorted = self._join_weights(conn_nest, recordings)
 
                 # apply sorted weights according to the existing SynapseCollection
-                nest.SetStatus(conn_nest, [{"weight": w} for w in weights_sorted])
+                conn_nest.set(weight=weights_sorted)
                 applied_weights += len(weights_sorted)
         self.log.warning(f"applying all weights took: {create_plastic.total_time}")
         if applied_weights != num_conns_curr_proc:
             raise ValueError(
                 f"applied_weights != num_conns_curr_proc ({applied_weights} != {num_conns_curr_proc})"
             )
+
+    @staticmethod
+    def _join_weights(conn_nest, recordings: np.ndarray) -> np.ndarray:
+        """
+        Weights of `recordings` in the order of `conn_nest`, matching synapses
+        on (source, target, port).
+        """
+        status = conn_nest.get(["source", "target", "port"])
+        nest_keys = [np.atleast_1d(status[k]) for k in ("source", "target", "port")]
+        rec_keys = [recordings[k] for k in ("source", "target", "port")]
+
+        # lexsort: last key is the primary one
+        nest_order = np.lexsort(nest_keys[::-1])
+        rec_order = np.lexsort(rec_keys[::-1])
+        for nk, rk in zip(nest_keys, rec_keys):
+            if not np.array_equal(nk[nest_order], rk[rec_order]):
+                raise ValueError("recorded synapses do not match the NEST connections")
+        sorted_keys = [k[rec_order] for k in rec_keys]
+        if (
+            len(rec_order) > 1
+            and not np.any([k[1:] != k[:-1] for k in sorted_keys], axis=0).all()
+        ):
+            raise ValueError(
+                "recorded synapses are not unique in (source, target, port)"
+            )
+
+        weights = np.empty(len(recordings), dtype=np.float64)
+        weights[nest_order] = recordings["weight"][rec_order]
+        return weights
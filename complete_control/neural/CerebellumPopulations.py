@@ -1,6 +1,6 @@
 from typing import Generic, Optional, TypeVar
 
-from neural.neural_models import PopulationSpikes, convert_to_recording
+from neural.neural_models import StoredPopulationSpikes, convert_to_recording
 from pydantic import BaseModel
 
 from .population_view import PopView
@@ -59,7 +59,9 @@ class CerebellumPopulationsGeneric(BaseModel, Generic[T]):
         arbitrary_types_allowed = True
 
 
-class CerebellumPopulationsRecordings(CerebellumPopulationsGeneric[PopulationSpikes]):
+class CerebellumPopulationsRecordings(
+    CerebellumPopulationsGeneric[StoredPopulationSpikes]
+):
     pass
 
 
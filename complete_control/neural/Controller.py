@@ -18,11 +18,16 @@ from config.population_params import PopulationsParams
 from neural.CerebellumHandlerPopulations import CerebellumHandlerPopulations
 from neural.CerebellumPopulations import CerebellumPopulations
 from neural.nest_adapter import nest
-from neural.neural_models import Synapse, SynapseBlock, SynapseRecording
+from neural.neural_models import SynapseWeights
 from plant.sensoryneuron import SensoryNeuron
 from utils_common.generate_signals import generate_traj
 from utils_common.results import read_weights
-from utils_common.utils import TrialSection, get_current_section
+from utils_common.utils import (
+    OPEN_LOOP_SECTIONS,
+    TrialChain,
+    TrialSection,
+    get_current_section,
+)
 
 from .ControllerPopulations import ControllerPopulations
 from .motorcortex import MotorCortex
@@ -62,6 +67,17 @@ class PopulationBlocks:
     cerebellum_handler: CerebellumHandlerPopulations = None
     cerebellum: CerebellumPopulations = None
 
+    def views(self) -> list[PopView]:
+        """All PopViews of the blocks, in the order `to_recording` visits them."""
+        blocks = [self.controller, self.cerebellum_handler, self.cerebellum]
+        return [
+            v
+            for block in blocks
+            if block is not None
+            for v in block.__dict__.values()
+            if isinstance(v, PopView)
+        ]
+
 
 class Controller:
     """
@@ -87,6 +103,7 @@ class Controller:
         label_prefix: str = "",
         use_cerebellum: bool = False,
         cerebellum_paths: Optional[BSBConfigPaths] = None,
+        chain: Optional[TrialChain] = None,
     ):
         """
         Initializes the controller for one Degree of Freedom.
@@ -95,6 +112,7 @@ class Controller:
             ...
             use_cerebellum (bool): Flag to enable/disable cerebellum integration.
             cerebellum_paths: paths for Cerebellum build, required if use_cerebellum is True.
+            chain: trials the network is built for (default: a single trial).
         """
         self.log: structlog.stdlib.BoundLogger = structlog.get_logger(
             f"controller"
@@ -118,7 +136,17 @@ class Controller:
         self.cerebellum_paths = cerebellum_paths
         self.comm = comm
         self.label = f"{label_prefix}"
+        self.chain = chain or TrialChain.from_params(master_params)
+        # trial of the chain being run, and the NEST time at which it started
+        self.trial = 0
+        self.trial_offset_ms = 0.0
         self.connected_m1 = False
+        # planner -> m1 connections, and their weights while gated off
+        self._m1_conns = None
+        self._m1_weights = None
+        self._recorded_views: Optional[list[PopView]] = None
+        # section of the last step run through run_simulation_window
+        self._window_section: Optional[TrialSection] = None
 
         self.log.debug(
             "Controller Parameters",
@@ -163,60 +191,12 @@ class Controller:
 
         self.log.info("Controller initialization complete.")
 
-    def record_synaptic_weights(self) -> list[SynapseBlock]:
+    def record_synaptic_weights(self) -> list[SynapseWeights]:
         PF_to_purkinje_conns = self.cerebellum_handler.get_plastic_connections()
         blocks = []
         for (pre_pop, post_pop), conns in PF_to_purkinje_conns.items():
-            recs = []
             self.log.debug(f"saving {pre_pop}>{post_pop}...")
-            for conn in conns:
-                st = nest.GetStatus(
-                    conn,
-                    [
-                        "source",
-                        "target",
-                        "synapse_id",
-                        "delay",
-                        "synapse_model",
-                        "weight",
-                        "port",
-                        # "receptor", see https://github.com/near-nes/controller/issues/102#issuecomment-3558895210
-                    ],
-                )
-                if len(st) != 1:
-                    raise ValueError(
-                        f"Multiple ({len(st)}) statuses found for a single connection ({st})"
-                    )
-                (
-                    source_neur,
-                    target_neur,
-                    synapse_id,
-                    delay,
-                    synapse_model,
-                    weight,
-                    port,
-                    # receptor_type, see https://github.com/near-nes/controller/issues/102#issuecomment-3558895210
-                ) = st[0]
-                recs.append(
-                    SynapseRecording(
-                        syn=Synapse(
-                            source=source_neur,
-                            target=target_neur,
-                            syn_id=synapse_id,
-                            synapse_model=synapse_model,
-                            delay=delay,
-                            port=port,
-                        ),
-                        weight=weight,
-                    )
-                )
-            blocks.append(
-                SynapseBlock(
-                    source_pop_label=pre_pop,
-                    target_pop_label=post_pop,
-                    synapse_recordings=recs,
-                )
-            )
+            blocks.append(SynapseWeights.from_connections(pre_pop, post_pop, conns))
         return blocks
 
     def _instantiate_cerebellum_handler(self, controller_pops: ControllerPopulations):
@@ -293,7 +273,9 @@ class Controller:
             kp=p_params.kp,
             traj_len=len(trajectory),
             sim_steps=self.sim_params.sim_steps,
+            network_steps=self.chain.network_steps,
         )
+        trajectory = self.chain.tile(trajectory)
         tmp_pop_p = nest.Create(
             "tracking_neuron_nestml",
             n=N,
@@ -302,7 +284,7 @@ class Controller:
                 "base_rate": p_params.base_rate,
                 "pos": True,
                 "traj": trajectory.tolist(),
-                "simulation_steps": self.sim_params.sim_steps,
+                "simulation_steps": self.chain.network_steps,
             },
         )
         tmp_pop_n = nest.Create(
@@ -313,7 +295,7 @@ class Controller:
                 "base_rate": p_params.base_rate,
                 "pos": False,
                 "traj": trajectory.tolist(),
-                "simulation_steps": self.sim_params.sim_steps,
+                "simulation_steps": self.chain.network_steps,
             },
         )
         self.pops.planner_p = self._pop_view(tmp_pop_p)
@@ -333,6 +315,7 @@ class Controller:
             self.sim_params,
             self.conn_params.m1_delay,
             plan_params=self.plan_params,
+            chain=self.chain,
         )
         self.pops.mc_M1_p = self.mc.m1_out_p
         self.pops.mc_M1_n = self.mc.m1_out_n
@@ -349,7 +332,7 @@ class Controller:
             "kp": params.kp,
             "buffer_size": params.buffer_size,
             "base_rate": params.base_rate,
-            "simulation_steps": self.sim_params.sim_steps,
+            "simulation_steps": self.chain.network_steps,
         }
         self.log.debug("Creating state as basic adder", **pop_params)
 
@@ -381,7 +364,7 @@ class Controller:
             "kp": params.kp,
             "buffer_size": params.buffer_size,
             "base_rate": params.base_rate,
-            "simulation_steps": self.sim_params.sim_steps,
+            "simulation_steps": self.chain.network_steps,
         }
 
         pop_p = nest.Create("diff_neuron_nestml", self.N)
@@ -399,7 +382,7 @@ class Controller:
             "kp": params.kp,
             "buffer_size": params.buffer_size,
             "base_rate": params.base_rate,
-            "simulation_steps": self.sim_params.sim_steps,
+            "simulation_steps": self.chain.network_steps,
         }
         self.log.debug("Creating feedback neurons", **pop_params)
 
@@ -418,7 +401,7 @@ class Controller:
             "kp": params.kp,
             "buffer_size": params.buffer_size,
             "base_rate": params.base_rate,
-            "simulation_steps": self.sim_params.sim_steps,
+            "simulation_steps": self.chain.network_steps,
         }
         self.log.debug("Creating output neurons (brainstem)", **pop_params)
 
@@ -626,8 +609,11 @@ class Controller:
 
     def create_and_connect_NRP_interface(self):
         buffer_len = 10  # ms, right now, only in plant config
+        # shortened by the extra lag of the co-simulation window, so that the
+        # closed loop keeps the same delay for any window length
+        io_delay = self.master_params.spine_io_delay
         conn_spec = {
-            "delay": self.spine_params.fbk_delay,
+            "delay": io_delay,
             "weight": 1,
         }
         self.proxy_out = nest.Create("basic_neuron_nestml", 2)
@@ -637,7 +623,7 @@ class Controller:
                 "kp": 0,
                 "buffer_size": buffer_len,
                 "base_rate": 0,
-                "simulation_steps": self.sim_params.sim_steps,
+                "simulation_steps": self.chain.network_steps,
                 "pos": True,
             },
         )
@@ -648,6 +634,17 @@ class Controller:
         nest.Connect(
             self.pops.brainstem_n.pop, self.proxy_out[1], "all_to_all", conn_spec
         )
+        # windows longer than one step read the motor commands of every step
+        self.proxy_out_meter = None
+        if self.sim_params.cosim_window_steps > 1:
+            self.proxy_out_meter = nest.Create(
+                "multimeter",
+                params={
+                    "record_from": ["in_rate"],
+                    "interval": self.sim_params.resolution,
+                },
+            )
+            nest.Connect(self.proxy_out_meter, self.proxy_out)
 
         # positive
         self.proxy_in_p = SensoryNeuron(
@@ -677,19 +674,29 @@ class Controller:
         )
         conn_spec = {
             "weight": self.spine_params.wgt_sensNeur_spine,
-            "delay": self.spine_params.fbk_delay,
+            "delay": io_delay,
         }
         nest.Connect(self.proxy_in_gen[0], self.pops.sn_p.pop, "all_to_all", conn_spec)
         nest.Connect(self.proxy_in_gen[1], self.pops.sn_n.pop, "all_to_all", conn_spec)
 
     def update_sensory_info_from_NRP(self, angle: float, sim_time: float):
-        pos = self.proxy_in_p.lam(angle)
-        neg = self.proxy_in_n.lam(angle)
+        self.update_sensory_window_from_NRP([angle], sim_time)
+
+    def update_sensory_window_from_NRP(self, angles: list[float], sim_time: float):
+        """Sets the sensory input for len(angles) consecutive steps from `sim_time` (ms)."""
+        t0 = sim_time + self.trial_offset_ms
+        times = [t0 + i * self.sim_params.resolution for i in range(len(angles))]
         nest.SetStatus(
             self.proxy_in_gen,
             [
-                {"rate_times": [sim_time], "rate_values": [pos]},
-                {"rate_times": [sim_time], "rate_values": [neg]},
+                {
+                    "rate_times": times,
+                    "rate_values": [self.proxy_in_p.lam(a) for a in angles],
+                },
+                {
+                    "rate_times": times,
+                    "rate_values": [self.proxy_in_n.lam(a) for a in angles],
+                },
             ],
         )
 
@@ -700,6 +707,27 @@ class Controller:
 
         return rate_pos, rate_neg
 
+    def extract_motor_window_NRP(self, n_steps: int) -> list[tuple[float, float]]:
+        """
+        Motor commands at the end of each of the last `n_steps` steps, as
+        `extract_motor_command_NRP` would have returned them step by step.
+        """
+        if self.proxy_out_meter is None:
+            return [self.extract_motor_command_NRP()] * n_steps
+
+        events = self.proxy_out_meter.get("events")
+        nest.SetStatus(self.proxy_out_meter, {"n_events": 0})
+        senders = np.asarray(events["senders"])
+        order = np.argsort(events["times"], kind="stable")
+        rates = np.asarray(events["in_rate"])[order] / self.N
+        rates_pos = rates[senders[order] == self.proxy_out[0].global_id]
+        rates_neg = rates[senders[order] == self.proxy_out[1].global_id]
+
+        # steps that did not run NEST (e.g. TIME_GRASP) keep the last in_rate
+        last = self.extract_motor_command_NRP()
+        commands = list(zip(rates_pos.tolist(), rates_neg.tolist()))[-n_steps:]
+        return commands + [last] * (n_steps - len(commands))
+
     def collect_populations(self) -> PopulationBlocks:
         """
         Collects all PopView instances that are configured for recording from
@@ -718,29 +746,118 @@ class Controller:
 
         return pops
 
-    def run_simulation_step(self, timestep, sim_time_s):
-        curr_section = get_current_section(sim_time_s * 1000, self.master_params)
-        if self.master_params.USE_CEREBELLUM:
-            self.cerebellum_handler.apply_blocking_window(curr_section)
+    def recorded_views(self) -> list[PopView]:
+        if self._recorded_views is None:
+            self._recorded_views = self.collect_populations().views()
+        return self._recorded_views
 
-        connect_m1_at = (
-            self.master_params.simulation.time_prep
-            - self.master_params.connections.m1_delay
-        )
+    def drain_recorders(self):
+        """Streams the events of memory-backed recorders to disk."""
+        for view in self.recorded_views():
+            view.drain()
 
-        if not self.connected_m1 and sim_time_s * 1000 > connect_m1_at:
-            self.log.warning(f"reached {connect_m1_at}ms! connecting m1...")
-            self.mc.connect_planner_to_m1(self.pops.planner_p, self.pops.planner_n)
+    def _prepare_step(self, curr_section: TrialSection, t_ms: float) -> bool:
+        """
+        Applies the per-step network changes for the step starting at `t_ms`.
+        Returns whether NEST has to be run for that step.
+        """
+        if self.master_params.USE_CEREBELLUM:
+            self.cerebellum_handler.apply_blocking_window(curr_section)
+        for view in self.recorded_views():
+            view.apply_section(curr_section, t_ms + self.trial_offset_ms)
+
+        if not self.connected_m1 and t_ms > self._connect_m1_at():
+            self.log.warning(f"reached {self._connect_m1_at()}ms! connecting m1...")
+            if self._m1_conns is None:
+                self._connect_planner_to_m1()
+            elif self._m1_conns:
+                self._m1_conns.set(weight=self._m1_weights)
             # self.mc.m1.connect_rec_out()
             # self.mc.connect_m1_to_out()
             self.connected_m1 = True
             self.log.warning(f"connected m1 rec to out!")
 
-        if (
-            curr_section != TrialSection.TIME_GRASP
-            and curr_section != TrialSection.TIME_POST
-            and curr_section != TrialSection.TIME_END_TRIAL
-        ):
+        return curr_section not in OPEN_LOOP_SECTIONS
+
+    def _connect_planner_to_m1(self):
+        """Connects planner to m1, keeping the new connections to gate them in later trials."""
+        source = self.pops.planner_p.pop
+        before = set(np.atleast_1d(nest.GetConnections(source=source).get("target")))
+        self.mc.connect_planner_to_m1(self.pops.planner_p, self.pops.planner_n)
+        after = set(np.atleast_1d(nest.GetConnections(source=source).get("target")))
+        m1_targets = sorted(after - before)
+        # empty if m1 does not take planner input (M1Mock)
+        self._m1_conns = (
+            nest.GetConnections(
+                source=source, target=nest.NodeCollection([int(t) for t in m1_targets])
+            )
+            if m1_targets
+            else ()
+        )
+
+    def start_next_trial(self):
+        """
+        Re-initializes the trial-dependent state to run the next trial of the
+        chain on the same network: trial time restarts from 0 (NEST time goes
+        on, shifted by `trial_offset_ms`), m1 is disconnected until its
+        connection time and recorders write to the current kernel data_path.
+        Plastic weights and neuron states are left as they are.
+        Call between nest.Cleanup() and nest.Prepare().
+        """
+        if self.trial + 1 >= self.chain.n_trials:
+            raise ValueError(f"Network was built for {self.chain.n_trials} trials")
+        self.trial += 1
+        offset = self.chain.offset_ms(self.trial)
+        now = nest.GetKernelStatus("biological_time")
+        if not np.isclose(now, offset):
+            raise RuntimeError(
+                f"Trial {self.trial} should start at {offset} ms, NEST is at {now} ms"
+            )
+        self.trial_offset_ms = offset
+
+        if self.connected_m1 and self._m1_conns:
+            self._m1_weights = self._m1_conns.get("weight")
+            self._m1_conns.set(weight=0.0)
+        self.connected_m1 = False
+        self._window_section = None
+        for view in self.recorded_views():
+            view.start_trial(offset)
+        self.log.info("Starting next trial of the chain", trial=self.trial, t0=offset)
+
+    def _connect_m1_at(self) -> float:
+        return (
+            self.master_params.simulation.time_prep
+            - self.master_params.connections.m1_delay
+        )
+
+    def run_simulation_step(self, timestep, sim_time_s):
+        t_ms = sim_time_s * 1000
+        curr_section = get_current_section(t_ms, self.master_params)
+        if self._prepare_step(curr_section, t_ms):
             nest.Run(timestep)
 
         return
+
+    def run_simulation_window(self, n_steps: int, timestep, sim_time_s):
+        """
+        Runs `n_steps` steps of `timestep` ms starting at `sim_time_s`, with the
+        same network changes as `n_steps` calls to `run_simulation_step`.
+        Consecutive steps are merged into a single nest.Run, split only where
+        the network changes (trial section changes, m1 connection).
+        """
+        t0_ms = sim_time_s * 1000
+        pending = 0.0
+        for i in range(n_steps):
+            t_ms = t0_ms + i * timestep
+            curr_section = get_current_section(t_ms, self.master_params)
+            changes = curr_section != self._window_section or (
+                not self.connected_m1 and t_ms > self._connect_m1_at()
+            )
+            if changes and pending:
+                nest.Run(pending)
+                pending = 0.0
+            self._window_section = curr_section
+            if self._prepare_step(curr_section, t_ms):
+                pending += timestep
+        if pending:
+            nest.Run(pending)
@@ -1,6 +1,6 @@
 from typing import Generic, Optional, TypeVar
 
-from neural.neural_models import PopulationSpikes, convert_to_recording
+from neural.neural_models import StoredPopulationSpikes, convert_to_recording
 from pydantic import BaseModel
 
 from .population_view import PopView
@@ -50,7 +50,9 @@ class ControllerPopulationsGeneric(BaseModel, Generic[T]):
         arbitrary_types_allowed = True
 
 
-class ControllerPopulationsRecordings(ControllerPopulationsGeneric[PopulationSpikes]):
+class ControllerPopulationsRecordings(
+    ControllerPopulationsGeneric[StoredPopulationSpikes]
+):
     pass
 
 
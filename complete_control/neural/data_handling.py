@@ -1,15 +1,20 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
 
 import structlog
+from config.core_models import CollapseMode, RecordingPolicyMode
 from mpi4py.MPI import Comm
 from neural.result_models import NeuralResultManifest
 from neural.Controller import PopulationBlocks
 from neural.nest_adapter import nest
 from neural.neural_models import (
-    SynapseBlock,
-    SynapseRecording,
+    PopulationSpikesRef,
+    WEIGHT_CHECKPOINT_SUFFIX,
+    SynapseWeights,
+    save_weight_checkpoint,
 )
+from neural.population_view import PopView, collapse_population
 
 _log: structlog.stdlib.BoundLogger = structlog.get_logger(str(__file__))
 
@@ -18,6 +23,8 @@ def collapse_files(
     dir: Path,
     pop_blocks: PopulationBlocks,
     comm: Comm = None,
+    mode: CollapseMode = CollapseMode.SERIAL,
+    workers: int | None = None,
 ):
     """
     Collapses multiple ASCII recording files from different processes into single files per population.
@@ -29,21 +36,50 @@ def collapse_files(
     pop_blocks : PopulationBlocks
     comm : Comm
         Comm on which to barrier() on
+    mode : CollapseMode
+        SERIAL collects one population after the other; PROCESSES spreads them
+        over a process pool; MPI spreads them round-robin over the ranks of `comm`
+        (falls back to PROCESSES if `comm` is None).
+    workers : int | None
+        Size of the process pool in PROCESSES mode; None leaves it to
+        ProcessPoolExecutor (os.cpu_count()). NeuralLoop.save_results passes
+        RecordingParams.collapse_workers, or the number of virtual processes.
     Notes
     -----
-    Files are processed only by rank 0 process. For each population, files starting with
+    Files are processed only by rank 0 process (except in MPI mode). For each population, files starting with
     the population name are combined, duplicates are removed, and original files are deleted.
+    Populations whose recording policy is OFF get no recording (None) in the manifest.
+    The resulting manifest is the same in every mode.
     """
 
     controller_rec = cerebhandler_rec = cereb_rec = None
     use_cerebellum = False
 
-    controller_rec = pop_blocks.controller.to_recording(dir, comm)
+    views = pop_blocks.views()
+    for v in views:
+        v.flush()
+    if comm is not None:
+        # every rank's streamed events must be on disk before merging
+        nest.SyncProcesses()
+
+    collected = None
+    if mode != CollapseMode.SERIAL:
+        # populations with recording policy OFF are left to `collect`, giving None
+        views = [v for v in views if v.policy.mode != RecordingPolicyMode.OFF]
+        if mode == CollapseMode.MPI and comm is not None:
+            collected = _collapse_mpi(dir, views, comm)
+        elif comm is None or nest.Rank() == 0:
+            collected = _collapse_pool(dir, views, workers)
+        _log.debug(f"collapsed {len(views)} populations", mode=mode.value)
+
+    controller_rec = pop_blocks.controller.to_recording(dir, comm, collected)
 
     if pop_blocks.cerebellum_handler:
         use_cerebellum = True
-        cerebhandler_rec = pop_blocks.cerebellum_handler.to_recording(dir, comm)
-        cereb_rec = pop_blocks.cerebellum.to_recording(dir, comm)
+        cerebhandler_rec = pop_blocks.cerebellum_handler.to_recording(
+            dir, comm, collected
+        )
+        cereb_rec = pop_blocks.cerebellum.to_recording(dir, comm, collected)
 
     if comm is not None:
         nest.SyncProcesses()
@@ -57,50 +93,56 @@ def collapse_files(
     )
 
 
-def merge_synapse_blocks(blocks: List[SynapseBlock]) -> SynapseBlock:
-    if not blocks:
-        raise ValueError("Cannot merge empty list of blocks")
-
-    reference_source = blocks[0].source_pop_label
-    reference_target = blocks[0].target_pop_label
-
-    for i, block in enumerate(blocks[1:], start=1):
-        if (
-            block.source_pop_label != reference_source
-            or block.target_pop_label != reference_target
-        ):
-            raise ValueError(
-                f"Inconsistent source_pop_label: block 0 has '{reference_source}>{reference_target}', "
-                f"but block {i} has '{block.source_pop_label}>{block.target_pop_label}'"
-            )
-
-    return SynapseBlock(
-        source_pop_label=blocks[0].source_pop_label,
-        target_pop_label=blocks[0].target_pop_label,
-        synapse_recordings=[r for b in blocks for r in b.synapse_recordings],
-    )
-
-
-def save_conn_weights(weights: list[SynapseBlock], dir: Path, comm=None) -> list[Path]:
+def _collapse_pool(
+    dir: Path, views: list[PopView], workers: int | None
+) -> dict[str, PopulationSpikesRef]:
+    tasks = [
+        (dir, v.label, v.recorded_gids, v.neuron_model, v.time_offset_ms) for v in views
+    ]
+    if not tasks:
+        return {}
+    # fork: workers only need the (already imported) numpy/pandas code
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork")
+    ) as pool:
+        refs = list(pool.map(collapse_population, *zip(*tasks)))
+    for v, ref in zip(views, refs):
+        v.recording = ref
+    return {v.label: ref for v, ref in zip(views, refs)}
+
+
+def _collapse_mpi(
+    dir: Path, views: list[PopView], comm: Comm
+) -> dict[str, PopulationSpikesRef]:
+    owned = {
+        v.label: collapse_population(
+            dir, v.label, v.recorded_gids, v.neuron_model, v.time_offset_ms
+        )
+        for i, v in enumerate(views)
+        if i % comm.size == comm.rank
+    }
+    # refs only hold metadata and paths, cheap to share with every rank
+    collected = {}
+    for refs in comm.allgather(owned):
+        collected.update(refs)
+    for v in views:
+        v.recording = collected[v.label]
+    return collected
+
+
+def save_conn_weights(
+    weights: list[SynapseWeights], dir: Path, comm=None
+) -> list[Path]:
     from neural.Cerebellum import create_key_plastic_connection
 
     paths = []
     _log.debug(f"saving weights...")
     for block in weights:
-        if comm is not None:
-            # gather all blocks and merge them in a single object
-            gathered: list[SynapseBlock] = comm.gather(block, root=0)
-            if comm.rank == 0:
-                block = merge_synapse_blocks(gathered)
-
-        if comm is None or comm.rank == 0:
-            label = create_key_plastic_connection(
-                block.source_pop_label, block.target_pop_label
-            )
-            rec_path = dir / f"{label}.json"
-            _log.debug(f"saving {label}, with {len(block.synapse_recordings)} synapses")
-            with open(rec_path, "w") as f:
-                json_array = block.model_dump_json(indent=2)
-                f.write(json_array)
-            paths.append(rec_path)
+        label = create_key_plastic_connection(
+            block.source_pop_label, block.target_pop_label
+        )
+        rec_path = dir / f"{label}{WEIGHT_CHECKPOINT_SUFFIX}"
+        _log.debug(f"saving {label}, with {len(block)} synapses")
+        save_weight_checkpoint(rec_path, block, comm=comm)
+        paths.append(rec_path)
     return paths
@@ -9,6 +9,7 @@ from config.module_params import (
     PlannerModuleConfig,
 )
 from neural.nest_adapter import nest
+from utils_common.utils import TrialChain
 
 from .population_view import PopView
 
@@ -116,9 +117,11 @@ class MotorCortex:
         sim: SimulationParams,
         m1_delay: float,
         plan_params: PlannerModuleConfig,
+        chain: TrialChain,
     ):
         self._log = structlog.get_logger("motorcortex")
         self.sim = sim
+        self.chain = chain
         self.N = numNeurons
         self.params = params
         self.m1_delay = m1_delay
@@ -152,11 +155,12 @@ class MotorCortex:
                 m1_config, params.m1_eprop_config.artifacts_dir
             )
             self.m1.build_network(
-                simulation_time_ms=self.sim.duration_ms,
+                simulation_time_ms=self.sim.duration_ms
+                + self.chain.offset_ms(self.chain.n_trials - 1),
                 output_neuron_model="basic_neuron_nestml",
                 output_neuron_params={
                     # TODO: this needs to become standard configuration once it stabilizes
-                    "simulation_steps": self.sim.sim_steps,
+                    "simulation_steps": self.chain.network_steps,
                     "kp": 0.001,
                     "buffer_size": 50,  # 5 for downwards, 50 for upwards
                     # "tau_m": m1_config.neurons.out.tau_m,
@@ -175,9 +179,9 @@ class MotorCortex:
             motor_commands = generate_motor_commands_minjerk(self.sim)
             self.m1 = M1Mock(
                 numNeurons,
-                motor_commands,
+                self.chain.tile(motor_commands),
                 params.m1_mock_config,
-                self.sim.sim_steps,
+                self.chain.network_steps,
                 delay_ms=self.m1_delay,
             )
             self.conn_type_m1_to_out = "one_to_one"
@@ -202,7 +206,7 @@ class MotorCortex:
             {
                 "pos": True,
                 "buffer_size": buf_sz,
-                "simulation_steps": self.sim.sim_steps,
+                "simulation_steps": self.chain.network_steps,
             },
         )
         self.fbk_p = PopView(tmp_pop_p, to_file=True, label="mc_fbk_p")
@@ -213,7 +217,7 @@ class MotorCortex:
             {
                 "pos": False,
                 "buffer_size": buf_sz,
-                "simulation_steps": self.sim.sim_steps,
+                "simulation_steps": self.chain.network_steps,
             },
         )
         self.fbk_n = PopView(tmp_pop_n, to_file=True, label="mc_fbk_n")
@@ -225,7 +229,7 @@ class MotorCortex:
             {
                 "pos": True,
                 "buffer_size": buf_sz,
-                "simulation_steps": self.sim.sim_steps,
+                "simulation_steps": self.chain.network_steps,
             },
         )
         self.out_p = PopView(tmp_pop_p, to_file=True, label="mc_out_p")
@@ -236,7 +240,7 @@ class MotorCortex:
             {
                 "pos": False,
                 "buffer_size": buf_sz,
-                "simulation_steps": self.sim.sim_steps,
+                "simulation_steps": self.chain.network_steps,
             },
         )
         self.out_n = PopView(tmp_pop_n, to_file=True, label="mc_out_n")
@@ -1,22 +1,30 @@
+from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
 from typing import List, TypeVar
 
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, Field, PrivateAttr
 from utils_common.custom_types import NdArray
 
 T = TypeVar("T")
 
 
 def convert_to_recording(
-    source: object, target_class: type[T], path: Path, comm=None
+    source: object, target_class: type[T], path: Path, comm=None, collected=None
 ) -> T:
     from neural.population_view import PopView
 
-    """Convert a population object to its recording equivalent."""
+    """Convert a population object to its recording equivalent.
+    `collected` maps labels to recordings that were already collapsed elsewhere
+    (e.g. in parallel); those PopViews are not collected again."""
     dest = target_class()
     for k, v in source.__dict__.items():
         if isinstance(v, PopView):
-            setattr(dest, k, v.collect(path, comm))
+            if collected is not None and v.label in collected:
+                setattr(dest, k, collected[v.label])
+            else:
+                setattr(dest, k, v.collect(path, comm))
     return dest
 
 
@@ -24,6 +32,163 @@ class RecordingManifest(BaseModel):
     population_spikes: Path
 
 
+class SpikeRates(BaseModel):
+    """
+    Spike counts of a population over one trial, binned at several widths,
+    and its mean rate in each trial section; computed once, at collapse, so
+    rate plots and summaries need not histogram the raw spikes again.
+    """
+
+    duration_ms: float
+    bin_widths_ms: list[float]
+    counts_path: Path
+    section_rates_hz: dict[str, float] = {}
+
+    @classmethod
+    def save(
+        cls,
+        times: np.ndarray,
+        population_size: int,
+        path: Path,
+        duration_ms: float,
+        bin_widths_ms: list[float],
+        sections: dict[str, tuple[float, float]],
+    ) -> "SpikeRates":
+        widths = sorted(bin_widths_ms)
+        finest = widths[0]
+        n_fine = int(np.ceil(duration_ms / finest))
+        idx = (times[(times >= 0) & (times <= duration_ms)] // finest).astype(np.int64)
+        # as np.histogram, a spike at the very end falls in the last bin
+        fine = np.bincount(np.minimum(idx, n_fine - 1), minlength=n_fine)
+
+        counts = {}
+        for w in widths:
+            step = round(w / finest)
+            if not np.isclose(step * finest, w):
+                raise ValueError(f"bin width {w} is not a multiple of {finest}")
+            counts[f"{w:g}"] = np.add.reduceat(fine, np.arange(0, n_fine, step))
+        np.savez(path, **counts)
+
+        section_rates = {}
+        for name, (start, end) in sections.items():
+            n = np.count_nonzero((times >= start) & (times < end))
+            section_rates[name] = (
+                1000 * n / (population_size * (end - start)) if population_size else 0.0
+            )
+        return cls(
+            duration_ms=duration_ms,
+            bin_widths_ms=widths,
+            counts_path=path,
+            section_rates_hz=section_rates,
+        )
+
+    def counts(self, width_ms: float) -> np.ndarray:
+        with np.load(self.counts_path) as data:
+            return data[f"{width_ms:g}"]
+
+    def level(self, bin_ms: float) -> float | None:
+        """Coarsest stored bin width `bin_ms` is a multiple of."""
+        for w in reversed(self.bin_widths_ms):
+            if np.isclose(round(bin_ms / w) * w, bin_ms):
+                return w
+        return None
+
+    def binned(self, bin_ms: float) -> np.ndarray | None:
+        """Spike counts in bins of `bin_ms`, or None if not derivable."""
+        w = self.level(bin_ms)
+        if w is None:
+            return None
+        counts = self.counts(w)
+        return np.add.reduceat(counts, np.arange(0, len(counts), round(bin_ms / w)))
+
+
+class SpikeIndex:
+    """
+    Search structure over the spikes of a population: sender gids are mapped
+    to local ids (positions in `gids`) by a lookup table, or by binary search
+    for sparse gids; spikes are ordered by time for window queries and grouped
+    per neuron in CSR form (`offsets`) for per-neuron queries. Queries return
+    indices into the original `senders`/`times` arrays.
+    """
+
+    def __init__(self, gids, senders, times):
+        gids = np.asarray(gids)
+        self._times = np.asarray(times)
+        self._n_neurons = len(gids)
+        self._gid_order = np.argsort(gids, kind="stable")
+        self._sorted_gids = gids[self._gid_order]
+        self._lut = None
+        if len(gids):
+            span = int(self._sorted_gids[-1] - self._sorted_gids[0]) + 1
+            # NEST gids of a population are (nearly) contiguous
+            if span <= 4 * len(gids):
+                self._lut = np.full(span, -1, dtype=np.int64)
+                self._lut[gids - self._sorted_gids[0]] = np.arange(len(gids))
+        self.local_ids = self.to_local(senders)
+
+        # collapsed spikes are already sorted by time: no permutation needed
+        times = self._times
+        if np.all(times[1:] >= times[:-1]):
+            self._time_order = None
+            self._sorted_times = times
+        else:
+            self._time_order = np.argsort(times, kind="stable")
+            self._sorted_times = times[self._time_order]
+
+    @classmethod
+    def from_population(cls, pop: "PopulationSpikes") -> "SpikeIndex":
+        return cls(pop.gids, pop.senders, pop.times)
+
+    @cached_property
+    def neuron_order(self) -> np.ndarray:
+        """Events sorted by neuron, then time; built on the first per-neuron query."""
+        return np.lexsort((self._times, self.local_ids))
+
+    @cached_property
+    def offsets(self) -> np.ndarray:
+        """CSR offsets: events of neuron i are neuron_order[offsets[i]:offsets[i+1]]."""
+        offsets = np.zeros(self._n_neurons + 1, dtype=np.int64)
+        counts = np.bincount(self.local_ids, minlength=self._n_neurons)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets
+
+    def to_local(self, gids) -> np.ndarray:
+        """Local ids of `gids`; raises ValueError for gids not in the population."""
+        gids = np.asarray(gids, dtype=self._sorted_gids.dtype)
+        if not len(gids):
+            return np.empty(0, dtype=np.int64)
+        if not len(self._sorted_gids):
+            raise ValueError("senders not in the population's gids")
+
+        if self._lut is not None:
+            offset = gids - self._sorted_gids[0]
+            inside = (offset >= 0) & (offset < len(self._lut))
+            local = self._lut[np.where(inside, offset, 0)]
+            if not np.all(inside & (local >= 0)):
+                raise ValueError("senders not in the population's gids")
+            return local
+
+        pos = np.searchsorted(self._sorted_gids, gids)
+        pos = np.minimum(pos, len(self._sorted_gids) - 1)
+        if np.any(self._sorted_gids[pos] != gids):
+            raise ValueError("senders not in the population's gids")
+        return self._gid_order[pos]
+
+    def window(self, t0: float, t1: float) -> slice | np.ndarray:
+        """Events with t0 <= time < t1, in time order."""
+        lo, hi = np.searchsorted(self._sorted_times, [t0, t1], side="left")
+        if self._time_order is None:
+            return slice(lo, hi)
+        return self._time_order[lo:hi]
+
+    def neuron_events(self, local_id: int) -> np.ndarray:
+        """Events of neuron `local_id`, in time order."""
+        return self.neuron_order[self.offsets[local_id] : self.offsets[local_id + 1]]
+
+    def neuron_events_by_gid(self, gid: int) -> np.ndarray:
+        return self.neuron_events(int(self.to_local([gid])[0]))
+
+
 class PopulationSpikes(BaseModel):
     """
     Represents the spiking data and metadata for a single neuron population.
@@ -35,10 +200,98 @@ class PopulationSpikes(BaseModel):
     times: NdArray
     population_size: int
     neuron_model: str
+    # precomputed counts of each trial the spikes span, in order
+    rates: list[SpikeRates] | None = Field(default=None, exclude=True)
+
+    _index: SpikeIndex | None = PrivateAttr(default=None)
 
     class Config:
         arbitrary_types_allowed = True
 
+    def index(self) -> SpikeIndex:
+        """SpikeIndex of these spikes, built on first use."""
+        if self._index is None:
+            self._index = SpikeIndex.from_population(self)
+        return self._index
+
+    def binned_counts(self, bin_ms: float) -> np.ndarray | None:
+        """
+        Spike counts in consecutive bins of `bin_ms` over all trials, from the
+        precomputed counts; None if they are missing or do not fit `bin_ms`.
+        """
+        if not self.rates or any(
+            not np.isclose(round(r.duration_ms / bin_ms) * bin_ms, r.duration_ms)
+            for r in self.rates
+        ):
+            return None
+        counts = [r.binned(bin_ms) for r in self.rates]
+        if any(c is None for c in counts):
+            return None
+        return np.concatenate(counts)
+
+
+class PopulationSpikesRef(BaseModel):
+    """
+    On-disk reference to a PopulationSpikes, whose arrays are stored as one raw
+    `.npy` file per column. Only metadata and paths end up in the JSON manifest;
+    columns are memory-mapped on `load`, so reading a population never decodes
+    any other.
+    """
+
+    label: str
+    population_size: int
+    neuron_model: str
+    n_spikes: int
+    gids_path: Path
+    senders_path: Path
+    times_path: Path
+    rates: SpikeRates | None = None
+
+    @classmethod
+    def save(
+        cls, pop: PopulationSpikes, dir: Path, rates: SpikeRates | None = None
+    ) -> "PopulationSpikesRef":
+        gids_path = dir / f"{pop.label}.gids.npy"
+        senders_path = dir / f"{pop.label}.senders.npy"
+        times_path = dir / f"{pop.label}.times.npy"
+        np.save(gids_path, np.asarray(pop.gids, dtype=np.int64))
+        np.save(senders_path, np.asarray(pop.senders, dtype=np.int64))
+        np.save(times_path, np.asarray(pop.times, dtype=np.float64))
+        return cls(
+            label=pop.label,
+            population_size=pop.population_size,
+            neuron_model=pop.neuron_model,
+            n_spikes=len(pop.senders),
+            gids_path=gids_path,
+            senders_path=senders_path,
+            times_path=times_path,
+            rates=rates,
+        )
+
+    def load(self, mmap: bool = True) -> PopulationSpikes:
+        mmap_mode = "r" if mmap and self.n_spikes > 0 else None
+        return PopulationSpikes(
+            label=self.label,
+            gids=np.load(self.gids_path),
+            senders=np.load(self.senders_path, mmap_mode=mmap_mode),
+            times=np.load(self.times_path, mmap_mode=mmap_mode),
+            population_size=self.population_size,
+            neuron_model=self.neuron_model,
+            rates=[self.rates] if self.rates else None,
+        )
+
+
+# results written before the binary format embed the arrays directly in the manifest
+StoredPopulationSpikes = PopulationSpikesRef | PopulationSpikes
+
+
+def load_population_spikes(
+    pop: StoredPopulationSpikes | None,
+) -> PopulationSpikes | None:
+    if isinstance(pop, PopulationSpikesRef):
+        return pop.load()
+    return pop
+
 
 class Synapse(BaseModel):
     source: int  # GID
@@ -58,7 +311,206 @@ class SynapseRecording(BaseModel):
         arbitrary_types_allowed = True
 
 
+# record layout of the binary plastic-weight files; model_id indexes the
+# synapse model names stored in the same file
+SYNAPSE_WEIGHT_DTYPE = np.dtype(
+    [
+        ("source", np.int64),
+        ("target", np.int64),
+        ("synapse_id", np.int64),
+        ("delay", np.float64),
+        ("model_id", np.int16),
+        ("port", np.int64),
+        ("weight", np.float64),
+    ]
+)
+# NEST connection properties snapshotted for each plastic synapse
+SYNAPSE_SNAPSHOT_KEYS = (
+    "source",
+    "target",
+    "synapse_id",
+    "delay",
+    "synapse_model",
+    "port",
+    "weight",
+    # "receptor", see https://github.com/near-nes/controller/issues/102#issuecomment-3558895210
+)
+
+
 class SynapseBlock(BaseModel):
     source_pop_label: str
     target_pop_label: str
     synapse_recordings: List[SynapseRecording]
+
+    def to_weight_array(self) -> tuple[np.ndarray, list[str]]:
+        """Columns of the recordings as a SYNAPSE_WEIGHT_DTYPE array, and its synapse models."""
+        syns = [r.syn for r in self.synapse_recordings]
+        models = sorted({s.synapse_model for s in syns})
+        model_ids = {m: i for i, m in enumerate(models)}
+        synapses = np.empty(len(syns), dtype=SYNAPSE_WEIGHT_DTYPE)
+        synapses["source"] = [s.source for s in syns]
+        synapses["target"] = [s.target for s in syns]
+        synapses["synapse_id"] = [s.syn_id for s in syns]
+        synapses["delay"] = [s.delay for s in syns]
+        synapses["model_id"] = [model_ids[s.synapse_model] for s in syns]
+        synapses["port"] = [s.port for s in syns]
+        synapses["weight"] = [r.weight for r in self.synapse_recordings]
+        return synapses, models
+
+
+@dataclass
+class SynapseWeights:
+    """
+    Columnar snapshot of the plastic synapses of one projection: a
+    SYNAPSE_WEIGHT_DTYPE array whose model_id indexes `synapse_models`.
+    """
+
+    source_pop_label: str
+    target_pop_label: str
+    synapses: np.ndarray
+    synapse_models: list[str]
+
+    def __len__(self):
+        return len(self.synapses)
+
+    @classmethod
+    def from_connections(
+        cls, source_pop_label: str, target_pop_label: str, conns: list
+    ) -> "SynapseWeights":
+        """Snapshots NEST SynapseCollections with a single `.get()` call each."""
+        columns = {k: [] for k in SYNAPSE_SNAPSHOT_KEYS}
+        for conn in conns:
+            status = conn.get(list(SYNAPSE_SNAPSHOT_KEYS))
+            for k in SYNAPSE_SNAPSHOT_KEYS:
+                # a single connection gives scalars instead of lists
+                columns[k].append(np.atleast_1d(status[k]))
+        columns = {
+            k: np.concatenate(v) if v else np.empty(0) for k, v in columns.items()
+        }
+        models, model_ids = np.unique(
+            columns.pop("synapse_model").astype(str), return_inverse=True
+        )
+        synapses = np.empty(len(model_ids), dtype=SYNAPSE_WEIGHT_DTYPE)
+        for k, v in columns.items():
+            synapses[k] = v
+        synapses["model_id"] = model_ids
+        return cls(source_pop_label, target_pop_label, synapses, models.tolist())
+
+    @classmethod
+    def concatenate(cls, blocks: list["SynapseWeights"]) -> "SynapseWeights":
+        """Merges snapshots of the same projection, e.g. from different ranks."""
+        if not blocks:
+            raise ValueError("Cannot merge empty list of blocks")
+        models = sorted({m for b in blocks for m in b.synapse_models})
+        parts = []
+        for i, block in enumerate(blocks):
+            if (block.source_pop_label, block.target_pop_label) != (
+                blocks[0].source_pop_label,
+                blocks[0].target_pop_label,
+            ):
+                raise ValueError(
+                    f"Inconsistent source_pop_label: block 0 has '{blocks[0].source_pop_label}>{blocks[0].target_pop_label}', "
+                    f"but block {i} has '{block.source_pop_label}>{block.target_pop_label}'"
+                )
+            part = block.synapses.copy()
+            remap = np.array(
+                [models.index(m) for m in block.synapse_models], dtype=np.int16
+            )
+            if len(remap):
+                part["model_id"] = remap[part["model_id"]]
+            parts.append(part)
+        return cls(
+            blocks[0].source_pop_label,
+            blocks[0].target_pop_label,
+            np.concatenate(parts),
+            models,
+        )
+
+
+# record layout of the shards of a weight checkpoint; model_id indexes the
+# synapse models of its WeightCheckpoint
+CHECKPOINT_SHARD_FIELDS = ("source", "target", "model_id", "port", "weight")
+WEIGHT_CHECKPOINT_SUFFIX = ".weights"
+WEIGHT_CHECKPOINT_MANIFEST = "manifest.json"
+
+
+def checkpoint_shard_dtype(weight_dtype=np.float64) -> np.dtype:
+    return np.dtype(
+        [
+            ("source", np.int64),
+            ("target", np.int64),
+            ("model_id", np.uint16),
+            ("port", np.uint32),
+            ("weight", weight_dtype),
+        ]
+    )
+
+
+class WeightCheckpoint(BaseModel):
+    """
+    Manifest of a weight checkpoint: a directory with one binary (.npy) shard
+    of typed columns per writing rank, and this manifest.
+    """
+
+    source_pop_label: str
+    target_pop_label: str
+    synapse_models: list[str]
+    shards: list[str]
+    n_synapses: int
+
+
+def save_weight_checkpoint(
+    path: Path, block: SynapseWeights, comm=None, weight_dtype=np.float64
+):
+    """
+    Writes the plastic weights of `block` as a checkpoint directory `path`.
+    With `comm`, every rank writes its own shard in parallel; only the small
+    manifest is put together on rank 0.
+    """
+    rank, size = (comm.rank, comm.size) if comm is not None else (0, 1)
+    path.mkdir(exist_ok=True)
+
+    models = block.synapse_models
+    if comm is not None:
+        # model ids must mean the same in every shard
+        models = sorted({m for ms in comm.allgather(models) for m in ms})
+    remap = np.array([models.index(m) for m in block.synapse_models], dtype=np.uint16)
+
+    shard = np.empty(len(block), dtype=checkpoint_shard_dtype(weight_dtype))
+    for k in CHECKPOINT_SHARD_FIELDS:
+        shard[k] = block.synapses[k]
+    if len(remap):
+        shard["model_id"] = remap[block.synapses["model_id"]]
+    shard_name = f"shard-{rank}.npy"
+    np.save(path / shard_name, shard)
+
+    counts = comm.gather(len(shard), root=0) if comm is not None else [len(shard)]
+    if rank == 0:
+        manifest = WeightCheckpoint(
+            source_pop_label=block.source_pop_label,
+            target_pop_label=block.target_pop_label,
+            synapse_models=models,
+            shards=[f"shard-{r}.npy" for r in range(size)],
+            n_synapses=sum(counts),
+        )
+        with open(path / WEIGHT_CHECKPOINT_MANIFEST, "w") as f:
+            f.write(manifest.model_dump_json(indent=2))
+    if comm is not None:
+        comm.Barrier()
+
+
+def iter_weight_shards(path: Path):
+    """
+    Yields (synapses, synapse_models) for each shard of a weight checkpoint;
+    shards are memory-mapped, so only the synapses that are used get read.
+    SynapseBlock JSON files from older runs are converted, as a single shard.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, "r") as f:
+            yield SynapseBlock.model_validate_json(f.read()).to_weight_array()
+        return
+    with open(path / WEIGHT_CHECKPOINT_MANIFEST, "r") as f:
+        manifest = WeightCheckpoint.model_validate_json(f.read())
+    for shard in manifest.shards:
+        yield np.load(path / shard, mmap_mode="r"), manifest.synapse_models
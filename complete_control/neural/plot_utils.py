@@ -1,5 +1,9 @@
+import io
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
 
 import matplotlib.gridspec as gridspec
 import matplotlib.pyplot as plt
@@ -7,15 +11,14 @@ import numpy as np
 import structlog
 from config.core_models import SimulationParams
 from config.ResultMeta import ResultMeta
-from matplotlib.axis import Axis
-from matplotlib.figure import Figure
+from matplotlib.colors import to_rgb
 from mpi4py import MPI
 from neural.neural_models import SynapseBlock
 from PIL import Image, ImageDraw
-from utils_common.utils import draw_trial_phases
+from utils_common.utils import draw_trial_phases, get_trial_phase_boundaries
 
 from complete_control.config.MasterParams import MasterParams
-from complete_control.utils_common.results import concatenate_neural_results
+from complete_control.utils_common.results import LazyNeuralResults
 
 from .neural_models import PopulationSpikes
 from .population_utils import (
@@ -28,6 +31,8 @@ from .population_utils import (
 
 _log: structlog.stdlib.BoundLogger = structlog.get_logger(__name__)
 FIGURE_EXT = "png"
+# rasters with more spikes are drawn as an image instead of one marker each
+RASTER_SCATTER_MAX_SPIKES = 100_000
 
 
 def load_spike_data_from_file(filepath: Path) -> PopulationSpikes:
@@ -86,15 +91,32 @@ def plot_synaptic_weight_evolution(synapse_json_path, max_synapses=10, fig_path=
         fig.savefig(fig_path)
 
 
-def plot_rate(time_v, ts, pop_size, buffer_sz, ax, title="", normalize=False, **kwargs):
-    """Computes and plots the smoothed PSTH for a set of spike times."""
+def plot_rate(
+    time_v,
+    ts,
+    pop_size,
+    buffer_sz,
+    ax,
+    title="",
+    normalize=False,
+    counts=None,
+    **kwargs,
+):
+    """
+    Computes and plots the smoothed PSTH for a set of spike times. `counts`
+    (see PopulationSpikes.binned_counts) are used instead of the spike times
+    when they cover the same bins.
+    """
     if ts.size == 0 or pop_size == 0:
         ax.plot([], [], **kwargs)  # Plot empty to keep colors consistent
         return 0
 
     time_end = time_v[-1] if len(time_v) > 0 else 0
     bins = np.arange(0, time_end + 1, buffer_sz)
-    count, _ = np.histogram(ts, bins=bins)
+    if counts is not None and len(counts) == len(bins) - 1:
+        count = counts
+    else:
+        count, _ = np.histogram(ts, bins=bins)
     rate = 1000 * count / (pop_size * buffer_sz)
 
     # Smoothing
@@ -120,9 +142,52 @@ def plot_rate(time_v, ts, pop_size, buffer_sz, ax, title="", normalize=False, **
         return 0
 
 
+def plot_raster(ax, ts, ys, x_range, y_range, color, label=None):
+    """
+    Raster of spikes (`ts`, `ys`) in `ax`. Up to RASTER_SCATTER_MAX_SPIKES
+    spikes are drawn as markers; above that they are binned into a
+    (time x neuron) image at the axes' pixel resolution, in which the pixels
+    a marker would cover are painted, so drawing time no longer grows with
+    the spikes.
+    """
+    if len(ts) <= RASTER_SCATTER_MAX_SPIKES:
+        ax.scatter(ts, ys, marker=".", s=1, c=color, label=label)
+        return
+
+    bbox = ax.get_window_extent()
+    nx = max(int(bbox.width), 1)
+    ny = max(min(int(bbox.height), int(np.ceil(y_range[1] - y_range[0]))), 1)
+    # pixel of each spike, as np.histogram2d would bin it, but in one pass
+    ix = (np.asarray(ts) - x_range[0]) * (nx / (x_range[1] - x_range[0]))
+    iy = (np.asarray(ys) - y_range[0]) * (ny / (y_range[1] - y_range[0]))
+    inside = (ix >= 0) & (ix <= nx) & (iy >= 0) & (iy <= ny)
+    ix = np.minimum(ix[inside].astype(np.int64), nx - 1)
+    iy = np.minimum(iy[inside].astype(np.int64), ny - 1)
+    hit = np.bincount(iy * nx + ix, minlength=nx * ny).reshape(ny, nx) > 0
+    # a "." marker (with its edge) covers about 3x3 pixels: grow the hits alike
+    grown = hit.copy()
+    grown[1:] |= hit[:-1]
+    grown[:-1] |= hit[1:]
+    hit = grown.copy()
+    hit[:, 1:] |= grown[:, :-1]
+    hit[:, :-1] |= grown[:, 1:]
+    image = np.zeros((ny, nx, 4))
+    image[..., :3] = to_rgb(color)
+    image[..., 3] = hit
+    ax.imshow(
+        image,
+        extent=(*x_range, *y_range),
+        origin="lower",
+        aspect="auto",
+        interpolation="nearest",
+    )
+    if label:
+        # legend entry looking like the scatter one
+        ax.scatter([], [], marker=".", s=1, c=color, label=label)
+
+
 def global_to_local_ids(x: PopulationSpikes, hist_logscale=False):
-    old2newid = {oldid: i for i, oldid in enumerate(x.gids)}
-    return np.array([old2newid[i] for i in x.senders])
+    return x.index().local_ids
 
 
 def generate_plot_fig(
@@ -135,6 +200,8 @@ def generate_plot_fig(
     ts_n,
     y_p,
     y_n,
+    counts_p=None,
+    counts_n=None,
 ):
     fig = plt.figure(figsize=(10, 6))
     gs = gridspec.GridSpec(4, 1, height_ratios=[3, 3, 1, 5], hspace=0.065)
@@ -144,13 +211,30 @@ def generate_plot_fig(
     ax[2] = fig.add_subplot(gs[3])
 
     # Raster plot
-    ax[0].scatter(ts_p, y_p, marker=".", s=1, c="r", label="Positive")
+    time_end = time_v[-1] if len(time_v) > 0 else 0
+    plot_raster(
+        ax[0],
+        ts_p,
+        y_p,
+        (0, time_end),
+        (-1, pop_p_data.population_size + 1),
+        "r",
+        label="Positive",
+    )
     ax[0].set_title(title, fontsize=16)
     ax[0].set_ylim(bottom=-1, top=pop_p_data.population_size + 1)
     ax[0].set_xticklabels([])
     ax[0].legend(fontsize=16, loc="lower right")
 
-    ax[1].scatter(ts_n, y_n, marker=".", s=1, c="b", label="Negative")
+    plot_raster(
+        ax[1],
+        ts_n,
+        y_n,
+        (0, time_end),
+        (-(pop_n_data.population_size + 1), 1),
+        "b",
+        label="Negative",
+    )
     ax[1].set_ylim(bottom=-(pop_n_data.population_size + 1), top=1)
     ax[1].legend(fontsize=16, loc="upper right")
 
@@ -189,6 +273,7 @@ def generate_plot_fig(
         pop_p_data.population_size,
         buffer_size,
         ax=ax[2],
+        counts=counts_p,
         color="r",
         label="Positive",
         normalize=False,
@@ -199,6 +284,7 @@ def generate_plot_fig(
         pop_n_data.population_size,
         buffer_size,
         ax=ax[2],
+        counts=counts_n,
         color="b",
         title="PSTH (Hz)",
         label="Negative",
@@ -209,7 +295,6 @@ def generate_plot_fig(
     ax[2].set_ylim(bottom=0, top=max_y + 1)
 
     # Align plot on x-axis
-    time_end = time_v[-1] if len(time_v) > 0 else 0
     for i, axs in enumerate(ax):
         axs.set_xlim(left=0, right=time_end)
     ax[1].tick_params(labelbottom=True)
@@ -237,15 +322,17 @@ def plot_population_paired(
     if t1 is None:
         t1 = time_v[-1]
 
-    mask_p = (pop_p_data.times >= t0) & (pop_p_data.times < t1)
-    mask_n = (pop_n_data.times >= t0) & (pop_n_data.times < t1)
+    win_p = pop_p_data.index().window(t0, t1)
+    win_n = pop_n_data.index().window(t0, t1)
 
-    ts_p = pop_p_data.times[mask_p] - t0
-    ts_n = pop_n_data.times[mask_n] - t0
+    ts_p = pop_p_data.times[win_p] - t0
+    ts_n = pop_n_data.times[win_n] - t0
 
-    y_p = global_to_local_ids(pop_p_data)[mask_p]
-    y_n = -global_to_local_ids(pop_n_data)[mask_n]
+    y_p = global_to_local_ids(pop_p_data)[win_p]
+    y_n = -global_to_local_ids(pop_n_data)[win_n]
 
+    # precomputed counts only cover whole trials
+    whole = t0 == 0 and t1 == time_v[-1]
     fig, ax = generate_plot_fig(
         time_v,
         pop_p_data,
@@ -256,6 +343,8 @@ def plot_population_paired(
         ts_n,
         y_p,
         y_n,
+        counts_p=pop_p_data.binned_counts(buffer_size) if whole else None,
+        counts_n=pop_n_data.binned_counts(buffer_size) if whole else None,
     )
 
     return fig, ax
@@ -275,7 +364,15 @@ def plot_population_single(
 
     fig, ax = plt.subplots(2, 1, sharex=True, figsize=(10, 6))
 
-    ax[0].scatter(pop_data.times, local_ids, marker=".", s=1, c="r")
+    time_end = time_v[-1] if len(time_v) > 0 else 0
+    plot_raster(
+        ax[0],
+        pop_data.times,
+        local_ids,
+        (0, time_end),
+        (0, pop_data.population_size + 1),
+        "r",
+    )
     ax[0].set_ylabel("raster", fontsize=15)
     ax[0].set_title(title, fontsize=16)
     ax[0].set_ylim(bottom=0, top=pop_data.population_size + 1)
@@ -305,6 +402,7 @@ def plot_population_single(
         pop_data.population_size,
         buffer_size,
         ax=ax[1],
+        counts=pop_data.binned_counts(buffer_size),
         color="r",
         title="PSTH (Hz)",
         normalize=False,
@@ -395,14 +493,24 @@ def plot_populations_per_trial(
     return all_trials_imgs
 
 
+class RenderedPlot(NamedTuple):
+    """PNG of a population plot, in memory, and the file it was saved to."""
+
+    png: bytes
+    path: Path
+
+    def image(self) -> Image.Image:
+        return Image.open(io.BytesIO(self.png))
+
+
 def create_collage(
-    plotted: dict[object, tuple[Figure, Axis, Path]],
+    plotted: dict[object, RenderedPlot],
     path_fig: Path,
     label: str = "",
     paired: bool = False,
 ):
 
-    first_img = Image.open(list(plotted.values())[0][2])
+    first_img = list(plotted.values())[0].image()
 
     width, height = first_img.size
     collage = Image.new(
@@ -412,9 +520,9 @@ def create_collage(
     )
     draw = ImageDraw.Draw(collage)
 
-    for i, (pop, (f, a, filepath)) in enumerate(plotted.items()):
+    for i, (pop, rendered) in enumerate(plotted.items()):
         # if pop in trial_dict:
-        img = Image.open(filepath)
+        img = rendered.image()
         collage.paste(img, (0, height * i))
         # else:
         #     draw.rectangle(
@@ -440,7 +548,7 @@ def create_collage(
 
 
 def extract_neural_and_merge(metas: list[ResultMeta]):
-    neural_concat = concatenate_neural_results(metas)
+    neural_concat = LazyNeuralResults(metas)
     ref_mc: MasterParams = metas[0].load_params()
 
     total_sim_duration = sum(
@@ -478,6 +586,7 @@ def plot_overlay(
             pop_data.population_size,
             buffer_sz=15,
             ax=ax,
+            counts=pop_data.binned_counts(15),
             label=plot_name_t,
             normalize=normalize,
         )
@@ -510,52 +619,133 @@ def sizeof_fmt(num, suffix="B"):
     return f"{num:.1f}Yi{suffix}"
 
 
+def draw_section_rates(ax, pop: PopulationSpikes, sim_params: SimulationParams, color):
+    """
+    Draws the mean rate of `pop` in each trial section (see SpikeRates) as a
+    dotted segment over the section, for the trials with precomputed rates.
+    """
+    offset = 0.0
+    for rates in pop.rates or []:
+        for start, end, section, _ in get_trial_phase_boundaries(sim_params, offset):
+            rate = rates.section_rates_hz.get(section.name)
+            if rate is not None:
+                ax.hlines(rate, start, end, colors=color, linestyles=":", linewidth=1.5)
+        offset += rates.duration_ms
+
+
+def _render_population(
+    time_vect: np.ndarray,
+    pops: tuple[PopulationSpikes, ...],
+    title: str,
+    sim_params: SimulationParams,
+    num_trials: int,
+) -> bytes:
+    """
+    Renders the plot of a single population, or of a (p, n) pair, to PNG,
+    with the mean rate of every trial section over the PSTH.
+    """
+    if len(pops) == 2:
+        fig, ax = plot_population_paired(time_vect, *pops, title=title, buffer_size=15)
+        draw_trial_phases(ax, sim_params, num_trials=num_trials)
+        draw_section_rates(ax[2], pops[0], sim_params, "r")
+        draw_section_rates(ax[2], pops[1], sim_params, "b")
+    else:
+        fig, ax = plot_population_single(
+            time_vect, pops[0], title=title, buffer_size=15
+        )
+        draw_trial_phases(list(ax), sim_params, num_trials=num_trials)
+        draw_section_rates(ax[1], pops[0], sim_params, "r")
+    buf = io.BytesIO()
+    fig.savefig(buf, format=FIGURE_EXT)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+# results the populations are read from, set per process by _init_render_worker
+_render_results: LazyNeuralResults | None = None
+
+
+def _init_render_worker(neural_concat: LazyNeuralResults | None):
+    global _render_results
+    _render_results = neural_concat
+
+
+def _render_task(
+    names: tuple[str, ...],
+    time_vect: np.ndarray,
+    title: str,
+    sim_params: SimulationParams,
+    num_trials: int,
+) -> bytes:
+    """Reads (concatenates) the populations `names` and renders them."""
+    pops = tuple(_render_results.get_pop(name) for name in names)
+    return _render_population(time_vect, pops, title, sim_params, num_trials)
+
+
 def merge_and_plot(
     metas: list[ResultMeta],
     pops_single=POPS_SINGLE,
     pops_paired=POPS_PAIRED,
     path_fig=None,
-):
+    workers: int | None = None,
+) -> dict[object, RenderedPlot]:
+    """
+    Plots the given populations, concatenated over `metas`, and saves each
+    plot to `path_fig`. Plots are rendered in parallel by `workers` processes
+    (default: one per core; 1 renders in this process), each of which reads
+    and concatenates the populations it plots. Returns the rendered plots by
+    population (pair).
+    """
     neural_concat, ref_mc, time_vect = extract_neural_and_merge(metas)
     path_fig = path_fig or ref_mc.run_paths.figures
     if not ref_mc.USE_CEREBELLUM:
         pops_single = POPS_SINGLE_NO_CEREB
         pops_paired = POPS_PAIRED_NO_CEREB
 
-    plotted = {}
+    # population names only: spikes are read where they are plotted
+    tasks = {}
     for pair in pops_paired:
-        fig, ax = plot_population_paired(
-            time_vect,
-            neural_concat.get_pop(pair[0]),
-            neural_concat.get_pop(pair[1]),
-            title=f"{pair[0].replace('_', ' ').title()}",
-            buffer_size=15,
-        )
-        draw_trial_phases(ax, ref_mc.simulation, num_trials=len(metas))
-
-        fig.savefig(filepath := path_fig / f"{pair[0]}.{FIGURE_EXT}")
-        _log.debug(f"Saved plot at {filepath}")
-        plt.close(fig)
-
-        plotted[pair] = (fig, ax, filepath)
+        if not (neural_concat.has_pop(pair[0]) and neural_concat.has_pop(pair[1])):
+            _log.debug(f"Skipping {pair}: not recorded")
+            continue
+        tasks[pair] = (pair[0], tuple(pair))
 
     for pop in pops_single:
-        plot_name = pop
-        _log.debug(f"Plotting for {plot_name}...")
-
-        fig, ax = plot_population_single(
-            time_vect,
-            neural_concat.get_pop(pop),
-            title=f"{plot_name.replace('_', ' ').title()}",
-            buffer_size=15,
-        )
-        draw_trial_phases(list(ax), ref_mc.simulation, num_trials=len(metas))
+        if not neural_concat.has_pop(pop):
+            _log.debug(f"Skipping {pop}: not recorded")
+            continue
+        tasks[pop] = (pop, (pop,))
+
+    def render_args(name, names):
+        title = name.replace("_", " ").title()
+        return names, time_vect, title, ref_mc.simulation, len(metas)
+
+    if workers == 1 or len(tasks) <= 1:
+        _init_render_worker(neural_concat)
+        try:
+            pngs = {k: _render_task(*render_args(*t)) for k, t in tasks.items()}
+        finally:
+            _init_render_worker(None)
+    else:
+        # fork: as for collapsing, workers only need already imported code, and
+        # inherit the (still empty) lazy results instead of pickled spikes
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_render_worker,
+            initargs=(neural_concat,),
+        ) as pool:
+            futures = {
+                k: pool.submit(_render_task, *render_args(*t)) for k, t in tasks.items()
+            }
+            pngs = {k: f.result() for k, f in futures.items()}
 
-        fig.savefig(filepath := path_fig / f"{plot_name}.{FIGURE_EXT}")
+    plotted = {}
+    for key, (name, _) in tasks.items():
+        filepath = path_fig / f"{name}.{FIGURE_EXT}"
+        filepath.write_bytes(pngs[key])
         _log.debug(f"Saved plot at {filepath}")
-        plt.close(fig)
-
-        plotted[pop] = (fig, ax, filepath)
+        plotted[key] = RenderedPlot(pngs[key], filepath)
     return plotted
 
 
@@ -7,16 +7,194 @@ __license__ = "GPL"
 __version__ = "1.0.1"
 
 
+import zlib
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import structlog
+from config.core_models import (
+    RecordingBackend,
+    RecordingParams,
+    RecordingPolicy,
+    RecordingPolicyMode,
+    SimulationParams,
+)
 from neural.nest_adapter import nest
-from neural.neural_models import PopulationSpikes, RecordingManifest
+from neural.neural_models import PopulationSpikes, PopulationSpikesRef, SpikeRates
+from utils_common.utils import TrialSection, get_trial_phase_boundaries
 
 _log = structlog.get_logger(__name__)
 
+# backend and per-label policies used by labelled (to_file) PopViews;
+# set once per run by configure_recording
+_recording_params = RecordingParams()
+_sampling_seed = 0
+# trial duration and section windows of the spike counts saved at collapse
+_trial_duration_ms: float | None = None
+_trial_sections: dict[str, tuple[float, float]] = {}
+
+# record layout of the binary files written by SpikeBuffer
+SPIKE_RECORD_DTYPE = np.dtype([("senders", np.int64), ("times", np.float64)])
+SPIKE_STREAM_SUFFIX = ".spk"
+
+
+def configure_recording(
+    params: RecordingParams, seed: int = 0, sim_params: SimulationParams | None = None
+):
+    """
+    Selects the recording backend and policies for PopViews created from now on.
+    `seed` drives the choice of neurons of SAMPLED populations. With
+    `sim_params`, collapsed populations also get their spike counts binned
+    over the trial (see SpikeRates).
+    """
+    global _recording_params, _sampling_seed, _trial_duration_ms, _trial_sections
+    for label, policy in params.populations.items():
+        unknown = [s for s in policy.sections if s not in TrialSection.__members__]
+        if unknown:
+            raise ValueError(f"Unknown trial sections for '{label}': {unknown}")
+    _recording_params = params
+    _sampling_seed = seed
+    if sim_params is not None:
+        _trial_duration_ms = sim_params.duration_ms
+        _trial_sections = {
+            section.name: (start, end)
+            for start, end, section, _ in get_trial_phase_boundaries(sim_params)
+        }
+
+
+class SpikeBuffer:
+    """
+    Preallocated, growable buffer of spike events, streamed to a binary file of
+    SPIKE_RECORD_DTYPE records. Events are appended in memory and written out
+    whenever `capacity` would be exceeded, or on `flush`.
+    """
+
+    def __init__(self, path: Path, capacity: int = 1 << 18):
+        self.path = path
+        self.capacity = capacity
+        self._data = np.empty(capacity, dtype=SPIKE_RECORD_DTYPE)
+        self._size = 0
+        # truncate leftovers from a previous run, like NEST's overwrite_files
+        open(self.path, "wb").close()
+
+    def __len__(self):
+        return self._size
+
+    def append(self, senders: np.ndarray, times: np.ndarray):
+        n = len(senders)
+        if self._size + n > self.capacity:
+            self.flush()
+        if n > len(self._data):
+            self._data = np.empty(n, dtype=SPIKE_RECORD_DTYPE)
+        self._data["senders"][self._size : self._size + n] = senders
+        self._data["times"][self._size : self._size + n] = times
+        self._size += n
+
+    def flush(self):
+        if self._size == 0:
+            return
+        with open(self.path, "ab") as f:
+            self._data[: self._size].tofile(f)
+        self._size = 0
+
+
+def read_spike_stream_file(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Reads a file written by SpikeBuffer into (senders, times) columns."""
+    records = np.fromfile(path, dtype=SPIKE_RECORD_DTYPE)
+    return records["senders"].copy(), records["times"].copy()
+
+
+def read_ascii_spike_file(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    """Parses a single NEST ascii recorder file into (senders, times) columns."""
+    try:
+        df = pd.read_csv(
+            path,
+            sep="\t",
+            comment="#",
+            usecols=[0, 1],
+            dtype={0: np.int64, 1: np.float64},
+            engine="c",
+        )
+    except pd.errors.EmptyDataError:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    return df.iloc[:, 0].to_numpy(), df.iloc[:, 1].to_numpy()
+
+
+def merge_spike_files(files: list[Path]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merges per-rank/per-thread recorder files (NEST ascii or SpikeBuffer streams)
+    into a single set of unique spike events, sorted by time (and by sender
+    within the same time).
+
+    Returns
+    -------
+    senders, times
+    """
+    columns = [
+        (
+            read_spike_stream_file(f)
+            if f.suffix == SPIKE_STREAM_SUFFIX
+            else read_ascii_spike_file(f)
+        )
+        for f in files
+    ]
+    senders = np.concatenate([np.empty(0, dtype=np.int64)] + [c[0] for c in columns])
+    times = np.concatenate([np.empty(0, dtype=np.float64)] + [c[1] for c in columns])
+
+    order = np.lexsort((senders, times))
+    senders, times = senders[order], times[order]
+    # the same event can be written by more than one recorder file
+    unique = np.ones(len(senders), dtype=bool)
+    unique[1:] = (senders[1:] != senders[:-1]) | (times[1:] != times[:-1])
+    return senders[unique], times[unique]
+
+
+def collapse_population(
+    dir: Path, label: str, gids, neuron_model: str, time_offset_ms: float = 0.0
+) -> PopulationSpikesRef:
+    """
+    Merges the recorder files of population `label` found in `dir` into binary
+    columns and deletes them. Spike times are saved relative to
+    `time_offset_ms`, the NEST time at which the trial started. Binned spike
+    counts are saved along, if configure_recording was given the trial
+    timing. Does not touch NEST, so it can be run in a worker process.
+    """
+    file_list = [
+        i
+        for i in dir.iterdir()
+        if i.is_file()
+        and i.name.startswith(label)
+        and i.suffix not in (".json", ".npy", ".npz")
+    ]
+    senders, times = merge_spike_files(file_list)
+    if time_offset_ms:
+        times -= time_offset_ms
+
+    pop_spikes = PopulationSpikes(
+        label=label,
+        gids=np.array(gids),
+        senders=senders,
+        times=times,
+        population_size=len(gids),
+        neuron_model=neuron_model,
+    )
+
+    rates = None
+    if _trial_duration_ms is not None and _recording_params.rate_bin_widths_ms:
+        rates = SpikeRates.save(
+            times,
+            len(gids),
+            dir / f"{label}.rates.npz",
+            _trial_duration_ms,
+            _recording_params.rate_bin_widths_ms,
+            _trial_sections,
+        )
+    recording = PopulationSpikesRef.save(pop_spikes, dir, rates)
+    for f in file_list:
+        f.unlink()
+    return recording
+
 
 ############################ POPULATION VIEW #############################
 class PopView:
@@ -25,6 +203,18 @@ class PopView:
         self._label = label if label else None
         self._to_file = to_file
         self._detector_initialized = False
+        self.recording: PopulationSpikesRef | None = None
+        self.stream: SpikeBuffer | None = None
+        self.policy = RecordingPolicy()
+        # sections in which the recorder is active; None means always
+        self.sections: set[TrialSection] | None = None
+        self._section_active = True
+        # NEST time at which the current trial started
+        self.time_offset_ms = 0.0
+
+        self.neuron_model = nest.GetStatus(pop, "model")[0]
+        self.gids = nest.GetStatus(pop, "global_id")
+        self.recorded_gids = self.gids
 
         if to_file and label:
             self._initialize_detector(label)
@@ -34,17 +224,43 @@ class PopView:
         else:  # to_file=False
             self.detector = self._create_connect_spike_detector(pop)
 
-        self.neuron_model = nest.GetStatus(pop, "model")[0]
-        self.gids = nest.GetStatus(pop, "global_id")
-
     def _initialize_detector(self, label):
-        param_file = {"record_to": "ascii", "label": label}
-        self.detector = self._create_connect_spike_detector(self.pop, **param_file)
-        # nest will create file(s) for this recorder and write the names to
-        # self.detector.get("filenames"); once data is collapsed to a single file
-        # for usability, this property will hold the filename
-        self.filepath: Path | None = None
+        self.policy = _recording_params.policy(label)
         self._detector_initialized = True
+        if self.policy.mode == RecordingPolicyMode.OFF:
+            self.detector = None
+            return
+
+        recorded = self.pop
+        if (
+            self.policy.mode == RecordingPolicyMode.SAMPLED
+            and self.policy.n_sampled < len(self.gids)
+        ):
+            rng = np.random.default_rng([_sampling_seed, zlib.crc32(label.encode())])
+            idx = np.sort(
+                rng.choice(len(self.gids), self.policy.n_sampled, replace=False)
+            )
+            recorded = self.pop[idx.tolist()]
+            self.recorded_gids = tuple(np.asarray(self.gids)[idx].tolist())
+
+        backend = _recording_params.backend
+        param_file = {"record_to": backend.value, "label": label}
+        if self.policy.mode == RecordingPolicyMode.SECTIONS:
+            self.sections = {TrialSection[s] for s in self.policy.sections}
+            # stays off until apply_section enters one of the sections
+            param_file["stop"] = 0.0
+            self._section_active = False
+        self.detector = self._create_connect_spike_detector(recorded, **param_file)
+        if backend == RecordingBackend.MEMORY:
+            # events are moved from the recorder to this stream by `drain`
+            data_path = Path(nest.GetKernelStatus("data_path"))
+            self.stream = SpikeBuffer(
+                data_path / f"{label}-{nest.Rank()}{SPIKE_STREAM_SUFFIX}"
+            )
+        # with ascii, nest will create file(s) for this recorder and write the names
+        # to self.detector.get("filenames"); once data is collapsed to binary columns,
+        # this property will hold the reference to them
+        self.recording = None
 
     @property
     def label(self):
@@ -57,49 +273,60 @@ class PopView:
         if self._to_file and not self._detector_initialized and value:
             self._initialize_detector(value)
 
+    def apply_section(self, section: TrialSection, t_ms: float):
+        """Starts or stops a SECTIONS recorder when the trial enters `section` at `t_ms`."""
+        if self.sections is None:
+            return
+        active = section in self.sections
+        if active == self._section_active:
+            return
+        if active:
+            nest.SetStatus(self.detector, {"start": t_ms, "stop": np.inf})
+        else:
+            nest.SetStatus(self.detector, {"stop": t_ms})
+        self._section_active = active
+
+    def start_trial(self, time_offset_ms: float):
+        """
+        Starts recording a new trial of a chain at NEST time `time_offset_ms`:
+        memory streams are reopened in the current kernel data_path (ascii
+        recorders follow it on their own at nest.Prepare).
+        """
+        self.time_offset_ms = time_offset_ms
+        self.recording = None
+        if self.stream is not None:
+            data_path = Path(nest.GetKernelStatus("data_path"))
+            self.stream = SpikeBuffer(data_path / self.stream.path.name)
+
+    def drain(self):
+        """Moves the events of a memory recorder to the stream and clears it."""
+        if self.stream is None:
+            return
+        events = self.detector.get("events")
+        if len(events["times"]):
+            self.stream.append(events["senders"], events["times"])
+            self.detector.n_events = 0
+
+    def flush(self):
+        """Drains the recorder and writes all buffered events to disk."""
+        if self.stream is None:
+            return
+        self.drain()
+        self.stream.flush()
+
     def collect(self, dir: Path, comm=None):
+        if self.policy.mode == RecordingPolicyMode.OFF:
+            return None
+        self.flush()
         if comm is None or nest.Rank() == 0:
-            name = self.label
-            file_list = [
-                i
-                for i in dir.iterdir()
-                if i.name.startswith(name) and i.suffix != ".json"
-            ]
-            senders = []
-            times = []
-            combined_data = []
-
-            for f in file_list:
-                with open(dir / f, "r") as fd:
-                    lines = fd.readlines()
-                    for line in lines:
-                        if line.startswith("#") or line.startswith("sender"):
-                            continue
-                        combined_data.append(line.strip())
-            unique_lines = list(set(combined_data))
-
-            for line in unique_lines:
-                sender, time = line.split()
-                senders.append(int(sender))
-                times.append(float(time))
-
-            pop_spikes = PopulationSpikes(
-                label=name,
-                gids=np.array(self.gids),
-                senders=np.array(senders),
-                times=np.array(times),
-                population_size=len(self.gids),
-                neuron_model=self.neuron_model,
+            self.recording = collapse_population(
+                dir,
+                self.label,
+                self.recorded_gids,
+                self.neuron_model,
+                self.time_offset_ms,
             )
-
-            complete_file = dir / (name + ".json")
-            with open(complete_file, "w") as wfd:
-                wfd.write(pop_spikes.model_dump_json(indent=4))
-
-            self.filepath = complete_file
-            for f in file_list:
-                f.unlink()
-            return pop_spikes
+            return self.recording
         else:
             return None
 
@@ -113,49 +340,28 @@ class PopView:
         nest.Connect(self.pop, other.pop, rule, syn_spec={"weight": w, "delay": d})
 
     def get_spike_events(self):
+        if self.recording:
+            spikes = self.recording.load()
+            return spikes.senders, spikes.times
+
         spike_detector = self.detector
         # Get metadata about the recorder
         metadata = nest.GetStatus(spike_detector)
 
         if metadata.get("record_to") == "memory":
+            if self.stream is not None:
+                # part of the events has already been drained to disk
+                raise NotImplementedError(
+                    "not ready to handle non-collapsed objects..."
+                )
             dSD = nest.GetStatus(spike_detector, "events")
             evs = dSD["senders"]
             ts = dSD["times"]
             return evs, ts
 
         elif metadata.get("record_to") == "ascii":
-            if not self.filepath:
-                # assume collapse hasn't been called yet
-                raise NotImplementedError(
-                    "not ready to handle non-collapsed objects..."
-                )
-                # if not metadata.get("filenames"):
-                #     return [], []
-                # filepath = Path(metadata.get("filenames")[0])
-            else:
-                filepath = self.filepath
-
-            # Check if the file exists
-            if not filepath.exists():
-                raise FileNotFoundError(
-                    f"Recording file not found: {filepath}\nDid you call simulate()?"
-                )
-
-            # Read the file (skip the first two lines which are comments)
-            df = pd.read_csv(filepath, sep="\t", comment="#")
-
-            # Extract senders and times (convert ms to ms if time_in_steps is False)
-            evs = df["sender"].values
-
-            # Check if times are in milliseconds or steps
-            if "time_ms" in df.columns:
-                ts = df["time_ms"].values
-            elif "time_step" in df.columns:
-                ts = df["time_step"].values
-            else:
-                raise ValueError("Cannot find time column in the recording file")
-
-            return evs, ts
+            # assume collapse hasn't been called yet
+            raise NotImplementedError("not ready to handle non-collapsed objects...")
 
         else:
             raise NotImplementedError(
@@ -1,10 +1,28 @@
+import json
+from functools import lru_cache
 from pathlib import Path
 
 from neural.CerebellumHandlerPopulations import CerebellumHandlerPopulationsRecordings
 from neural.CerebellumPopulations import CerebellumPopulationsRecordings
 from neural.ControllerPopulations import ControllerPopulationsRecordings
-from neural.neural_models import PopulationSpikes
-from pydantic import BaseModel
+from neural.neural_models import (
+    PopulationSpikes,
+    StoredPopulationSpikes,
+    load_population_spikes,
+)
+from pydantic import BaseModel, TypeAdapter
+
+# decoded populations kept in memory by lazy manifests
+POP_CACHE_SIZE = 8
+
+# result partitions, in the order get_pop looks populations up
+RESULT_PARTITIONS = {
+    "controller": ControllerPopulationsRecordings,
+    "cerebellum": CerebellumPopulationsRecordings,
+    "cerebellum_handler": CerebellumHandlerPopulationsRecordings,
+}
+
+_stored_pop = TypeAdapter(StoredPopulationSpikes | None)
 
 
 class NeuralResultManifest(BaseModel):
@@ -12,6 +30,8 @@ class NeuralResultManifest(BaseModel):
     cerebellum: CerebellumPopulationsRecordings | None
     cerebellum_handler: CerebellumHandlerPopulationsRecordings | None
     weights: list[Path] | list[list[Path]] | None
+    # chain-level weight store this run's weights were appended to
+    weight_history: Path | None = None
     use_cerebellum: bool
 
     def get_pop(self, pop_name: str | None) -> PopulationSpikes | None:
@@ -19,12 +39,71 @@ class NeuralResultManifest(BaseModel):
             return None
 
         if hasattr(self.controller, pop_name):
-            return getattr(self.controller, pop_name)
+            return load_population_spikes(getattr(self.controller, pop_name))
 
         if self.cerebellum and hasattr(self.cerebellum, pop_name):
-            return getattr(self.cerebellum, pop_name)
+            return load_population_spikes(getattr(self.cerebellum, pop_name))
 
         if self.cerebellum_handler and hasattr(self.cerebellum_handler, pop_name):
-            return getattr(self.cerebellum_handler, pop_name)
+            return load_population_spikes(getattr(self.cerebellum_handler, pop_name))
+
+        raise ValueError(f"Population '{pop_name}' not found in any result partition.")
+
+
+class LazyNeuralResultManifest:
+    """
+    NeuralResultManifest whose populations are only validated (and, for
+    manifests with embedded arrays, decoded) when `get_pop` asks for them.
+    Everything else (weights, weight_history, use_cerebellum) is available as
+    soon as the manifest is opened. The last `cache_size` populations are kept.
+    """
+
+    def __init__(self, path: Path, cache_size: int = POP_CACHE_SIZE):
+        self.path = Path(path)
+        with open(self.path, "r") as f:
+            raw = json.load(f)
+        self._partitions = {name: raw.get(name) for name in RESULT_PARTITIONS}
+        # validate the metadata only: partitions are left empty
+        self.meta = NeuralResultManifest.model_validate(
+            {
+                **raw,
+                **{k: None if v is None else {} for k, v in self._partitions.items()},
+            }
+        )
+        self.get_pop = lru_cache(maxsize=cache_size)(self._get_pop)
+
+    @property
+    def weights(self) -> list[Path] | list[list[Path]] | None:
+        return self.meta.weights
+
+    @property
+    def weight_history(self) -> Path | None:
+        return self.meta.weight_history
+
+    @property
+    def use_cerebellum(self) -> bool:
+        return self.meta.use_cerebellum
+
+    def has_pop(self, pop_name: str | None) -> bool:
+        """Whether `pop_name` was recorded, without decoding it."""
+        if not pop_name:
+            return False
+
+        for name, recordings in RESULT_PARTITIONS.items():
+            partition = self._partitions[name]
+            if partition is not None and pop_name in recordings.model_fields:
+                return partition.get(pop_name) is not None
+
+        raise ValueError(f"Population '{pop_name}' not found in any result partition.")
+
+    def _get_pop(self, pop_name: str | None) -> PopulationSpikes | None:
+        if not pop_name:
+            return None
+
+        for name, recordings in RESULT_PARTITIONS.items():
+            partition = self._partitions[name]
+            if partition is not None and pop_name in recordings.model_fields:
+                stored = _stored_pop.validate_python(partition.get(pop_name))
+                return load_population_spikes(stored)
 
         raise ValueError(f"Population '{pop_name}' not found in any result partition.")
@@ -0,0 +1,228 @@
+"""
+Chain-level store of the plastic weights of all trials of a chain.
+
+The first trial (and every `keyframe_every`-th one) is stored in full; the
+other trials only store the synapses whose weight changed since the previous
+trial, optionally quantized. Synapses are kept in a fixed (source, target,
+port) order, so any trial's weights can be rebuilt from the last keyframe and
+whole-chain time series are read in a single pass.
+
+    <history>/index.json
+    <history>/<projection>/keys.npy
+    <history>/<projection>/trial-<i>.npz
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import structlog
+from pydantic import BaseModel
+
+from .neural_models import (
+    SYNAPSE_WEIGHT_DTYPE,
+    WEIGHT_CHECKPOINT_SUFFIX,
+    SynapseWeights,
+    iter_weight_shards,
+    save_weight_checkpoint,
+)
+
+_log = structlog.get_logger(__name__)
+
+HISTORY_INDEX = "index.json"
+HISTORY_KEY_DTYPE = np.dtype(
+    [
+        ("source", np.int64),
+        ("target", np.int64),
+        ("model_id", np.uint16),
+        ("port", np.uint32),
+    ]
+)
+
+
+class ProjectionHistory(BaseModel):
+    source_pop_label: str
+    target_pop_label: str
+    synapse_models: list[str]
+    n_synapses: int
+
+
+class WeightHistoryIndex(BaseModel):
+    run_ids: list[str] = []
+    quantum: float | None = None
+    keyframe_every: int = 50
+    projections: dict[str, ProjectionHistory] = {}
+
+
+class WeightHistory:
+    def __init__(
+        self, path: Path, quantum: float | None = None, keyframe_every: int = 50
+    ):
+        """
+        Opens the history in `path`, or prepares a new one with the given
+        `quantum` and `keyframe_every` (ignored for existing histories).
+        """
+        self.path = Path(path)
+        index = self.path / HISTORY_INDEX
+        if index.exists():
+            with open(index, "r") as f:
+                self.index = WeightHistoryIndex.model_validate_json(f.read())
+        else:
+            self.index = WeightHistoryIndex(
+                quantum=quantum, keyframe_every=keyframe_every
+            )
+
+    @property
+    def run_ids(self) -> list[str]:
+        return self.index.run_ids
+
+    def __len__(self):
+        return len(self.index.run_ids)
+
+    def trial_of(self, trial: int | str) -> int:
+        """Position in the chain of `trial`, given as position or run id."""
+        if isinstance(trial, str):
+            # run ids may be given without their label, as for parent ids
+            ids = [r.partition("-")[0] for r in self.index.run_ids]
+            return ids.index(trial.partition("-")[0])
+        return range(len(self))[trial]
+
+    def keys(self, projection: str) -> np.ndarray:
+        """HISTORY_KEY_DTYPE columns of the synapses, in the order of every weight vector."""
+        return np.load(self.path / projection / "keys.npy", mmap_mode="r")
+
+    def append(self, run_id: str, checkpoints: list[Path]):
+        """Adds the weights of the checkpoints saved by `run_id` as the next trial."""
+        trial = len(self)
+        for ckpt in checkpoints:
+            projection = Path(ckpt).name.removesuffix(WEIGHT_CHECKPOINT_SUFFIX)
+            keys, weights = self._read_checkpoint(projection, Path(ckpt))
+            out = self.path / projection / f"trial-{trial}.npz"
+            out.parent.mkdir(parents=True, exist_ok=True)
+
+            if trial == 0:
+                np.save(self.path / projection / "keys.npy", keys)
+            elif not np.array_equal(keys, self.keys(projection)):
+                raise ValueError(f"{projection}: synapses differ from the chain's")
+
+            if trial % self.index.keyframe_every == 0:
+                np.savez(out, weights=weights)
+                continue
+            previous = self.weights(projection, trial - 1)
+            diff = weights - previous
+            quantum = self.index.quantum
+            if quantum:
+                steps = np.round(diff / quantum)
+                idx = np.flatnonzero(steps)
+                steps = steps[idx]
+                dtype = np.int16 if np.abs(steps).max(initial=0) < 2**15 else np.int32
+                np.savez(out, idx=idx.astype(np.uint32), steps=steps.astype(dtype))
+            else:
+                idx = np.flatnonzero(diff)
+                np.savez(out, idx=idx.astype(np.uint32), values=weights[idx])
+            _log.debug(f"{projection}: {len(idx)}/{len(weights)} weights changed")
+
+        self.index.run_ids.append(run_id)
+        self._write_index()
+
+    def weights(self, projection: str, trial: int | str) -> np.ndarray:
+        """Full weight vector of `trial`, in the order of `keys`."""
+        trial = self.trial_of(trial)
+        start = trial - trial % self.index.keyframe_every
+        with np.load(self.path / projection / f"trial-{start}.npz") as keyframe:
+            weights = keyframe["weights"].copy()
+        for t in range(start + 1, trial + 1):
+            self._apply(projection, t, weights)
+        return weights
+
+    def series(self, projection: str, synapses=None) -> np.ndarray:
+        """
+        Weights of `synapses` (positions in `keys`, default: all) over the
+        whole chain, as a (trials, synapses) array.
+        """
+        n = self.index.projections[projection].n_synapses
+        sel = np.arange(n) if synapses is None else np.asarray(synapses)
+        # deltas address synapses by position: map them to columns of `sel`
+        lookup = np.full(n, -1, dtype=np.int64)
+        lookup[sel] = np.arange(len(sel))
+
+        out = np.empty((len(self), len(sel)), dtype=np.float64)
+        current = np.empty(len(sel), dtype=np.float64)
+        for t in range(len(self)):
+            with np.load(self.path / projection / f"trial-{t}.npz") as data:
+                if "weights" in data:
+                    current[:] = data["weights"][sel]
+                else:
+                    cols = lookup[data["idx"]]
+                    hit = cols >= 0
+                    if "steps" in data:
+                        current[cols[hit]] += data["steps"][hit] * self.index.quantum
+                    else:
+                        current[cols[hit]] = data["values"][hit]
+            out[t] = current
+        return out
+
+    def export_checkpoint(self, projection: str, trial: int | str, path: Path):
+        """
+        Writes the weights of `trial` back as a weight checkpoint in `path`.
+        The checkpoint is written aside and renamed into place, so concurrent
+        exports (e.g. one per MPI rank) never expose a partial checkpoint; the
+        first one to finish wins.
+        """
+        meta = self.index.projections[projection]
+        keys = self.keys(projection)
+        synapses = np.zeros(len(keys), dtype=SYNAPSE_WEIGHT_DTYPE)
+        for k in HISTORY_KEY_DTYPE.names:
+            synapses[k] = keys[k]
+        synapses["weight"] = self.weights(projection, trial)
+        block = SynapseWeights(
+            meta.source_pop_label, meta.target_pop_label, synapses, meta.synapse_models
+        )
+        # unique even across the nodes of a shared file system
+        tmp = Path(tempfile.mkdtemp(prefix=f"{path.name}.tmp-", dir=path.parent))
+        save_weight_checkpoint(tmp, block)
+        try:
+            tmp.rename(path)
+        except OSError:
+            # exported by another process in the meantime
+            shutil.rmtree(tmp)
+
+    def _read_checkpoint(self, projection: str, ckpt: Path):
+        shards = list(iter_weight_shards(ckpt))
+        synapses = np.concatenate([s for s, _ in shards])
+        models = shards[0][1] if shards else []
+        meta = self.index.projections.get(projection)
+        if meta is None:
+            source, _, target = projection.partition(">")
+            meta = ProjectionHistory(
+                source_pop_label=source,
+                target_pop_label=target,
+                synapse_models=models,
+                n_synapses=len(synapses),
+            )
+            self.index.projections[projection] = meta
+
+        keys = np.empty(len(synapses), dtype=HISTORY_KEY_DTYPE)
+        for k in HISTORY_KEY_DTYPE.names:
+            keys[k] = synapses[k]
+        if models != meta.synapse_models:
+            remap = np.array([meta.synapse_models.index(m) for m in models])
+            keys["model_id"] = remap[keys["model_id"]]
+        order = np.lexsort((keys["port"], keys["target"], keys["source"]))
+        return keys[order], np.asarray(synapses["weight"], dtype=np.float64)[order]
+
+    def _apply(self, projection: str, trial: int, weights: np.ndarray):
+        with np.load(self.path / projection / f"trial-{trial}.npz") as data:
+            if "steps" in data:
+                weights[data["idx"]] += data["steps"] * self.index.quantum
+            else:
+                weights[data["idx"]] = data["values"]
+
+    def _write_index(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f"{HISTORY_INDEX}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.index.model_dump_json(indent=2))
+        os.replace(tmp, self.path / HISTORY_INDEX)
@@ -1,16 +1,24 @@
 import os
 import random
+import shutil
 import sys
 import time
 from pathlib import Path
 
 import numpy as np
 import structlog
-from config.core_models import SimulationParams
+from config.core_models import CollapseMode, RecordingBackend, SimulationParams
 from config.MasterParams import MasterParams
 from config.module_params import TrajGeneratorType
 from neural.Controller import Controller
+from neural.data_handling import collapse_files, save_conn_weights
 from neural.nest_adapter import nest
+from neural.population_view import configure_recording
+from neural.result_models import NeuralResultManifest
+from neural.weight_history import WeightHistory
+from utils_common.profile import Profile
+from utils_common.results import read_parent_neural
+from utils_common.utils import TrialChain
 
 
 # --- Configuration and Setup ---
@@ -57,6 +65,9 @@ def setup_nest_kernel(
 
     nest.SetKernelStatus(kernel_params)
     nest.set_verbosity("M_ERROR")
+    configure_recording(
+        master_params.recording, simulation_config.seed, simulation_config
+    )
     log.info(
         f"NEST Kernel: Resolution: {nest.GetKernelStatus('resolution')}ms, Seed: {nest.GetKernelStatus('rng_seed')}, Data path: {nest.GetKernelStatus('data_path')}"
     )
@@ -67,6 +78,7 @@ def setup_nest_kernel(
 def create_controller(
     master_config: MasterParams,
     comm=None,  # if comm is None, Cerebellum will be loaded without MPI
+    chain: TrialChain = None,  # trials to build the network for (default: one)
 ) -> Controller:
     log = structlog.get_logger("main.network_construction")
     module_params = master_config.modules
@@ -79,9 +91,10 @@ def create_controller(
     log.info(f"Using {njt} DoF based on PlantConfig.")
     log.info("Input data (trajectory, motor_commands) generated.", dof=njt)
 
+    chain = chain or TrialChain.from_params(master_config)
     res = master_config.simulation.resolution
     time_span_per_trial = master_config.simulation.duration_ms
-    total_sim_duration = master_config.simulation.duration_ms
+    total_sim_duration = time_span_per_trial + chain.offset_ms(chain.n_trials - 1)
 
     total_time_vect_concat = np.linspace(
         0,
@@ -120,5 +133,152 @@ def create_controller(
         comm=comm,
         use_cerebellum=master_config.USE_CEREBELLUM,
         cerebellum_paths=master_config.bsb_config_paths,
+        chain=chain,
     )
     return controller
+
+
+class NeuralLoop:
+    """
+    Co-simulation window update and end-of-run saving of the neural side, shared
+    by the NRP neural engine and the in-process runner.
+    """
+
+    def __init__(self, controller: Controller, master_config: MasterParams, log=None):
+        self.controller = controller
+        self.master_config = master_config
+        self.log = log or structlog.get_logger("neural_loop")
+        self.step = 0
+        self.sensory_profile = Profile()
+        self.sim_profile = Profile()
+        self.motor_profile = Profile()
+        self.drain_profile = Profile()
+
+    def run_window(
+        self, joint_pos_rad: list[float], sim_time_s: float
+    ) -> list[tuple[float, float]]:
+        """
+        Feeds the joint positions of one window, advances the network through it
+        and returns one (pos, neg) motor command per step.
+        """
+        n_steps = self.master_config.simulation.window_steps(self.step)
+        joint_pos_rad = list(joint_pos_rad)[:n_steps]
+        # whether a multiple of 50 steps falls in this window
+        log_window = self.step % 50 < n_steps
+        if log_window:
+            self.log.debug("[neural] starting neural update...")
+
+        with self.sensory_profile.time():
+            self.controller.update_sensory_window_from_NRP(
+                joint_pos_rad, sim_time_s * 1000
+            )
+
+        if log_window:
+            self.log.debug("[neural] updated sensory info")
+
+        with self.sim_profile.time():
+            timestep = self.master_config.simulation.resolution
+            self.controller.run_simulation_window(n_steps, timestep, sim_time_s)
+
+        if log_window:
+            self.log.debug("[neural] simulated or skipped")
+
+        rec_params = self.master_config.recording
+        if (
+            rec_params.backend == RecordingBackend.MEMORY
+            and self.step % rec_params.drain_every_steps < n_steps
+        ):
+            with self.drain_profile.time():
+                self.controller.drain_recorders()
+
+        with self.motor_profile.time():
+            commands = self.controller.extract_motor_window_NRP(n_steps)
+
+        if log_window:
+            pos, neg = commands[-1]
+            self.log.debug(
+                f"[neural] Update {self.step} complete.",
+                sim_time=sim_time_s,
+                rate_pos=int(pos),
+                rate_neg=int(neg),
+                angle=joint_pos_rad[-1],
+                time_sensory=str(self.sensory_profile.total_time),
+                time_sim=str(self.sim_profile.total_time),
+                time_motor=str(self.motor_profile.total_time),
+            )
+        self.step += n_steps
+        return commands
+
+    def save_results(self) -> NeuralResultManifest:
+        """Saves plastic weights and spike recordings, and writes the neural result manifest."""
+        self.log.info(
+            f"[neural] Simulation complete.",
+            time_sensory=str(self.sensory_profile.total_time),
+            time_sim=str(self.sim_profile.total_time),
+            time_motor=str(self.motor_profile.total_time),
+            time_drain=str(self.drain_profile.total_time),
+        )
+        run_paths = self.master_config.run_paths
+
+        mpi_comm = None
+        if nest.NumProcesses() > 1:
+            from mpi4py import MPI
+
+            mpi_comm = MPI.COMM_WORLD
+
+        rec_paths = None
+        if self.controller.use_cerebellum and self.master_config.SAVE_WEIGHTS_CEREB:
+            w = self.controller.record_synaptic_weights()
+            # every rank holds its local synapses: one shard per rank
+            rec_paths = save_conn_weights(w, run_paths.data_nest, comm=mpi_comm)
+
+        pop_views = self.controller.collect_populations()
+        rec_params = self.master_config.recording
+        res = collapse_files(
+            run_paths.data_nest,
+            pop_views,
+            comm=mpi_comm if rec_params.collapse_mode == CollapseMode.MPI else None,
+            mode=rec_params.collapse_mode,
+            workers=rec_params.collapse_workers
+            or self.master_config.total_num_virtual_procs,
+        )
+        res.weights = rec_paths
+        if rec_paths and self.master_config.weight_history.enabled:
+            # the checkpoints are complete on disk: one rank updates the history
+            if nest.Rank() == 0:
+                res.weight_history = self._append_weight_history(rec_paths)
+            if mpi_comm is not None:
+                res.weight_history = mpi_comm.bcast(res.weight_history, root=0)
+
+        with open(run_paths.neural_result, "w") as f:
+            f.write(res.model_dump_json())
+        return res
+
+    def _append_weight_history(self, rec_paths: list[Path]) -> Path:
+        """
+        Appends this trial's weights to the weight history of its chain, or
+        starts a new one if the parent is not the last trial of a history.
+        """
+        params = self.master_config.weight_history
+        parent = read_parent_neural(self.master_config)
+        history = None
+        if parent is not None and parent.weight_history is not None:
+            history = WeightHistory(parent.weight_history)
+            last = history.run_ids[-1] if len(history) else ""
+            if last.partition("-")[0] != self.master_config.parent_id.partition("-")[0]:
+                # branching off an earlier trial of the chain
+                history = None
+        if history is None:
+            history = WeightHistory(
+                self.master_config.run_paths.run / "weight_history",
+                quantum=params.quantum,
+                keyframe_every=params.keyframe_every,
+            )
+        history.append(self.master_config.run_id, rec_paths)
+
+        if params.prune_parent_checkpoints and parent is not None:
+            # the parent's weights can be exported again from the history
+            for path in parent.weights or []:
+                if path.is_dir() and len(history) > 1:
+                    shutil.rmtree(path)
+        return history.path
@@ -8,10 +8,10 @@ import structlog
 from config.plant_config import PlantConfig
 from config.ResultMeta import extract_id
 from nrp_core.engines.python_grpc import GrpcEngineScript
-from nrp_protobuf import nrpgenericproto_pb2, wrappers_pb2
+from nrp_protobuf import nrpgenericproto_pb2
 from plant.plant_simulator import PlantSimulator
-from utils_common.utils import TrialSection
 from utils_common.profile import Profile
+from utils_common.utils import first_open_loop_step
 
 
 class Script(GrpcEngineScript):
@@ -35,21 +35,25 @@ class Script(GrpcEngineScript):
         )
         self.current_sim_time_s = 0
         self.step = 0
+        self.open_loop_step = first_open_loop_step(self.config.master_config)
         self.pybullet_profile = Profile()
         self.rest_profile = Profile()
         self.log.info("PlantSimulator initialized.")
 
-        # joint_pos_rad (datapack<Double>)
-        self._registerDataPack("joint_pos_rad", wrappers_pb2.DoubleValue)
-        proto_wrapper = wrappers_pb2.DoubleValue()
-        proto_wrapper.value = (
-            self.config.master_config.simulation.oracle.init_joint_angle
+        # each datapack carries one co-simulation window: K joint positions and
+        # K (pos, neg) motor command pairs, flattened
+        window = self.config.master_config.simulation.cosim_window_steps
+        # joint_pos_rad (datapack<Double[]>)
+        self._registerDataPack("joint_pos_rad", nrpgenericproto_pb2.ArrayDouble)
+        proto_wrapper = nrpgenericproto_pb2.ArrayDouble()
+        proto_wrapper.array.extend(
+            [self.config.master_config.simulation.oracle.init_joint_angle] * window
         )
         self._setDataPack("joint_pos_rad", proto_wrapper)
         # control_cmd (datapack<Double[]>)
         self._registerDataPack("control_cmd", nrpgenericproto_pb2.ArrayDouble)
         proto_wrapper = nrpgenericproto_pb2.ArrayDouble()
-        proto_wrapper.array.extend([0.0, 0.0])
+        proto_wrapper.array.extend([0.0, 0.0] * window)
         self._setDataPack("control_cmd", proto_wrapper)
         self.joint_pos_rad = None
 
@@ -57,24 +61,39 @@ class Script(GrpcEngineScript):
 
     def runLoop(self, timestep):
         self.rest_profile.end()
-        if self.step % 50 == 0:
+        n_steps = self.config.master_config.simulation.window_steps(self.step)
+        # whether a multiple of 50 steps falls in this window
+        log_window = self.step % 50 < n_steps
+        if log_window:
             self.log.debug("[bullet] starting update...")
         ctrl = self._getDataPack("control_cmd").array
-        rate_pos, rate_neg = ctrl[0], ctrl[1]
+        commands = [(ctrl[2 * i], ctrl[2 * i + 1]) for i in range(n_steps)]
 
         with self.pybullet_profile.time():
-            self.joint_pos_rad, joint_vel, ee_pos, ee_vel, curr_section = (
-                self.simulator.run_simulation_step(
-                    rate_pos, rate_neg, self.current_sim_time_s, self.step
+            joint_positions, curr_section, self.current_sim_time_s = (
+                self.simulator.run_simulation_window(
+                    commands, self.current_sim_time_s, self.step
                 )
             )
+        self.joint_pos_rad = joint_positions[-1]
+        rate_pos, rate_neg = commands[-1]
+        window_start = self.step
+        self.step += n_steps
 
-        if curr_section == TrialSection.TIME_POST:
-            self.joint_pos_rad = 0.0  # mask joint position during TIME_POST
+        # commands come from the previous neural window: once that reached the
+        # open-loop phase they no longer change, run the rest of the trial now
+        sim_steps = self.config.master_config.simulation.sim_steps
+        if window_start - 1 >= self.open_loop_step and self.step < sim_steps:
+            self.log.debug("[bullet] fast-forwarding open-loop phase", step=self.step)
+            with self.pybullet_profile.time():
+                self.joint_pos_rad, curr_section, self.current_sim_time_s = (
+                    self.simulator.run_open_loop(
+                        commands[-1], self.current_sim_time_s, self.step
+                    )
+                )
+            self.step = sim_steps
 
-        self.current_sim_time_s += self.config.RESOLUTION_S
-        self.step += 1
-        if self.step % 50 == 0:
+        if log_window:
             self.log.debug(
                 f"[bullet] Update {self.step} complete.",
                 joint_pos=self.joint_pos_rad,
@@ -84,8 +103,8 @@ class Script(GrpcEngineScript):
                 time_rest=str(self.rest_profile.total_time),
             )
 
-        datapack = wrappers_pb2.DoubleValue()
-        datapack.value = self.joint_pos_rad
+        datapack = nrpgenericproto_pb2.ArrayDouble()
+        datapack.array.extend(joint_positions)
         self._setDataPack("joint_pos_rad", datapack)
 
         self.rest_profile.start()
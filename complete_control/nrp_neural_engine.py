@@ -8,12 +8,13 @@ from config.paths import COMPLETE_CONTROL, RunPaths
 from config.ResultMeta import extract_id
 from neural.nest_adapter import initialize_nest, nest
 from neural_simulation_lib import (
+    NeuralLoop,
     create_controller,
     setup_environment,
     setup_nest_kernel,
 )
 from nrp_core.engines.python_grpc import GrpcEngineScript
-from nrp_protobuf import nrpgenericproto_pb2, wrappers_pb2
+from nrp_protobuf import nrpgenericproto_pb2
 from utils_common.profile import Profile
 
 NANO_SEC = 1e-9
@@ -59,20 +60,23 @@ class Script(GrpcEngineScript):
 
         self.controller = create_controller(self.master_config)
         self.log.info(f"Created controller.")
-        self.sensory_profile = Profile()
-        self.sim_profile = Profile()
-        self.motor_profile = Profile()
+        self.loop = NeuralLoop(self.controller, self.master_config, log=self.log)
         self.rest_profile = Profile()
 
-        # joint_pos_rad (datapack<Double>)
-        self._registerDataPack("joint_pos_rad", wrappers_pb2.DoubleValue)
-        proto_wrapper = wrappers_pb2.DoubleValue()
-        proto_wrapper.value = self.master_config.simulation.oracle.init_joint_angle
+        # each datapack carries one co-simulation window: K joint positions and
+        # K (pos, neg) motor command pairs, flattened
+        window = self.master_config.simulation.cosim_window_steps
+        # joint_pos_rad (datapack<Double[]>)
+        self._registerDataPack("joint_pos_rad", nrpgenericproto_pb2.ArrayDouble)
+        proto_wrapper = nrpgenericproto_pb2.ArrayDouble()
+        proto_wrapper.array.extend(
+            [self.master_config.simulation.oracle.init_joint_angle] * window
+        )
         self._setDataPack("joint_pos_rad", proto_wrapper)
         # control_cmd (datapack<Double[]>)
         self._registerDataPack("control_cmd", nrpgenericproto_pb2.ArrayDouble)
         proto_wrapper = nrpgenericproto_pb2.ArrayDouble()
-        proto_wrapper.array.extend([0.0, 0.0])
+        proto_wrapper.array.extend([0.0, 0.0] * window)
         self._setDataPack("control_cmd", proto_wrapper)
 
         nest.Prepare()
@@ -80,71 +84,23 @@ class Script(GrpcEngineScript):
 
     def runLoop(self, timestep_ns):
         self.rest_profile.end()
-        if self.step % 50 == 0:
-            self.log.debug("[neural] starting neural update...")
-
-        joint_pos_rad = self._getDataPack("joint_pos_rad").value
 
+        joint_pos_rad = self._getDataPack("joint_pos_rad").array
         sim_time_s = self._time_ns * NANO_SEC
-
-        with self.sensory_profile.time():
-            self.controller.update_sensory_info_from_NRP(
-                joint_pos_rad, sim_time_s * 1000
-            )
-
-        if self.step % 50 == 0:
-            self.log.debug("[neural] updated sensory info")
-
-        with self.sim_profile.time():
-            timestep = timestep_ns * NANO_SEC * 1000
-            self.controller.run_simulation_step(timestep, sim_time_s)
-
-        if self.step % 50 == 0:
-            self.log.debug("[neural] simulated or skipped")
-
-        with self.motor_profile.time():
-            pos, neg = self.controller.extract_motor_command_NRP()
-
-        if self.step % 50 == 0:
-            self.log.debug(
-                f"[neural] Update {self.step} complete.",
-                sim_time=sim_time_s,
-                rate_pos=int(pos),
-                rate_neg=int(neg),
-                angle=joint_pos_rad,
-                time_sensory=str(self.sensory_profile.total_time),
-                time_sim=str(self.sim_profile.total_time),
-                time_motor=str(self.motor_profile.total_time),
-                time_rest=str(self.rest_profile.total_time),
-            )
-        self.step += 1
+        commands = self.loop.run_window(joint_pos_rad, sim_time_s)
+        self.step = self.loop.step
 
         datapack = nrpgenericproto_pb2.ArrayDouble()
-        datapack.array.extend([pos, neg])
+        datapack.array.extend([rate for command in commands for rate in command])
         self._setDataPack("control_cmd", datapack)
 
         self.rest_profile.start()
 
     def shutdown(self):
         self.log.info(
-            f"[neural] Simulation complete.",
-            time_sensory=str(self.sensory_profile.total_time),
-            time_sim=str(self.sim_profile.total_time),
-            time_motor=str(self.motor_profile.total_time),
+            f"[neural] Engine shutting down.",
             time_rest=str(self.rest_profile.total_time),
         )
-        from neural.data_handling import collapse_files, save_conn_weights
-
-        rec_paths = None
-        if self.controller.use_cerebellum and self.master_config.SAVE_WEIGHTS_CEREB:
-            w = self.controller.record_synaptic_weights()
-            rec_paths = save_conn_weights(w, self.run_paths.data_nest, comm=None)
-
-        pop_views = self.controller.collect_populations()
-        res = collapse_files(self.run_paths.data_nest, pop_views)
-        res.weights = rec_paths
-
-        with open(self.master_config.run_paths.neural_result, "w") as f:
-            f.write(res.model_dump_json())
+        self.loop.save_results()
 
         nest.Cleanup()
@@ -12,6 +12,7 @@ from plant.plant_plotting import plot_plant_outputs
 from tqdm import tqdm
 from utils_common.draw_schema_svg import draw_schema
 from utils_common.results import make_trial_id
+from utils_common.utils import cosim_iterations
 
 
 def _dump_logs(run_paths: RunPaths):
@@ -70,7 +71,9 @@ def run_trial(parent_id: str = "", label: str = "") -> str:
     client_log.debug("Nrp server initialized successfully")
 
     loop_start_time = timer()
-    steps = master_config.simulation.sim_steps
+    # one NRP iteration advances a whole co-simulation window; the open-loop end
+    # of the trial is fast-forwarded by the plant in the last one
+    steps = cosim_iterations(master_config)
     client_log.info(f"Start run loop. 1 trial ({steps} total iterations)")
 
     try:
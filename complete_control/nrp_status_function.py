@@ -10,7 +10,7 @@ from nrp_core.data.nrp_json import JsonRawData
 def status_function(joint_pos_rad):
 
     ret = JsonRawData()
-    ret.data["test_data"] = joint_pos_rad.data.value
+    ret.data["test_data"] = list(joint_pos_rad.data.array)
 
     # can be get from run_loop function:
     return True, [ret]
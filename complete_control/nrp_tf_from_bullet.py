@@ -7,7 +7,7 @@ from nrp_core.data.nrp_protobuf import *
 )
 @TransceiverFunction("nest_client")
 def from_bullet(joint_pos_rad):
-    datapack = WrappersDoubleValueDataPack("joint_pos_rad", "nest_client")
-    datapack.data.value = joint_pos_rad.data.value
+    datapack = NrpGenericProtoArrayDoubleDataPack("joint_pos_rad", "nest_client")
+    datapack.data.array.extend(joint_pos_rad.data.array)
 
     return [datapack]
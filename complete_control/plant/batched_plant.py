@@ -0,0 +1,528 @@
+"""
+N independent arms in one physics world, stepped together.
+
+Parameter sweeps and multi-target evaluations otherwise need one
+PlantSimulator, and one PyBullet connection, per trial. Here the arms of N
+trials share a single world: BatchedBulletPlant loads N copies of the arm URDF
+side by side in one DIRECT client and advances them with one stepSimulation,
+BatchedNumpyPlant integrates N analytic arms (see numpy_plant) as arrays.
+Torques in, joint angles and end-effector states out, are (N, ...) vectors.
+
+BatchedPlantSimulator runs the trial sections of PlantSimulator over the
+batch, recording all arms in one (steps, N) PLANT_RECORD_DTYPE array, and
+saves one PlantPlotData per trial. The trials must share their timing; only
+the plant is batched: nothing is rendered (no input image, no task video).
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import structlog
+from config.core_models import PlantBackend
+from config.paths import EMBODIMENT_ASSETS
+from config.plant_config import PlantConfig
+from utils_common.utils import TrialSection, get_current_section
+
+from .numpy_plant import ELBOW, arm_kinematics, integrate_arms, joint_limits
+from .plant_models import PLANT_RECORD_DTYPE, PlantPlotData, PlantRecorder, PlantState
+from .plant_utils import shoulder_direction
+from .robotic_plant import PLANT_JOINT_IDS, RoboticPlant, load_robot, read_plant_state
+
+# distance between the bases of the arms of a BatchedBulletPlant, along x,
+# enough for them never to touch
+ARM_SPACING_M = 2.0
+
+
+def _gravity(config: PlantConfig) -> float:
+    experiment = config.master_config.experiment
+    return experiment.z_gravity_magnitude if experiment.enable_gravity else 0.0
+
+
+def _tolerance_rad(config: PlantConfig) -> float:
+    return np.deg2rad(config.master_config.simulation.oracle.target_tolerance_angle_deg)
+
+
+class BatchedNumpyPlant:
+    """
+    N NumpyPlant arms as arrays: one integrate_arms and one batched forward
+    kinematics per step, whatever N.
+    """
+
+    def __init__(self, configs: Sequence[PlantConfig]):
+        self.log = structlog.get_logger(type(self).__name__)
+        self.configs = list(configs)
+        self.n_arms = len(self.configs)
+        self.kinematics = arm_kinematics()
+        self.limits = joint_limits(self.kinematics)
+        self.dt = self.configs[0].RESOLUTION_S
+
+        specs = [c.master_config.simulation.oracle.robot_spec for c in self.configs]
+        self.robot_spec = tuple(
+            np.array([getattr(s, field)[0] for s in specs])
+            for field in ("I", "mass", "links")
+        )
+        self.gravity = np.array([_gravity(c) for c in self.configs])
+        self.initial_joint_position_rad = np.array(
+            [c.initial_joint_pos_rad for c in self.configs]
+        )
+        self.target_joint_position_rad = np.array(
+            [c.target_joint_pos_rad for c in self.configs]
+        )
+        self.tolerance_rad = np.array([_tolerance_rad(c) for c in self.configs])
+
+        self.pos = np.zeros((self.n_arms, 3))
+        self.vel = np.zeros((self.n_arms, 3))
+        self.elbow_torque = np.zeros(self.n_arms)
+        self.elbow_joint_locked = np.zeros(self.n_arms, dtype=bool)
+        self.shoulder_velocity = np.zeros(self.n_arms)
+        self.target_attached = np.zeros(self.n_arms, dtype=bool)
+
+        self.init_hand_pos_ee = self._hand_at_elbow(self.initial_joint_position_rad)
+        self.trgt_hand_pos_ee = self._hand_at_elbow(self.target_joint_position_rad)
+        self.reset_plant()
+        self.log.info("BatchedNumpyPlant initialized", n_arms=self.n_arms)
+
+    def _joint_vectors(self, values: np.ndarray) -> np.ndarray:
+        q = np.zeros((self.n_arms, len(self.kinematics.origins)))
+        q[:, list(PLANT_JOINT_IDS)] = values
+        return q
+
+    def _hand_at_elbow(self, position_rad: np.ndarray) -> np.ndarray:
+        values = np.zeros((self.n_arms, 3))
+        values[:, ELBOW] = position_rad
+        q = self._joint_vectors(values)
+        pos, _ = self.kinematics.hand(q, np.zeros_like(q))
+        return pos
+
+    def read_states(self) -> PlantState:
+        """Joint and end-effector states of all arms, as (N, 3) arrays."""
+        ee_pos, ee_vel = self.kinematics.hand(
+            self._joint_vectors(self.pos), self._joint_vectors(self.vel)
+        )
+        return PlantState(self.pos.copy(), self.vel.copy(), ee_pos, ee_vel)
+
+    def set_elbow_torques(self, torques: np.ndarray, active: np.ndarray) -> None:
+        """
+        Applies `torques` to the elbows of the `active` arms for the next step
+        and locks the elbows of the others.
+        """
+        newly_locked = ~active & ~self.elbow_joint_locked
+        self.vel[newly_locked, ELBOW] = 0.0
+        self.elbow_joint_locked = ~active
+        self.elbow_torque = np.where(active, torques, 0.0)
+
+    def simulate_step(self) -> None:
+        integrate_arms(
+            self.pos,
+            self.vel,
+            self.elbow_torque,
+            self.elbow_joint_locked,
+            self.shoulder_velocity,
+            self.robot_spec,
+            self.gravity,
+            self.dt,
+            self.limits,
+        )
+        self.elbow_torque = np.zeros(self.n_arms)
+
+    def disconnect(self) -> None:
+        pass
+
+    def reset_plant(self) -> None:
+        self.pos[:] = 0.0
+        self.vel[:] = 0.0
+        self.pos[:, ELBOW] = self.initial_joint_position_rad
+        self.shoulder_velocity[:] = 0.0
+        self.elbow_torque[:] = 0.0
+
+    def check_target_proximity(self) -> np.ndarray:
+        return (
+            np.abs(self.pos[:, ELBOW] - self.target_joint_position_rad)
+            <= self.tolerance_rad
+        )
+
+    def grasp(self, arms: np.ndarray) -> None:
+        self.target_attached |= arms
+
+    def move_shoulders(self, speeds: np.ndarray, arms: np.ndarray) -> None:
+        self.shoulder_velocity = np.where(arms, speeds, self.shoulder_velocity)
+
+
+class BatchedBulletPlant:
+    """
+    N copies of the arm URDF, ARM_SPACING_M apart in one DIRECT PyBullet
+    client, with the joint controls of RoboticPlant. Positions are reported
+    relative to the base of each arm, as a RoboticPlant would. PyBullet has
+    one gravity per world: the trials must agree on it.
+    """
+
+    def __init__(self, configs: Sequence[PlantConfig], pybullet_instance=None):
+        self.log = structlog.get_logger(type(self).__name__)
+        if pybullet_instance is None:
+            import pybullet
+
+            pybullet_instance = pybullet
+        self.p = pybullet_instance
+        self.configs = list(configs)
+        self.n_arms = len(self.configs)
+
+        gravity = {_gravity(c) for c in self.configs}
+        if len(gravity) > 1:
+            raise ValueError(
+                f"Arms of a BatchedBulletPlant share one gravity, got {gravity}"
+            )
+
+        self._server_id = self.p.connect(self.p.DIRECT)
+        self.p.setAdditionalSearchPath(
+            path=str(EMBODIMENT_ASSETS),
+            physicsClientId=self._server_id,
+        )
+        self.p.setPhysicsEngineParameter(
+            fixedTimeStep=self.configs[0].RESOLUTION_S,
+            physicsClientId=self._server_id,
+        )
+        self.p.setGravity(0, 0, -gravity.pop(), physicsClientId=self._server_id)
+
+        self.base_positions = np.zeros((self.n_arms, 3))
+        self.base_positions[:, 0] = np.arange(self.n_arms) * ARM_SPACING_M
+        self.robot_ids = []
+        for base in self.base_positions:
+            robot_id = load_robot(self.p, self._server_id)
+            self.p.resetBasePositionAndOrientation(
+                robot_id, base.tolist(), [0, 0, 0, 1], physicsClientId=self._server_id
+            )
+            self.robot_ids.append(robot_id)
+
+        self.initial_joint_position_rad = np.array(
+            [c.initial_joint_pos_rad for c in self.configs]
+        )
+        self.target_joint_position_rad = np.array(
+            [c.target_joint_pos_rad for c in self.configs]
+        )
+        self.tolerance_rad = np.array([_tolerance_rad(c) for c in self.configs])
+        self.resolution_ms = np.array(
+            [c.master_config.simulation.resolution for c in self.configs]
+        )
+        self.elbow_joint_locked = np.zeros(self.n_arms, dtype=bool)
+        self.target_attached = np.zeros(self.n_arms, dtype=bool)
+        # elbow positions of the last read_states, until the next step
+        self._elbow_pos = None
+
+        self.init_hand_pos_ee = self._hand_at_elbow(self.initial_joint_position_rad)
+        self.trgt_hand_pos_ee = self._hand_at_elbow(self.target_joint_position_rad)
+        self.reset_plant()
+        self.log.info("BatchedBulletPlant initialized", n_arms=self.n_arms)
+
+    def _hand_at_elbow(self, position_rad: np.ndarray) -> np.ndarray:
+        hand = np.empty((self.n_arms, 3))
+        for i, robot_id in enumerate(self.robot_ids):
+            self.p.resetJointState(
+                robot_id,
+                RoboticPlant.ELBOW_JOINT_ID,
+                position_rad[i],
+                physicsClientId=self._server_id,
+            )
+            hand[i] = self.p.getLinkState(
+                robot_id, RoboticPlant.HAND_LINK_ID, physicsClientId=self._server_id
+            )[0]
+        return hand - self.base_positions
+
+    def _velocity_control(self, robot_id: int, joint_id: int, **kwargs) -> None:
+        self.p.setJointMotorControl2(
+            robot_id,
+            joint_id,
+            controlMode=self.p.VELOCITY_CONTROL,
+            physicsClientId=self._server_id,
+            **kwargs,
+        )
+
+    def read_states(self) -> PlantState:
+        """Joint and end-effector states of all arms, as (N, 3) arrays."""
+        states = [
+            read_plant_state(self.p, self._server_id, robot_id)
+            for robot_id in self.robot_ids
+        ]
+        pos, vel, ee_pos, ee_vel = (np.array(field) for field in zip(*states))
+        self._elbow_pos = pos[:, ELBOW]
+        return PlantState(pos, vel, ee_pos - self.base_positions, ee_vel)
+
+    def _get_elbow_pos(self) -> np.ndarray:
+        if self._elbow_pos is None:
+            self.read_states()
+        return self._elbow_pos
+
+    def set_elbow_torques(self, torques: np.ndarray, active: np.ndarray) -> None:
+        """
+        Applies `torques` to the elbows of the `active` arms for the next step
+        and locks the elbows of the others, as RoboticPlant does.
+        """
+        elbow_pos = self._get_elbow_pos()
+        for i, robot_id in enumerate(self.robot_ids):
+            if active[i]:
+                if self.elbow_joint_locked[i]:
+                    self._velocity_control(
+                        robot_id,
+                        RoboticPlant.ELBOW_JOINT_ID,
+                        targetPosition=elbow_pos[i],
+                        force=0,
+                    )
+                self.p.setJointMotorControlArray(
+                    robot_id,
+                    jointIndices=[RoboticPlant.ELBOW_JOINT_ID],
+                    controlMode=self.p.TORQUE_CONTROL,
+                    forces=[torques[i]],
+                    physicsClientId=self._server_id,
+                )
+            elif not self.elbow_joint_locked[i]:
+                self.p.resetJointState(
+                    robot_id,
+                    RoboticPlant.ELBOW_JOINT_ID,
+                    elbow_pos[i],
+                    targetVelocity=0.0,
+                    physicsClientId=self._server_id,
+                )
+                self._velocity_control(
+                    robot_id,
+                    RoboticPlant.ELBOW_JOINT_ID,
+                    targetPosition=elbow_pos[i],
+                    targetVelocity=0.0,
+                    force=10000,  # whatever is strong enough to hold it
+                )
+        self.elbow_joint_locked = ~np.asarray(active, dtype=bool)
+
+    def simulate_step(self) -> None:
+        """Steps all arms with a single stepSimulation."""
+        self._elbow_pos = None
+        self.p.stepSimulation(physicsClientId=self._server_id)
+
+    def disconnect(self) -> None:
+        self.p.disconnect(physicsClientId=self._server_id)
+
+    def reset_plant(self) -> None:
+        self._elbow_pos = None
+        for robot_id, initial_rad in zip(
+            self.robot_ids, self.initial_joint_position_rad
+        ):
+            for joint_id, value in zip(PLANT_JOINT_IDS, (0.0, initial_rad, 0.0)):
+                self.p.resetJointState(
+                    robot_id,
+                    joint_id,
+                    value,
+                    targetVelocity=0.0,
+                    physicsClientId=self._server_id,
+                )
+            self._velocity_control(
+                robot_id, RoboticPlant.SHOULDER_A_JOINT_ID, targetVelocity=0
+            )
+            self._velocity_control(
+                robot_id, RoboticPlant.HAND_LINK_ID, targetVelocity=0
+            )
+
+    def check_target_proximity(self) -> np.ndarray:
+        return (
+            np.abs(self._get_elbow_pos() - self.target_joint_position_rad)
+            <= self.tolerance_rad
+        )
+
+    def grasp(self, arms: np.ndarray) -> None:
+        for i in np.flatnonzero(arms):
+            self._velocity_control(
+                self.robot_ids[i],
+                RoboticPlant.HAND_LINK_ID,
+                targetVelocity=2 * self.resolution_ms[i],
+            )
+        self.target_attached |= arms
+
+    def move_shoulders(self, speeds: np.ndarray, arms: np.ndarray) -> None:
+        for i in np.flatnonzero(arms):
+            self._velocity_control(
+                self.robot_ids[i],
+                RoboticPlant.SHOULDER_A_JOINT_ID,
+                targetVelocity=speeds[i],
+            )
+            self._velocity_control(
+                self.robot_ids[i], RoboticPlant.HAND_LINK_ID, targetVelocity=0
+            )
+
+
+def _timing(config: PlantConfig) -> tuple:
+    simulation = config.master_config.simulation
+    return (
+        simulation.resolution,
+        simulation.time_prep,
+        simulation.time_move,
+        simulation.time_locked_with_feedback,
+        simulation.time_grasp,
+        simulation.duration_ms,
+    )
+
+
+class BatchedPlantSimulator:
+    """
+    PlantSimulator over N trials at once: the plants of all trials live in one
+    batched plant (MasterParams.PLANT_BACKEND selects which) and every step
+    takes and returns (N,) vectors. The trials must share their timing, so
+    that all arms are always in the same trial section.
+    """
+
+    def __init__(self, configs: Sequence[PlantConfig], pybullet_instance=None):
+        """
+        Initializes the BatchedPlantSimulator.
+
+        Args:
+            configs: one PlantConfig per arm.
+            pybullet_instance: The PyBullet instance, imported if not given;
+                unused with the NumPy plant backend.
+        """
+        self.log: structlog.stdlib.BoundLogger = structlog.get_logger(
+            type(self).__name__
+        )
+        self.configs: List[PlantConfig] = list(configs)
+        if not self.configs:
+            raise ValueError("BatchedPlantSimulator needs at least one config")
+        if len({_timing(c) for c in self.configs}) > 1:
+            raise ValueError("Batched trials must share their simulation timing")
+        backends = {c.master_config.PLANT_BACKEND for c in self.configs}
+        if len(backends) > 1:
+            raise ValueError("Batched trials must share their plant backend")
+        self.config = self.configs[0]
+        self.n_arms = len(self.configs)
+
+        backend = backends.pop()
+        if backend == PlantBackend.NUMPY:
+            self.plant = BatchedNumpyPlant(self.configs)
+        else:
+            self.plant = BatchedBulletPlant(self.configs, pybullet_instance)
+        if any(c.master_config.plotting.CAPTURE_VIDEO for c in self.configs):
+            self.log.warning("No task video with a batched plant")
+
+        self.num_total_steps = len(self.config.time_vector_total_s)
+        self.data = np.zeros((self.num_total_steps, self.n_arms), PLANT_RECORD_DTYPE)
+        self.recorders = [
+            PlantRecorder.over(self.data[:, i]) for i in range(self.n_arms)
+        ]
+        self.scale_torque = np.array([c.SCALE_TORQUE for c in self.configs])
+        self.direction = np.array([shoulder_direction(c) for c in self.configs])
+        self.checked_proximity = False
+        self.shoulder_moving = np.zeros(self.n_arms, dtype=bool)
+        self.log.info(
+            "BatchedPlantSimulator initialization complete",
+            n_arms=self.n_arms,
+            backend=backend.value,
+        )
+
+    def _grasp_if_target_close(self) -> np.ndarray:
+        if not self.checked_proximity:
+            self.checked_proximity = True
+            close = self.plant.check_target_proximity()
+            self.log.debug("Attaching targets in range", attached=int(close.sum()))
+            self.plant.grasp(close)
+        return self.plant.target_attached.astype(float)
+
+    def _move_shoulders(self) -> np.ndarray:
+        starting = self.plant.target_attached & ~self.shoulder_moving
+        if starting.any():
+            self.plant.move_shoulders(self.direction, starting)
+            self.shoulder_moving |= starting
+        return self.plant.target_attached.astype(float)
+
+    def run_simulation_step(
+        self,
+        rates_pos_hz: np.ndarray,
+        rates_neg_hz: np.ndarray,
+        current_sim_time_s: float,
+        step: int,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, TrialSection]:
+        """Execute one simulation step of all arms.
+
+        Returns:
+            Tuple containing (joint_pos_rad, joint_vel_rad_s, ee_pos_m, ee_vel_m,
+            section): (N,) elbow positions and velocities, (N, 3) end effector
+            positions and velocities, and the section shared by all arms
+        """
+        state = self.plant.read_states()
+        joint_pos_rad, joint_vel_rad_s = state.pos[:, ELBOW], state.vel[:, ELBOW]
+        curr_section = get_current_section(
+            current_sim_time_s * 1000, self.config.master_config
+        )
+        if step >= self.num_total_steps:
+            self.log.warning(
+                "Step index exceeds data_array size, breaking loop.",
+                step=step,
+                max_steps=self.num_total_steps,
+            )
+            return (
+                joint_pos_rad,
+                joint_vel_rad_s,
+                state.ee_pos,
+                state.ee_vel,
+                curr_section,
+            )
+
+        net_rate_hz = np.asarray(rates_pos_hz) - np.asarray(rates_neg_hz)
+        elbow_torque = net_rate_hz / self.scale_torque
+        hand_torque = shoulder_torque = np.zeros(self.n_arms)
+
+        moving = curr_section == TrialSection.TIME_MOVE
+        self.plant.set_elbow_torques(elbow_torque, np.full(self.n_arms, moving))
+        if curr_section == TrialSection.TIME_GRASP:
+            hand_torque = self._grasp_if_target_close()
+        if curr_section == TrialSection.TIME_POST:
+            shoulder_torque = self._move_shoulders()
+
+        self.plant.simulate_step()
+
+        row = self.data[step]
+        row["pos"], row["vel"] = state.pos, state.vel
+        # same joint-to-torque pairing as PlantSimulator
+        row["torque"] = np.column_stack((hand_torque, elbow_torque, shoulder_torque))
+        row["ee_pos"], row["ee_vel"] = state.ee_pos, state.ee_vel
+
+        return joint_pos_rad, joint_vel_rad_s, state.ee_pos, state.ee_vel, curr_section
+
+    def run_simulation_window(
+        self,
+        commands: np.ndarray,
+        current_sim_time_s: float,
+        step: int,
+    ) -> Tuple[np.ndarray, TrialSection, float]:
+        """Execute one step per row of (rate_pos, rate_neg) commands, (steps, N, 2).
+
+        Returns:
+            Tuple containing ((steps, N) joint positions sent back to the
+            controllers, masked to 0 during TIME_POST, section of the last step,
+            simulation time after the window)
+        """
+        commands = np.asarray(commands, dtype=np.float64)
+        joint_positions = np.zeros(commands.shape[:2])
+        curr_section = None
+        for i, command in enumerate(commands):
+            joint_pos_rad, _, _, _, curr_section = self.run_simulation_step(
+                command[:, 0], command[:, 1], current_sim_time_s, step + i
+            )
+            if curr_section != TrialSection.TIME_POST:
+                joint_positions[i] = joint_pos_rad
+            # accumulated, not step * resolution: section boundaries depend on it
+            current_sim_time_s += self.config.RESOLUTION_S
+        return joint_positions, curr_section, current_sim_time_s
+
+    def finalize_and_process_data(
+        self, reached_joint_rad: np.ndarray
+    ) -> List[PlantPlotData]:
+        """Saves the PlantPlotData of every trial to its own run directory."""
+        self.log.info("Finalizing and saving simulation data...", n_arms=self.n_arms)
+        all_plot_data = []
+        for i, (config, recorder) in enumerate(zip(self.configs, self.recorders)):
+            plot_data = PlantPlotData(
+                joint_data=recorder.joint_data(),
+                ee_data=recorder.ee_data(),
+                error=[reached_joint_rad[i] - config.target_joint_pos_rad],
+                init_hand_pos_ee=self.plant.init_hand_pos_ee[i].tolist(),
+                trgt_hand_pos_ee=self.plant.trgt_hand_pos_ee[i].tolist(),
+            )
+            tmp_filename = config.run_paths.robot_result.with_suffix(".tmp")
+            plot_data.save(tmp_filename)
+            # save + rename to have atomic write
+            tmp_filename.rename(config.run_paths.robot_result)
+            all_plot_data.append(plot_data)
+        return all_plot_data
@@ -0,0 +1,325 @@
+"""
+Analytic NumPy plant: a drop-in replacement of RoboticPlant for PlantSimulator
+that needs neither PyBullet nor OpenGL (MasterParams.PLANT_BACKEND = "numpy").
+
+The elbow follows the 1-DOF model of minjerk_dynamics (I * acc + gravity term,
+RobotSpecParams), integrated with semi-implicit Euler at the simulation
+resolution. Joint lock, grasp and shoulder motion reproduce the velocity
+controls RoboticPlant sets in PyBullet, with the joint limits of the arm URDF.
+End-effector position and velocity come from the forward kinematics of the
+same URDF. Nothing is rendered: no input image and no task video.
+"""
+
+import math
+import xml.etree.ElementTree as ET
+from functools import cache
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import structlog
+from config.paths import EMBODIMENT_ASSETS
+from config.plant_config import PlantConfig
+from minjerk_dynamics import inverse_dynamics_1dof
+
+from .plant_models import JointState, JointStates, PlantState
+from .robotic_plant import PLANT_JOINT_IDS, RoboticPlant
+
+
+def _rpy_matrix(rpy) -> np.ndarray:
+    r, p, y = rpy
+    cr, sr, cp, sp, cy, sy = (
+        math.cos(r),
+        math.sin(r),
+        math.cos(p),
+        math.sin(p),
+        math.cos(y),
+        math.sin(y),
+    )
+    # URDF convention: Rz(yaw) @ Ry(pitch) @ Rx(roll)
+    return np.array(
+        [
+            [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+            [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+            [-sp, cp * sr, cp * cr],
+        ]
+    )
+
+
+def _skew(v: np.ndarray) -> np.ndarray:
+    x, y, z = v
+    return np.array([[0, -z, y], [z, 0, -x], [-y, x, 0]], dtype=np.float64)
+
+
+def _axis_matrix(axis: np.ndarray, angle) -> np.ndarray:
+    """Rotations of `angle` (any shape) about the unit `axis`, as (..., 3, 3)."""
+    # Rodrigues: I + sin(a) K + (1 - cos(a)) K^2
+    K = _skew(axis)
+    angle = np.asarray(angle)[..., None, None]
+    return np.eye(3) + np.sin(angle) * K + (1 - np.cos(angle)) * (K @ K)
+
+
+def _cross(a, b) -> np.ndarray:
+    # np.cross is an order of magnitude slower on few 3-vectors
+    out = np.empty(np.broadcast_shapes(a.shape, b.shape))
+    out[..., 0] = a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1]
+    out[..., 1] = a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2]
+    out[..., 2] = a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+    return out
+
+
+def _origin(element) -> Tuple[np.ndarray, np.ndarray]:
+    """(rotation, translation) of the <origin> of a URDF element."""
+    origin = element.find("origin")
+    if origin is None:
+        return np.eye(3), np.zeros(3)
+    xyz = [float(v) for v in origin.get("xyz", "0 0 0").split()]
+    rpy = [float(v) for v in origin.get("rpy", "0 0 0").split()]
+    return _rpy_matrix(rpy), np.array(xyz)
+
+
+class ArmKinematics:
+    """
+    Forward kinematics of the first `n_joints` joints of the arm URDF, up to
+    the center of mass of the last child link (what getLinkState reports).
+    """
+
+    def __init__(self, urdf_path: Path, n_joints: int):
+        root = ET.parse(urdf_path).getroot()
+        joints = root.findall("joint")[:n_joints]
+        self.origins = [_origin(j) for j in joints]
+        self.axes = [
+            np.array([float(v) for v in j.find("axis").get("xyz").split()])
+            for j in joints
+        ]
+        self.revolute = [j.get("type") != "fixed" for j in joints]
+        self.limits = [
+            (
+                (float(limit.get("lower")), float(limit.get("upper")))
+                if (limit := j.find("limit")) is not None
+                else (0.0, 0.0)
+            )
+            for j in joints
+        ]
+        hand = joints[-1].find("child").get("link")
+        inertial = root.find(f"link[@name='{hand}']/inertial")
+        self.com = (
+            _origin(inertial) if inertial is not None else (np.eye(3), np.zeros(3))
+        )
+
+    def hand(self, q, qd) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        World position and linear velocity of the hand for joint positions `q`
+        and velocities `qd`, (..., n_joints) for any number of arms.
+        """
+        q, qd = np.asarray(q), np.asarray(qd)
+        R = np.broadcast_to(np.eye(3), q.shape[:-1] + (3, 3))
+        t = np.zeros(q.shape[:-1] + (3,))
+        joint_frames = []
+        for j, ((R_o, t_o), axis, revolute) in enumerate(
+            zip(self.origins, self.axes, self.revolute)
+        ):
+            t = t + R @ t_o
+            R = R @ R_o
+            if revolute:
+                joint_frames.append((R @ axis, t, qd[..., j, None]))
+                R = R @ _axis_matrix(axis, q[..., j])
+        R_c, t_c = self.com
+        pos = t + R @ t_c
+        vel = np.zeros_like(pos)
+        for w, o, v in joint_frames:
+            vel += v * _cross(w, pos - o)
+        return pos, vel
+
+
+@cache
+def arm_kinematics() -> ArmKinematics:
+    return ArmKinematics(
+        EMBODIMENT_ASSETS / RoboticPlant._URDF_MODEL_FILENAME,
+        RoboticPlant.HAND_LINK_ID + 1,
+    )
+
+
+SHOULDER, ELBOW, HAND = range(3)
+
+
+def integrate_arms(
+    pos: np.ndarray,
+    vel: np.ndarray,
+    elbow_torque,
+    elbow_locked,
+    shoulder_velocity,
+    robot_spec: Tuple,
+    gravity,
+    dt: float,
+    limits: Tuple[np.ndarray, np.ndarray],
+) -> None:
+    """
+    Advances arms by `dt` (semi-implicit Euler), in place. `pos` and `vel` are
+    (..., 3) joint positions and velocities in the order of JointStates; the
+    other arguments broadcast to their leading dimensions. `robot_spec` is
+    (inertia, mass, link length), `limits` the (3,) lower and upper bounds.
+    """
+    inertia, mass, link_length = robot_spec
+    bias = inverse_dynamics_1dof(
+        inertia,
+        pos[..., ELBOW],
+        vel[..., ELBOW],
+        0.0,
+        g=gravity,
+        mass=mass,
+        link_length=link_length,
+    )
+    acc = (elbow_torque - bias) / inertia
+    vel[..., ELBOW] = np.where(elbow_locked, 0.0, vel[..., ELBOW] + acc * dt)
+    vel[..., SHOULDER] = shoulder_velocity
+    pos += vel * dt
+    lower, upper = limits
+    hit = (pos < lower) | (pos > upper)
+    np.clip(pos, lower, upper, out=pos)
+    vel[hit] = 0.0
+
+
+def joint_limits(kinematics: ArmKinematics) -> Tuple[np.ndarray, np.ndarray]:
+    """(3,) lower and upper bounds of the plant joints; unbounded if lower >= upper."""
+    lower, upper = np.array([kinematics.limits[j] for j in PLANT_JOINT_IDS]).T
+    unbounded = lower >= upper
+    lower[unbounded], upper[unbounded] = -np.inf, np.inf
+    return lower, upper
+
+
+class NumpyPlant:
+    """
+    Analytic counterpart of RoboticPlant, with the interface PlantSimulator
+    uses. Only the elbow is torque driven; the shoulder follows the velocity
+    set by move_shoulder and the hand joint, fixed in the URDF, stays at 0.
+    """
+
+    def __init__(self, config: PlantConfig, pybullet_instance=None):
+        self.log = structlog.get_logger(type(self).__name__)
+        self.log.info("Initializing NumpyPlant...")
+        self.config: PlantConfig = config
+        self.kinematics = arm_kinematics()
+
+        spec = config.master_config.simulation.oracle.robot_spec
+        self.robot_spec = (spec.I[0], spec.mass[0], spec.links[0])
+        self.dt = config.RESOLUTION_S
+        self.gravity = 0.0
+        self.limits = joint_limits(self.kinematics)
+
+        self.pos = np.zeros(3)
+        self.vel = np.zeros(3)
+        self.elbow_torque = 0.0
+        self.elbow_joint_locked = False
+        self.shoulder_velocity = 0.0
+        self.target_attached = False
+
+        self.initial_joint_position_rad: float = self.config.initial_joint_pos_rad
+        self.target_joint_position_rad: float = self.config.target_joint_pos_rad
+        self.shoulder_joint_start_position_rad = 0
+        self.init_hand_pos_ee = self._hand_at_elbow(self.initial_joint_position_rad)
+        self.trgt_hand_pos_ee = self._hand_at_elbow(self.target_joint_position_rad)
+
+        self.reset_plant()
+        self.set_gravity(
+            config.master_config.experiment.enable_gravity,
+            config.master_config.experiment.z_gravity_magnitude,
+        )
+        self.log.info(
+            "NumpyPlant initialized and reset to initial state",
+            initial_pos_rad=self.initial_joint_position_rad,
+        )
+
+    def _joint_vector(self, values) -> np.ndarray:
+        q = np.zeros(len(self.kinematics.origins))
+        q[list(PLANT_JOINT_IDS)] = values
+        return q
+
+    def _hand_at_elbow(self, position_rad: float) -> tuple:
+        q = self._joint_vector([0.0, position_rad, 0.0])
+        pos, _ = self.kinematics.hand(q, np.zeros_like(q))
+        return tuple(pos.tolist())
+
+    def set_gravity(self, enable: bool, magnitude: float = 9.81) -> None:
+        self.gravity = magnitude if enable else 0.0
+
+    def read_state(self) -> PlantState:
+        ee_pos, ee_vel = self.kinematics.hand(
+            self._joint_vector(self.pos), self._joint_vector(self.vel)
+        )
+        return PlantState(
+            tuple(self.pos.tolist()),
+            tuple(self.vel.tolist()),
+            tuple(ee_pos.tolist()),
+            tuple(ee_vel.tolist()),
+        )
+
+    def get_joint_states(self) -> JointStates:
+        return JointStates(*(JointState(p, v) for p, v in zip(self.pos, self.vel)))
+
+    def get_ee_pose_and_velocity(self) -> Tuple[List[float], List[float]]:
+        state = self.read_state()
+        return list(state.ee_pos), list(state.ee_vel)
+
+    def set_elbow_joint_torque(self, torques: List[float]) -> None:
+        if len(torques) != 1:
+            raise ValueError(
+                "Torques list must contain exactly one value for 1-DOF arm."
+            )
+        self.unlock_joint()
+        self.elbow_torque = torques[0]
+
+    def simulate_step(self) -> None:
+        """Advances the arm by one resolution step (see integrate_arms)."""
+        integrate_arms(
+            self.pos,
+            self.vel,
+            self.elbow_torque,
+            self.elbow_joint_locked,
+            self.shoulder_velocity,
+            self.robot_spec,
+            self.gravity,
+            self.dt,
+            self.limits,
+        )
+        # as PyBullet torque control, the torque only holds for one step
+        self.elbow_torque = 0.0
+
+    def disconnect(self) -> None:
+        pass
+
+    def reset_plant(self) -> None:
+        self.pos[:] = 0.0
+        self.vel[:] = 0.0
+        self.pos[ELBOW] = self.initial_joint_position_rad
+        self.pos[SHOULDER] = self.shoulder_joint_start_position_rad
+        self.shoulder_velocity = 0.0
+        self.elbow_torque = 0.0
+
+    def lock_elbow_joint(self) -> None:
+        if not self.elbow_joint_locked:
+            self.vel[ELBOW] = 0.0
+            self.elbow_joint_locked = True
+
+    def unlock_joint(self) -> None:
+        self.elbow_joint_locked = False
+
+    def check_target_proximity(self) -> bool:
+        return math.isclose(
+            self.pos[ELBOW],
+            self.target_joint_position_rad,
+            abs_tol=np.deg2rad(
+                self.config.master_config.simulation.oracle.target_tolerance_angle_deg
+            ),
+        )
+
+    def grasp(self) -> None:
+        # the hand joint is fixed in the URDF: grasping only attaches the target
+        self.target_attached = True
+
+    def move_shoulder(self, speed: float) -> None:
+        self.shoulder_velocity = speed
+
+    def update_ball_position(self):
+        # the target is not simulated: it would only follow the hand
+        pass
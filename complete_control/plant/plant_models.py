@@ -1,6 +1,6 @@
 from dataclasses import astuple, dataclass
 from pathlib import Path
-from typing import ClassVar, Iterator, List
+from typing import ClassVar, Iterator, List, NamedTuple
 
 import numpy as np
 import structlog
@@ -99,6 +99,69 @@ class JointData(BaseModel):
         self.input_cmd_torque[step] = input_cmd_torque
 
 
+# joints recorded by the plant, in the order of JointStates
+PLANT_JOINTS = 3
+PLANT_RECORD_DTYPE = np.dtype(
+    [
+        ("pos", np.float64, (PLANT_JOINTS,)),
+        ("vel", np.float64, (PLANT_JOINTS,)),
+        ("torque", np.float64, (PLANT_JOINTS,)),
+        ("ee_pos", np.float64, (3,)),
+        ("ee_vel", np.float64, (3,)),
+    ]
+)
+
+
+class PlantState(NamedTuple):
+    """Joint (in the order of JointStates) and end-effector state of a step."""
+
+    pos: tuple[float, float, float]
+    vel: tuple[float, float, float]
+    ee_pos: tuple[float, float, float]
+    ee_vel: tuple[float, float, float]
+
+
+class PlantRecorder:
+    """
+    Plant time series of a trial in a single preallocated structured array
+    (steps x PLANT_RECORD_DTYPE), written one whole row per step.
+    JointData/EEData are zero-copy views over its columns.
+    """
+
+    def __init__(self, num_total_steps: int):
+        self.data = np.zeros(num_total_steps, dtype=PLANT_RECORD_DTYPE)
+
+    @classmethod
+    def over(cls, data: np.ndarray) -> "PlantRecorder":
+        """
+        Recorder over an existing (steps,) PLANT_RECORD_DTYPE array, e.g. the
+        column of one arm of a BatchedPlantSimulator record.
+        """
+        recorder = cls.__new__(cls)
+        recorder.data = data
+        return recorder
+
+    def __len__(self):
+        return len(self.data)
+
+    def record(self, step: int, state: PlantState, torques: tuple[float, ...]):
+        self.data[step] = (state.pos, state.vel, torques, state.ee_pos, state.ee_vel)
+
+    def joint_data(self) -> list[JointData]:
+        return [
+            JointData(
+                pos_rad=self.data["pos"][:, i],
+                vel_rad_s=self.data["vel"][:, i],
+                input_cmd_torque=self.data["torque"][:, i],
+            )
+            for i in range(PLANT_JOINTS)
+        ]
+
+    def ee_data(self) -> EEData:
+        # EEData keeps the x and z velocity components
+        return EEData(pos_ee=self.data["ee_pos"], vel_ee=self.data["ee_vel"][:, ::2])
+
+
 class PlantPlotData(BaseModel):
     """Holds all data needed for plotting."""
 
@@ -1,3 +1,5 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import List
@@ -10,7 +12,6 @@ from config.core_models import SimulationParams
 from config.paths import RunPaths
 from config.plant_config import PlantConfig
 from config.ResultMeta import ResultMeta
-from matplotlib.animation import FuncAnimation
 from matplotlib.lines import Line2D
 from utils_common.generate_signals import PlannerData
 from utils_common.results import (
@@ -19,7 +20,7 @@ from utils_common.results import (
 )
 from utils_common.utils import draw_trial_phases
 
-from .plant_models import JointState, JointStates, PlantPlotData
+from .plant_models import PlantPlotData
 
 plt.rcParams.update({"font.size": 15})
 
@@ -168,8 +169,13 @@ def plot_joint_space_animated(
     video_duration: float = None,
     fps: float = 25,
     save_fig: bool = True,
+    dpi: int = 300,
 ) -> None:
-    """Plots joint space position (actual vs desired)."""
+    """Plots joint space position (actual vs desired).
+
+    With `animated`, saves a `video_duration` s video of the trajectories being
+    drawn, at `dpi`, streamed straight to ffmpeg (see _save_growing_lines).
+    """
     plt.rcParams.update({"font.size": 13})
 
     x = time_vector_s
@@ -246,33 +252,22 @@ def plot_joint_space_animated(
     )
     fig.tight_layout()
 
-    if animated:
-        n_frames = video_duration * fps
-
-        def update(frame):
-            end = int(len(x) * frame / n_frames)
-            line1.set_data(x[:end], y1[:end])
-            line2.set_data(x[:end], y2[:end])
-            return (line1, line2)
-
-        ani = FuncAnimation(
-            fig, update, frames=n_frames, interval=1000 / fps, blit=True
-        )
-
     if save_fig:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         if animated:
-            with tqdm.tqdm(total=n_frames, unit="step", desc="Rendering") as pbar:
-                filepath = pth_fig_receiver / f"anim_position_joint_{timestamp}.mp4"
-                log.debug(f"Saving animated joint space plot at {filepath}...")
-                ani.save(
-                    filepath,
-                    writer="ffmpeg",
-                    fps=fps,
-                    dpi=300,
-                    progress_callback=lambda i, n: pbar.update(1),
-                )
-                log.info(f"Saved animated joint space plot at {filepath}")
+            filepath = pth_fig_receiver / f"anim_position_joint_{timestamp}.mp4"
+            log.debug(f"Saving animated joint space plot at {filepath}...")
+            _save_growing_lines(
+                fig,
+                [line1, line2],
+                x,
+                [y1, y2],
+                n_frames=int(video_duration * fps),
+                fps=fps,
+                path=filepath,
+                dpi=dpi,
+            )
+            log.info(f"Saved animated joint space plot at {filepath}")
         else:
             filepath = pth_fig_receiver / f"position_joint_{timestamp}.png"
             fig.savefig(filepath, dpi=180, transparent=False)
@@ -281,6 +276,60 @@ def plot_joint_space_animated(
     return fig, ax, filepath
 
 
+def _save_growing_lines(
+    fig,
+    lines: list[Line2D],
+    x: np.ndarray,
+    ys: list[np.ndarray],
+    n_frames,
+    fps,
+    path,
+    dpi,
+):
+    """
+    Saves to `path` a video of `lines` growing to (x, ys) over `n_frames`.
+
+    The figure is drawn once without the lines; each frame then only draws the
+    points added since the previous one on top of the same canvas buffer (the
+    lines are marker-only, so earlier points never change) and pipes the raw
+    RGBA buffer to ffmpeg.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from plant.video_capture import close_encoder, open_encoder
+
+    fig.set_dpi(dpi)
+    canvas = FigureCanvasAgg(fig)
+    for line in lines:
+        line.set_data([], [])
+        line.set_animated(True)
+    legend = lines[0].axes.get_legend()
+    if legend is not None:
+        legend.set_animated(True)
+    canvas.draw()
+    width, height = canvas.get_width_height(physical=True)
+
+    encoder = open_encoder(path, width, height, fps, pix_fmt="rgba")
+    try:
+        start = 0
+        for frame in tqdm.trange(n_frames, unit="frame", desc="Rendering"):
+            end = int(len(x) * frame / n_frames)
+            # one point of overlap keeps consecutive segments joined
+            for line, y in zip(lines, ys):
+                line.set_data(x[max(start - 1, 0) : end], y[max(start - 1, 0) : end])
+                line.axes.draw_artist(line)
+            if legend is not None:
+                legend.axes.draw_artist(legend)
+            start = end
+            encoder.stdin.write(canvas.buffer_rgba())
+    finally:
+        close_encoder(encoder)
+    for line, y in zip(lines, ys):
+        line.set_data(x, y)
+        line.set_animated(False)
+    if legend is not None:
+        legend.set_animated(False)
+
+
 def plot_desired(
     config: PlantConfig,
     time_vector_s: np.ndarray,
@@ -343,25 +392,19 @@ def plot_rmse(
     return fig, ax, filepath
 
 
-def plot_plant_outputs(
-    metas: list[ResultMeta],
-    animated_task: bool = False,
-    animated_plots: bool = False,
-):
-    """Loads all plant-related data and generates all plots."""
-    log.info("Generating plant plots...")
-
+def _load_joint_space(metas: list[ResultMeta]):
+    """
+    Plant data, params, time vector, planner trajectory and planner trajectory
+    shifted by the M1 delay of the chain `metas`.
+    """
     run_paths = [RunPaths.from_run_id(m.id) for m in metas]
     plant_data = extract_and_merge_plant_results(metas)
     params = [i.load_params() for i in metas]
-    ref_mp = params[0]
     time_vector_total_s = np.arange(
         0,
         sum(p.simulation.duration_s for p in params),
         params[0].simulation.resolution / 1000,
     )
-    ref_plant_config = PlantConfig(ref_mp)
-    joint_data = plant_data.joint_data[ELBOW]
     trjs = []
     trjs_shifted = []
     for rp, p in zip(run_paths, params):
@@ -379,6 +422,68 @@ def plot_plant_outputs(
             )
     desired_trajectory = np.concatenate(trjs, axis=0)
     desired_shifted = np.concatenate(trjs_shifted, axis=0)
+    return plant_data, params, time_vector_total_s, desired_trajectory, desired_shifted
+
+
+def _animate_chain(metas: list[ResultMeta], video_duration: float, fps: float) -> Path:
+    plant_data, params, time_vector_s, desired_trajectory, desired_shifted = (
+        _load_joint_space(metas)
+    )
+    _, _, filepath = plot_joint_space_animated(
+        pth_fig_receiver=PlantConfig(params[0]).run_paths.figures_receiver,
+        time_vector_s=time_vector_s,
+        pos_j_rad_actual=plant_data.joint_data[ELBOW].pos_rad,
+        desired_rad=desired_shifted,
+        unshifted_planner_rad=desired_trajectory,
+        sim_params=params[0].simulation,
+        num_trials=len(metas),
+        animated=True,
+        video_duration=video_duration,
+        fps=fps,
+    )
+    return filepath
+
+
+def animate_joint_space_chains(
+    chains: list[list[ResultMeta]],
+    video_duration: float = 5,
+    fps: float = 25,
+    workers: int | None = None,
+) -> list[Path]:
+    """
+    Renders the joint space animation of each chain (in the figures of its
+    first run), in parallel over `workers` processes. Returns the video paths.
+    """
+    if workers == 1 or len(chains) <= 1:
+        return [_animate_chain(c, video_duration, fps) for c in chains]
+    # fork: workers only need already imported code
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("fork")
+    ) as pool:
+        return list(
+            pool.map(
+                _animate_chain,
+                chains,
+                [video_duration] * len(chains),
+                [fps] * len(chains),
+            )
+        )
+
+
+def plot_plant_outputs(
+    metas: list[ResultMeta],
+    animated_task: bool = False,
+    animated_plots: bool = False,
+):
+    """Loads all plant-related data and generates all plots."""
+    log.info("Generating plant plots...")
+
+    plant_data, params, time_vector_total_s, desired_trajectory, desired_shifted = (
+        _load_joint_space(metas)
+    )
+    ref_mp = params[0]
+    ref_plant_config = PlantConfig(ref_mp)
+    joint_data = plant_data.joint_data[ELBOW]
 
     plot_rmse(metas, ref_plant_config.run_paths.figures_receiver)
 
@@ -397,20 +502,12 @@ def plot_plant_outputs(
                 "Asked to generate task video but no frames were generated during run. Animated plots will use default time."
             )
         else:
-            for ax in ref_mp.plotting.CAPTURE_VIDEO:
-                video_duration = int(
-                    len(ref_plant_config.time_vector_single_trial_s)
-                    / ref_mp.plotting.NUM_STEPS_CAPTURE_VIDEO
-                    / framerate
-                )
-                import ffmpeg
-
-                ffmpeg.input(
-                    f"{run_paths.video_frames / ax}/*.jpg",
-                    pattern_type="glob",
-                    framerate=framerate,
-                    loglevel="warning",
-                ).output(str((run_paths.figures / f"task_{ax}.mp4").absolute())).run()
+            # task_{ax}.mp4 are encoded during the run (plant.video_capture)
+            video_duration = int(
+                len(ref_plant_config.time_vector_single_trial_s)
+                / ref_mp.plotting.NUM_STEPS_CAPTURE_VIDEO
+                / framerate
+            )
 
     f, a, filepath = plot_joint_space_animated(
         pth_fig_receiver=ref_plant_config.run_paths.figures_receiver,
@@ -454,74 +551,50 @@ def generate_video_from_existing_result_single_trial(
     trial=0,
     AXES_TO_CAPTURE: list[str] = ["y"],
     complete_video_filename: str = "complete.mp4",
+    workers: int | None = None,
 ):
     """Creates animated video from AXES_TO_CAPTURE angles for a single trial
 
-    Uses the series of JointStates recorded in plotting data to step through a
-    single trial's worth of screenshots, every NUM_STEPS_CAPTURE_VIDEO. Has no
-     reset capabilities, so it only generates a single trial (`trial`). Generated
-     screenshots are included in `plant_config.run_paths.figures_receiver/{axis}`
+    Uses the series of JointStates recorded in plotting data to render a single
+    trial's worth of frames, every NUM_STEPS_CAPTURE_VIDEO (`trial`). Frames are
+    rendered by `workers` processes and streamed to ffmpeg (see
+    plant.video_capture.render_videos); videos are saved in
+    `plant_config.run_paths.figures_receiver/{axis}/task.mp4`
 
     If multiple axes are provided, composite video is generated in
     `plant_config.run_paths.figures_receiver/{complete_video_filename}`
     """
     import ffmpeg
-    import pybullet
-    from plant.robotic_plant import RoboticPlant
+    from plant.video_capture import render_videos
 
     images_path = plant_config.run_paths.figures_receiver
+    sim = plant_config.master_config.simulation
+    every = plant_config.master_config.plotting.NUM_STEPS_CAPTURE_VIDEO
 
-    plant = RoboticPlant(plant_config, pybullet)
-    data = plant_data.joint_data
-    steps_single_trial = int(
-        plant_config.master_config.simulation.duration_ms
-        / plant_config.master_config.simulation.resolution
-    )
+    steps_single_trial = sim.sim_steps
     start = trial * steps_single_trial
-    end = (trial + 1) * steps_single_trial
-    steps = start - end
-    len_max_frame_name = len(str(steps))
+    steps = np.arange(start, start + steps_single_trial, every)
+    joint_positions = np.stack(
+        [plant_data.joint_data[j].pos_rad[steps] for j in (SHOULDER, ELBOW, HAND)],
+        axis=1,
+    )
+    # the target follows the hand once neural control is over
+    attach_from = int(np.searchsorted(steps - start, sim.neural_control_steps, "right"))
+
     [
         (images_path / axis).mkdir(parents=True, exist_ok=True)
         for axis in AXES_TO_CAPTURE
     ]
-    for step in tqdm.tqdm(
-        range(
-            start,
-            end,
-            plant_config.master_config.plotting.NUM_STEPS_CAPTURE_VIDEO,
-        ),
-        desc="Frame generation:",
-    ):
-        state = JointStates(
-            shoulder=JointState(data[0].pos_rad[step], data[0].vel_rad_s[step]),
-            elbow=JointState(data[1].pos_rad[step], data[1].vel_rad_s[step]),
-            hand=JointState(data[2].pos_rad[step], data[2].vel_rad_s[step]),
-        )
-        plant._set_pos_all_joints(state)
+    render_videos(
+        plant_config,
+        joint_positions,
+        {axis: images_path / axis / "task.mp4" for axis in AXES_TO_CAPTURE},
+        attach_from=attach_from,
+        framerate=framerate,
+        workers=workers,
+    )
 
-        for axis in AXES_TO_CAPTURE:
-            image_path: Path = (
-                images_path / axis / f"<{step:0{len_max_frame_name}d}>.jpg"
-            )
-            plant._capture_state_and_save(image_path, axis)
-        if (step % start) > plant_config.master_config.simulation.neural_control_steps:
-            plant.update_ball_position()
-
-    plant.p.resetSimulation()
-    plant.p.disconnect()
-
-    single_axis_videos = []
-    for axis in AXES_TO_CAPTURE:
-        axis_path = images_path / axis
-        video_path = axis_path / "task.mp4"
-        single_axis_videos.append(video_path)
-        ffmpeg.input(
-            f"{axis_path}/*.jpg",
-            pattern_type="glob",
-            framerate=framerate,
-            loglevel="warning",
-        ).output(str(video_path.absolute())).run()
+    single_axis_videos = [images_path / axis / "task.mp4" for axis in AXES_TO_CAPTURE]
 
     if len(AXES_TO_CAPTURE) > 1:
         with open(images_path / "inputs.txt", "w", encoding="utf-8") as f:
@@ -2,12 +2,14 @@ from typing import List, Tuple
 
 import numpy as np
 import structlog
-from config.core_models import TargetColor
+from config.core_models import PlantBackend
 from config.plant_config import PlantConfig
 from utils_common.utils import TrialSection, get_current_section
 
-from .plant_models import EEData, JointData, PlantPlotData
+from .plant_models import PlantPlotData, PlantRecorder
+from .plant_utils import shoulder_direction
 from .robotic_plant import RoboticPlant
+from .video_capture import VideoRecorder
 
 
 class PlantSimulator:
@@ -20,7 +22,7 @@ class PlantSimulator:
     def __init__(
         self,
         config: PlantConfig,
-        pybullet_instance,
+        pybullet_instance=None,
     ):
         """
         Initializes the PlantSimulator.
@@ -28,6 +30,7 @@ class PlantSimulator:
         Args:
             config: a PlantConfig object.
             pybullet_instance: The initialized PyBullet instance (e.g., p from `import pybullet as p`).
+                Imported here if not given; unused with the NumPy plant backend.
         """
         self.log: structlog.stdlib.BoundLogger = structlog.get_logger(
             type(self).__name__
@@ -36,17 +39,24 @@ class PlantSimulator:
         self.config: PlantConfig = config
         self.p = pybullet_instance
 
-        self.plant = RoboticPlant(config=self.config, pybullet_instance=self.p)
-        self.log.debug("RoboticPlant initialized.")
+        backend = self.config.master_config.PLANT_BACKEND
+        if backend == PlantBackend.NUMPY:
+            from .numpy_plant import NumpyPlant
+
+            self.plant = NumpyPlant(config=self.config)
+        else:
+            if self.p is None:
+                import pybullet
+
+                self.p = pybullet
+            self.plant = RoboticPlant(config=self.config, pybullet_instance=self.p)
+        self.log.debug("Plant initialized.", backend=backend.value)
 
         self.num_total_steps = len(self.config.time_vector_total_s)
-        total_num_joints = (
-            self.config.master_config.NJT + self.config.master_config.JOINTS_NO_CONTROL
-        )
-        self.joint_data = [
-            JointData.empty(self.num_total_steps) for _ in range(total_num_joints)
-        ]
-        self.ee_data: EEData = EEData.empty(self.num_total_steps)
+        self.recorder = PlantRecorder(self.num_total_steps)
+        # views over the recorder
+        self.joint_data = self.recorder.joint_data()
+        self.ee_data = self.recorder.ee_data()
         # For storing raw received spikes before processing (per joint)
         self.received_spikes_pos: List[List[Tuple[float, int]]] = [
             [] for _ in range(self.config.NJT)
@@ -54,25 +64,27 @@ class PlantSimulator:
         self.received_spikes_neg: List[List[Tuple[float, int]]] = [
             [] for _ in range(self.config.NJT)
         ]
-        self.plant._capture_state_and_save(self.config.run_paths.input_image)
+        rendering = backend == PlantBackend.PYBULLET
+        if rendering:
+            self.plant._capture_state_and_save(self.config.run_paths.input_image)
         self.checked_proximity = False
         self.shoulder_moving = False
 
-        for ax in self.config.master_config.plotting.CAPTURE_VIDEO:
-            (self.config.run_paths.video_frames / ax).mkdir(exist_ok=True, parents=True)
-
-        # TODO this has to be saved from planner, and currently it's not. mock it!
-        if (
-            self.config.master_config.simulation.oracle.target_color
-            == TargetColor.BLUE_LEFT
-        ):
-            self.direction = 0.1
-        else:
-            self.direction = -0.1
+        self.video_recorder = None
+        if self.config.master_config.plotting.CAPTURE_VIDEO and not rendering:
+            self.log.warning(
+                "No task video with this plant backend", backend=backend.value
+            )
+        elif self.config.master_config.plotting.CAPTURE_VIDEO:
+            self.video_recorder = VideoRecorder(
+                self.plant,
+                {
+                    ax: self.config.run_paths.figures / f"task_{ax}.mp4"
+                    for ax in self.config.master_config.plotting.CAPTURE_VIDEO
+                },
+            )
 
-        self.max_len_frame_name = len(
-            str(self.config.TOTAL_SIM_DURATION_S * 1000 * self.config.RESOLUTION_MS)
-        )
+        self.direction = shoulder_direction(self.config)
 
         self.log.info("PlantSimulator initialization complete.")
 
@@ -112,13 +124,13 @@ class PlantSimulator:
         """Execute one simulation step.
 
         Returns:
-            Tuple containing (joint_pos_rad, joint_vel_rad_s, ee_pos_m, ee_vel_m_list)
-            where ee_pos_m and ee_vel_m_list are lists representing end effector
+            Tuple containing (joint_pos_rad, joint_vel_rad_s, ee_pos_m, ee_vel_m)
+            where ee_pos_m and ee_vel_m are tuples representing end effector
             position and velocity
         """
-        joint_states = self.plant.get_joint_states()
-        joint_pos_rad, joint_vel_rad_s = joint_states.elbow
-        ee_pos_m, ee_vel_m_list = self.plant.get_ee_pose_and_velocity()
+        state = self.plant.read_state()
+        joint_pos_rad, joint_vel_rad_s = state.pos[1], state.vel[1]
+        ee_pos_m, ee_vel_m = state.ee_pos, state.ee_vel
         curr_section = get_current_section(
             current_sim_time_s * 1000, self.config.master_config
         )
@@ -130,22 +142,16 @@ class PlantSimulator:
                 max_steps=self.num_total_steps,
                 sim_time=current_sim_time_s,
             )
-            return joint_pos_rad, joint_vel_rad_s, ee_pos_m, ee_vel_m_list, curr_section
+            return joint_pos_rad, joint_vel_rad_s, ee_pos_m, ee_vel_m, curr_section
 
         net_rate_hz = rate_pos_hz - rate_neg_hz
         elbow_torque = net_rate_hz / self.config.SCALE_TORQUE
         hand_torque = shoulder_torque = 0
 
-        if self.config.master_config.plotting.CAPTURE_VIDEO and not (
+        if self.video_recorder and not (
             step % self.config.master_config.plotting.NUM_STEPS_CAPTURE_VIDEO
         ):
-            for ax in self.config.master_config.plotting.CAPTURE_VIDEO:
-                self.plant._capture_state_and_save(
-                    self.config.run_paths.video_frames
-                    / ax
-                    / f"{step:0{self.max_len_frame_name}d}.jpg",
-                    axis=ax,
-                )
+            self.video_recorder.capture(state.pos)
 
         if not (step % 500):
             self.log.debug(
@@ -165,20 +171,63 @@ class PlantSimulator:
 
         self.plant.simulate_step()
 
-        imposed_torques = [hand_torque, elbow_torque, shoulder_torque]
-        for torque, (i, state) in zip(
-            imposed_torques,
-            enumerate(joint_states),
-        ):
-            self.joint_data[i].record_step(step, state.pos, state.vel, torque)
+        # same joint-to-torque pairing as the former per-joint recording
+        self.recorder.record(step, state, (hand_torque, elbow_torque, shoulder_torque))
+
+        return joint_pos_rad, joint_vel_rad_s, ee_pos_m, ee_vel_m, curr_section
 
-        self.ee_data.record_step(step, ee_pos_m, ee_vel_m_list)
+    def run_simulation_window(
+        self,
+        commands: List[Tuple[float, float]],
+        current_sim_time_s: float,
+        step: int,
+    ) -> Tuple[List[float], TrialSection, float]:
+        """Execute one step per (rate_pos, rate_neg) command, starting at `step`.
+
+        Returns:
+            Tuple containing (joint positions sent back to the controller, one per
+            step and masked to 0 during TIME_POST, section of the last step,
+            simulation time after the window)
+        """
+        joint_positions = []
+        curr_section = None
+        for i, (rate_pos, rate_neg) in enumerate(commands):
+            joint_pos_rad, _, _, _, curr_section = self.run_simulation_step(
+                rate_pos, rate_neg, current_sim_time_s, step + i
+            )
+            if curr_section == TrialSection.TIME_POST:
+                joint_pos_rad = 0.0  # mask joint position during TIME_POST
+            joint_positions.append(joint_pos_rad)
+            # accumulated, not step * resolution: section boundaries depend on it
+            current_sim_time_s += self.config.RESOLUTION_S
+        return joint_positions, curr_section, current_sim_time_s
+
+    def run_open_loop(
+        self,
+        command: Tuple[float, float],
+        current_sim_time_s: float,
+        step: int,
+    ) -> Tuple[float, TrialSection, float]:
+        """Run from `step` to the end of the trial with a constant command.
+
+        Used once the controller is no longer simulated (OPEN_LOOP_SECTIONS) and
+        every further command it would send is the same.
 
-        return joint_pos_rad, joint_vel_rad_s, ee_pos_m, ee_vel_m_list, curr_section
+        Returns:
+            Tuple containing (last joint position as sent to the controller,
+            section of the last step, simulation time at the end)
+        """
+        n_steps = self.config.master_config.simulation.sim_steps - step
+        joint_positions, curr_section, current_sim_time_s = self.run_simulation_window(
+            [command] * n_steps, current_sim_time_s, step
+        )
+        return joint_positions[-1], curr_section, current_sim_time_s
 
     def finalize_and_process_data(self, reached_joint_rad) -> PlantPlotData:
         """Saves all data required for post-simulation analysis and plotting."""
         self.log.info("Finalizing and saving simulation data...")
+        if self.video_recorder:
+            self.video_recorder.close()
         error = reached_joint_rad - self.config.target_joint_pos_rad
 
         plot_data = PlantPlotData(
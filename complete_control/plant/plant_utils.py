@@ -1,6 +1,8 @@
 from typing import List, Tuple
 
 import structlog
+from config.core_models import TargetColor
+from config.plant_config import PlantConfig
 
 _log = structlog.get_logger(__name__)
 
@@ -48,3 +50,11 @@ def compute_spike_rate(
 
     rate_hz = count / (duration * n_neurons)
     return rate_hz, count
+
+
+def shoulder_direction(config: PlantConfig) -> float:
+    """Shoulder velocity (rad/s) after grasping: towards the side of the target."""
+    # TODO this has to be saved from planner, and currently it's not. mock it!
+    if config.master_config.simulation.oracle.target_color == TargetColor.BLUE_LEFT:
+        return 0.1
+    return -0.1
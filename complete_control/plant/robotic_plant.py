@@ -6,7 +6,7 @@ import numpy as np
 import structlog
 from config.paths import EMBODIMENT_ASSETS
 from config.plant_config import PlantConfig
-from plant.plant_models import JointState, JointStates
+from plant.plant_models import JointState, JointStates, PlantState
 
 
 class RoboticPlant:
@@ -51,6 +51,8 @@ class RoboticPlant:
         )  # TODO this only works because the link id of the hand is the same as the joint id of the knuckles. fix it!
         self.elbow_joint_id: int = self.ELBOW_JOINT_ID
         self.elbow_joint_locked = False
+        # (pos, vel) of the elbow from the last read_state, until the next step
+        self._elbow_state = None
         self.ball = None
         self.ball_hand_rel_pos = self.ball_hand_rel_orn = None
 
@@ -91,70 +93,17 @@ class RoboticPlant:
         )
 
     def _load_robot(self) -> int:
-        """Load robot URDF and disable default motor controls."""
-        robot_id = self.p.loadURDF(
-            fileName=self._URDF_MODEL_FILENAME,
-            useFixedBase=True,
-            physicsClientId=self._server_id,
-        )
-        self.p.resetBasePositionAndOrientation(
-            bodyUniqueId=robot_id,
-            posObj=[0.0, 0.0, 0.0],
-            ornObj=[0.0, 0.0, 0.0, 1.0],
-            physicsClientId=self._server_id,
-        )
-        joint_ids = [self.SHOULDER_A_JOINT_ID, self.ELBOW_JOINT_ID]
-        self.p.setJointMotorControlArray(
-            robot_id,
-            jointIndices=joint_ids,
-            controlMode=self.p.POSITION_CONTROL,
-            forces=[0.0, 0.0],
-            physicsClientId=self._server_id,
-        )
-        self.p.setJointMotorControlArray(
-            robot_id,
-            jointIndices=joint_ids,
-            controlMode=self.p.VELOCITY_CONTROL,
-            forces=[0.0, 0.0],
-            physicsClientId=self._server_id,
-        )
-        return robot_id
+        return load_robot(self.p, self._server_id)
 
     def _load_plane(self) -> None:
-        """Load ground plane URDF and reposition it."""
-        plane_id = self.p.loadURDF(
-            fileName=self._PLANE_MODEL_FILENAME,
-            useFixedBase=True,
-            physicsClientId=self._server_id,
-        )
-        new_position = [0, 10, 10]
-        rotation_quaternion = self.p.getQuaternionFromEuler([np.pi / 2, 0, 0])
-        self.p.resetBasePositionAndOrientation(
-            plane_id,
-            new_position,
-            rotation_quaternion,
-            physicsClientId=self._server_id,
-        )
+        load_plane(self.p, self._server_id)
 
     def _load_target(self, target_position, target_color=(1, 0, 0, 1)):
-        """Create a visual sphere at target_position."""
-        ball_shape = self.p.createVisualShape(
-            shapeType=self.p.GEOM_SPHERE,
-            radius=0.02,
-            rgbaColor=target_color,
-            physicsClientId=self._server_id,
-        )
-        return self.p.createMultiBody(
-            baseMass=0,
-            baseInertialFramePosition=[0, 0, 0],
-            baseCollisionShapeIndex=-1,
-            baseVisualShapeIndex=ball_shape,
-            basePosition=target_position,
-            physicsClientId=self._server_id,
-        )
+        return load_target(self.p, self._server_id, target_position, target_color)
 
     def _set_rad_elbow(self, position_rad) -> np.ndarray:
         """Sets joint to position_rad and returns EE (cartesian) position"""
+        self._elbow_state = None
         self.p.resetJointState(
             self.robot_id,
             self.ELBOW_JOINT_ID,
@@ -163,6 +112,7 @@ class RoboticPlant:
         return self.p.getLinkState(self.robot_id, self.HAND_LINK_ID)[0]
 
     def _set_pos_all_joints(self, state: JointStates):
+        self._elbow_state = None
         self.p.resetJointState(
             self.robot_id,
             self.shoulder_joint_id,
@@ -181,6 +131,7 @@ class RoboticPlant:
 
     def _set_rad_shoulder(self, position_rad) -> np.ndarray:
         """Sets joint to position_rad and returns EE (cartesian) position"""
+        self._elbow_state = None
         self.p.resetJointState(
             self.robot_id,
             self.SHOULDER_A_JOINT_ID,
@@ -191,39 +142,8 @@ class RoboticPlant:
     def _capture_state_and_save(self, image_path: Path, axis="y") -> None:
         from PIL import Image
 
-        if axis == "y":
-            camera_target_position = [0.3, 0.3, 1.5]
-            camera_position = [0, -1, 1.7]
-        elif axis == "x":
-            camera_target_position = [0, 0, 1.5]
-            camera_position = [1, 0, 1.7]
-        elif axis == "z":
-            camera_target_position = [0, 0, -1]
-            camera_position = [0.1, 0, 2.5]
-        else:
-            raise ValueError("axis possible values: [x,y,z]")
-        up_vector = [0, 0, 1]
-        width = 1024
-        height = 768
-        fov = 60
-        aspect = width / height
-        near = 0.1
-        far = 100
-        projection_matrix = self.p.computeProjectionMatrixFOV(fov, aspect, near, far)
-        view_matrix = self.p.computeViewMatrix(
-            camera_position, camera_target_position, up_vector
-        )
-        img_arr = self.p.getCameraImage(
-            width,
-            height,
-            viewMatrix=view_matrix,
-            projectionMatrix=projection_matrix,
-            renderer=self.p.ER_BULLET_HARDWARE_OPENGL,
-        )
-
-        rgb_buffer = np.array(img_arr[2])
-        rgb = rgb_buffer[:, :, :3]  # drop alpha
-        Image.fromarray(rgb.astype(np.uint8)).save(image_path)
+        rgb = render_camera(self.p, self._server_id, axis)
+        Image.fromarray(rgb).save(image_path)
 
     def _test_init_tgt_positions(self) -> None:
         self.init_hand_pos_ee = self._set_rad_elbow(self.initial_joint_position_rad)
@@ -250,14 +170,8 @@ class RoboticPlant:
         """
         Gets the current state (position and velocity) all joints.
         """
-        s = self.p.getJointState(
-            bodyUniqueId=self.robot_id, jointIndex=self.shoulder_joint_id
-        )
-        e = self.p.getJointState(
-            bodyUniqueId=self.robot_id, jointIndex=self.elbow_joint_id
-        )
-        h = self.p.getJointState(
-            bodyUniqueId=self.robot_id, jointIndex=self.hand_joint_id
+        s, e, h = self.p.getJointStates(
+            self.robot_id, PLANT_JOINT_IDS, physicsClientId=self._server_id
         )
         return JointStates(
             shoulder=JointState(s[0], s[1]),
@@ -265,6 +179,21 @@ class RoboticPlant:
             hand=JointState(h[0], h[1]),
         )
 
+    def read_state(self) -> PlantState:
+        """Current joint and end-effector state (see read_plant_state)."""
+        state = read_plant_state(self.p, self._server_id, self.robot_id)
+        self._elbow_state = (state.pos[1], state.vel[1])
+        return state
+
+    def _get_elbow_state(self) -> Tuple[float, float]:
+        if self._elbow_state is None:
+            self._elbow_state = tuple(
+                self.p.getJointState(
+                    self.robot_id, self.elbow_joint_id, physicsClientId=self._server_id
+                )[:2]
+            )
+        return self._elbow_state
+
     def get_ee_pose_and_velocity(self) -> Tuple[List[float], List[float]]:
         """
         Gets the current end-effector pose (x, y, z) and velocity (vx, vy, vz).
@@ -308,12 +237,18 @@ class RoboticPlant:
 
     def simulate_step(self) -> None:
         """Steps the PyBullet simulation by one timestep."""
+        self._elbow_state = None
         self.p.stepSimulation(physicsClientId=self._server_id)
 
+    def disconnect(self) -> None:
+        """Closes the PyBullet client of this plant."""
+        self.p.disconnect(physicsClientId=self._server_id)
+
     def reset_plant(self) -> None:
         """
         Resets the robotic arm to its initial "zero" joint position and zero velocity.
         """
+        self._elbow_state = None
         self.p.resetJointState(
             bodyUniqueId=self.robot_id,
             jointIndex=self.elbow_joint_id,
@@ -361,8 +296,9 @@ class RoboticPlant:
         """Lock elbow joint at its current position using position control."""
         if not self.elbow_joint_locked:
             self.log.debug("setting joint torque to zero")
-            current_joint_pos_rad, vel = self.get_joint_states().elbow
+            current_joint_pos_rad, vel = self._get_elbow_state()
             self.log.debug("current joint state", pos=current_joint_pos_rad, vel=vel)
+            self._elbow_state = None
 
             # First reset state with zero velocity
             self.p.resetJointState(
@@ -392,7 +328,7 @@ class RoboticPlant:
 
     def unlock_joint(self) -> None:
         """Unlock joint by setting it to velocity control mode."""
-        current_joint_pos_rad, vel = self.get_joint_states().elbow
+        current_joint_pos_rad, _ = self._get_elbow_state()
         self.p.setJointMotorControl2(
             bodyIndex=self.robot_id,
             jointIndex=self.elbow_joint_id,
@@ -403,7 +339,7 @@ class RoboticPlant:
         self.elbow_joint_locked = False
 
     def check_target_proximity(self) -> bool:
-        elbow_state = self.p.getJointState(self.robot_id, 1)[0]
+        elbow_state = self._get_elbow_state()[0]
         return math.isclose(
             elbow_state,
             self.target_joint_position_rad,
@@ -452,3 +388,138 @@ class RoboticPlant:
             hand_pos, hand_orn, self.ball_hand_rel_pos, self.ball_hand_rel_orn
         )
         self.p.resetBasePositionAndOrientation(self.ball, ball_pos, ball_orn)
+
+
+# joints of PlantState, in the order of JointStates
+PLANT_JOINT_IDS = (
+    RoboticPlant.SHOULDER_A_JOINT_ID,
+    RoboticPlant.ELBOW_JOINT_ID,
+    RoboticPlant.HAND_LINK_ID,
+)
+
+
+def read_plant_state(p, client_id: int, robot_id: int) -> PlantState:
+    """
+    Joint positions and velocities (PLANT_JOINT_IDS) and end-effector position
+    and velocity of `robot_id`, with one getJointStates and one getLinkState call.
+    """
+    s, e, h = p.getJointStates(robot_id, PLANT_JOINT_IDS, physicsClientId=client_id)
+    ee_state = p.getLinkState(
+        robot_id,
+        RoboticPlant.HAND_LINK_ID,
+        computeLinkVelocity=True,
+        physicsClientId=client_id,
+    )
+    return PlantState((s[0], e[0], h[0]), (s[1], e[1], h[1]), ee_state[0], ee_state[6])
+
+
+# camera (target position, camera position) for each capture axis
+CAMERA_VIEWS = {
+    "y": ([0.3, 0.3, 1.5], [0, -1, 1.7]),
+    "x": ([0, 0, 1.5], [1, 0, 1.7]),
+    "z": ([0, 0, -1], [0.1, 0, 2.5]),
+}
+CAMERA_WIDTH = 1024
+CAMERA_HEIGHT = 768
+
+
+def render_camera(
+    p,
+    client_id: int,
+    axis: str = "y",
+    width: int = CAMERA_WIDTH,
+    height: int = CAMERA_HEIGHT,
+    renderer=None,
+) -> np.ndarray:
+    """Renders the scene of `client_id` seen from `axis`, as (height, width, 3) uint8 RGB."""
+    if axis not in CAMERA_VIEWS:
+        raise ValueError("axis possible values: [x,y,z]")
+    camera_target_position, camera_position = CAMERA_VIEWS[axis]
+    up_vector = [0, 0, 1]
+    fov = 60
+    aspect = width / height
+    near = 0.1
+    far = 100
+    projection_matrix = p.computeProjectionMatrixFOV(
+        fov, aspect, near, far, physicsClientId=client_id
+    )
+    view_matrix = p.computeViewMatrix(
+        camera_position, camera_target_position, up_vector, physicsClientId=client_id
+    )
+    img_arr = p.getCameraImage(
+        width,
+        height,
+        viewMatrix=view_matrix,
+        projectionMatrix=projection_matrix,
+        renderer=p.ER_BULLET_HARDWARE_OPENGL if renderer is None else renderer,
+        physicsClientId=client_id,
+    )
+    rgba = np.asarray(img_arr[2], dtype=np.uint8).reshape(height, width, 4)
+    return rgba[:, :, :3]  # drop alpha
+
+
+def load_robot(p, client_id: int) -> int:
+    """Load robot URDF and disable default motor controls."""
+    robot_id = p.loadURDF(
+        fileName=RoboticPlant._URDF_MODEL_FILENAME,
+        useFixedBase=True,
+        physicsClientId=client_id,
+    )
+    p.resetBasePositionAndOrientation(
+        bodyUniqueId=robot_id,
+        posObj=[0.0, 0.0, 0.0],
+        ornObj=[0.0, 0.0, 0.0, 1.0],
+        physicsClientId=client_id,
+    )
+    joint_ids = [RoboticPlant.SHOULDER_A_JOINT_ID, RoboticPlant.ELBOW_JOINT_ID]
+    p.setJointMotorControlArray(
+        robot_id,
+        jointIndices=joint_ids,
+        controlMode=p.POSITION_CONTROL,
+        forces=[0.0, 0.0],
+        physicsClientId=client_id,
+    )
+    p.setJointMotorControlArray(
+        robot_id,
+        jointIndices=joint_ids,
+        controlMode=p.VELOCITY_CONTROL,
+        forces=[0.0, 0.0],
+        physicsClientId=client_id,
+    )
+    return robot_id
+
+
+def load_plane(p, client_id: int) -> int:
+    """Load ground plane URDF and reposition it."""
+    plane_id = p.loadURDF(
+        fileName=RoboticPlant._PLANE_MODEL_FILENAME,
+        useFixedBase=True,
+        physicsClientId=client_id,
+    )
+    new_position = [0, 10, 10]
+    rotation_quaternion = p.getQuaternionFromEuler([np.pi / 2, 0, 0])
+    p.resetBasePositionAndOrientation(
+        plane_id,
+        new_position,
+        rotation_quaternion,
+        physicsClientId=client_id,
+    )
+    return plane_id
+
+
+def load_target(p, client_id: int, target_position, target_color=(1, 0, 0, 1)) -> int:
+    """Create a visual sphere at target_position."""
+    ball_shape = p.createVisualShape(
+        shapeType=p.GEOM_SPHERE,
+        radius=0.02,
+        rgbaColor=target_color,
+        physicsClientId=client_id,
+    )
+    return p.createMultiBody(
+        baseMass=0,
+        baseInertialFramePosition=[0, 0, 0],
+        baseCollisionShapeIndex=-1,
+        baseVisualShapeIndex=ball_shape,
+        basePosition=target_position,
+        physicsClientId=client_id,
+    )
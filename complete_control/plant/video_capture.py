@@ -0,0 +1,351 @@
+"""
+Task video capture off the co-simulation loop.
+
+The simulation loop only snapshots the joint positions and the target pose of
+a frame and queues them (VideoRecorder.capture). A background process replays
+each snapshot in its own DIRECT PyBullet client, renders it from every capture
+axis and pipes the raw RGB frames into one ffmpeg encoder per axis, so no
+rendering or image encoding happens in the loop and no frames touch the disk.
+Processes are spawned, not forked: the plant engine process runs gRPC threads.
+
+Videos of already recorded trials are rendered the same way by render_videos,
+with the frames split across a pool of processes, each with its own client.
+"""
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+import structlog
+from config.paths import EMBODIMENT_ASSETS
+from config.plant_config import PlantConfig
+
+from .robotic_plant import (
+    CAMERA_HEIGHT,
+    CAMERA_WIDTH,
+    PLANT_JOINT_IDS,
+    RoboticPlant,
+    load_plane,
+    load_robot,
+    load_target,
+    render_camera,
+)
+
+DEFAULT_FRAMERATE = 25
+# frames rendered per pool task by render_videos
+FRAMES_PER_TASK = 8
+
+
+class FrameRenderer:
+    """
+    Replica of the plant scene in a private DIRECT PyBullet client, rendering
+    frames from joint positions and target pose.
+    """
+
+    def __init__(
+        self, target_position, target_color, width=CAMERA_WIDTH, height=CAMERA_HEIGHT
+    ):
+        import pybullet
+
+        self.p = pybullet
+        self.width = width
+        self.height = height
+        self.client_id = self.p.connect(self.p.DIRECT)
+        self.p.setAdditionalSearchPath(
+            path=str(EMBODIMENT_ASSETS), physicsClientId=self.client_id
+        )
+        self.robot_id = load_robot(self.p, self.client_id)
+        load_plane(self.p, self.client_id)
+        self.target_pose = (tuple(target_position), (0.0, 0.0, 0.0, 1.0))
+        self.ball = load_target(self.p, self.client_id, target_position, target_color)
+        self._ball_forearm_pose = None
+
+    @classmethod
+    def from_config(cls, config: PlantConfig, **kwargs) -> "FrameRenderer":
+        """Renderer of the scene of the RoboticPlant built from `config`."""
+        return cls.for_target(*_target_args(config), **kwargs)
+
+    @classmethod
+    def for_target(
+        cls, target_elbow_rad: float, target_color, **kwargs
+    ) -> "FrameRenderer":
+        """Renderer with the target at the hand, with the elbow at `target_elbow_rad`."""
+        renderer = cls((0, 0, 0), target_color, **kwargs)
+        # as RoboticPlant: the target sits at the hand, with the elbow at target
+        renderer.set_state([0.0, target_elbow_rad, 0.0])
+        renderer.target_pose = (
+            renderer._link_pose(RoboticPlant.HAND_LINK_ID)[0],
+            renderer.target_pose[1],
+        )
+        return renderer
+
+    def _link_pose(self, link_id: int):
+        state = self.p.getLinkState(
+            self.robot_id, link_id, physicsClientId=self.client_id
+        )
+        return state[0], state[1]
+
+    def attach_ball(self, joint_positions: Sequence[float]):
+        """
+        Fixes the target to the forearm, at the relative pose it has when the
+        arm is in `joint_positions`, as RoboticPlant.update_ball_position does.
+        """
+        self.set_state(joint_positions)
+        inv_pos, inv_orn = self.p.invertTransform(
+            *self._link_pose(RoboticPlant.FOREARM_LINK_ID),
+            physicsClientId=self.client_id,
+        )
+        self._ball_forearm_pose = self.p.multiplyTransforms(
+            inv_pos, inv_orn, *self.target_pose, physicsClientId=self.client_id
+        )
+
+    def set_state(
+        self,
+        joint_positions: Sequence[float],
+        ball_pose=None,
+        follow_forearm: bool = False,
+    ):
+        """
+        Sets the joints and the target, to `ball_pose`, to its pose relative to
+        the forearm (`follow_forearm`, after attach_ball) or to its initial pose.
+        """
+        for joint_id, pos in zip(PLANT_JOINT_IDS, joint_positions):
+            self.p.resetJointState(
+                self.robot_id, joint_id, pos, physicsClientId=self.client_id
+            )
+        if follow_forearm:
+            ball_pose = self.p.multiplyTransforms(
+                *self._link_pose(RoboticPlant.FOREARM_LINK_ID),
+                *self._ball_forearm_pose,
+                physicsClientId=self.client_id,
+            )
+        elif ball_pose is None:
+            ball_pose = self.target_pose
+        self.p.resetBasePositionAndOrientation(
+            self.ball, *ball_pose, physicsClientId=self.client_id
+        )
+
+    def render(self, axis: str) -> np.ndarray:
+        return render_camera(self.p, self.client_id, axis, self.width, self.height)
+
+    def close(self):
+        self.p.disconnect(physicsClientId=self.client_id)
+
+
+def _target_args(config: PlantConfig) -> tuple:
+    # picklable arguments of FrameRenderer.for_target
+    oracle = config.master_config.simulation.oracle
+    return (
+        config.target_joint_pos_rad + oracle.tgt_visual_offset_rad,
+        oracle.target_color.value,
+    )
+
+
+def open_encoder(
+    path: Path, width: int, height: int, framerate: int, pix_fmt: str = "rgb24"
+):
+    """
+    ffmpeg process encoding the raw `pix_fmt` frames written to its stdin into
+    `path` (padded to even dimensions, as yuv420p requires).
+    """
+    import ffmpeg
+
+    return (
+        ffmpeg.input(
+            "pipe:",
+            format="rawvideo",
+            pix_fmt=pix_fmt,
+            s=f"{width}x{height}",
+            framerate=framerate,
+        )
+        .output(
+            str(Path(path).absolute()),
+            pix_fmt="yuv420p",
+            vf="pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            loglevel="warning",
+        )
+        .overwrite_output()
+        .run_async(pipe_stdin=True)
+    )
+
+
+def close_encoder(encoder):
+    encoder.stdin.close()
+    encoder.wait()
+
+
+def _record(queue, target_position, target_color, outputs: dict, framerate: int):
+    log = structlog.get_logger("VideoRecorder")
+    renderer = FrameRenderer(target_position, target_color)
+    encoders = {
+        axis: open_encoder(path, renderer.width, renderer.height, framerate)
+        for axis, path in outputs.items()
+    }
+    n_frames = 0
+    try:
+        while (snapshot := queue.get()) is not None:
+            renderer.set_state(*snapshot)
+            for axis, encoder in encoders.items():
+                encoder.stdin.write(renderer.render(axis).tobytes())
+            n_frames += 1
+    finally:
+        for encoder in encoders.values():
+            close_encoder(encoder)
+        renderer.close()
+    log.info("Task videos encoded", n_frames=n_frames, videos=list(outputs.values()))
+
+
+class VideoRecorder:
+    """
+    Records task videos of a plant from the axes in `outputs` ({axis: mp4 path})
+    in a background process. `capture` only queues the snapshot of a frame;
+    `close` waits for the videos to be encoded.
+    """
+
+    def __init__(
+        self,
+        plant: RoboticPlant,
+        outputs: dict[str, Path],
+        framerate: int = DEFAULT_FRAMERATE,
+    ):
+        self.log = structlog.get_logger(type(self).__name__)
+        self.plant = plant
+        target_position, _ = plant.p.getBasePositionAndOrientation(
+            plant.ball, physicsClientId=plant._server_id
+        )
+        target_color = plant.config.master_config.simulation.oracle.target_color.value
+        # spawn: forking the engine process (gRPC threads) is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        self._queue = ctx.Queue()
+        self._process = ctx.Process(
+            target=_record,
+            args=(self._queue, target_position, target_color, outputs, framerate),
+            daemon=True,
+        )
+        self._process.start()
+        self.log.debug("Video recorder started", videos=list(outputs.values()))
+
+    def _stop(self):
+        # nobody reads the queue anymore: don't wait for it to be flushed at exit
+        self.log.error("Video recorder failed", exitcode=self._process.exitcode)
+        self._queue.cancel_join_thread()
+        self._queue.close()
+        self._process = None
+
+    def _running(self) -> bool:
+        if self._process is None:
+            return False
+        if not self._process.is_alive():
+            self._stop()
+            return False
+        return True
+
+    def capture(self, joint_positions: Sequence[float]):
+        """Queues a frame with the given joint positions and the current target pose."""
+        if not self._running():
+            return
+        ball_pose = self.plant.p.getBasePositionAndOrientation(
+            self.plant.ball, physicsClientId=self.plant._server_id
+        )
+        self._queue.put((tuple(joint_positions), ball_pose))
+
+    def close(self):
+        if not self._running():
+            return
+        self._queue.put(None)
+        self._process.join()
+        if self._process.exitcode:
+            self._stop()
+            return
+        self._queue.close()
+        self._process = None
+
+
+# renderer of the current render_videos worker process
+_renderer: FrameRenderer | None = None
+
+
+def _init_worker(target_elbow_rad: float, target_color, attach_joints):
+    global _renderer
+    _renderer = FrameRenderer.for_target(target_elbow_rad, target_color)
+    if attach_joints is not None:
+        _renderer.attach_ball(attach_joints)
+
+
+def _render_frames(axis: str, joint_positions: np.ndarray, follow: np.ndarray) -> bytes:
+    frames = bytearray()
+    for joints, follow_forearm in zip(joint_positions, follow):
+        _renderer.set_state(joints, follow_forearm=follow_forearm)
+        frames += _renderer.render(axis).tobytes()
+    return bytes(frames)
+
+
+def render_videos(
+    config: PlantConfig,
+    joint_positions: np.ndarray,
+    outputs: dict[str, Path],
+    attach_from: int | None = None,
+    framerate: int = DEFAULT_FRAMERATE,
+    workers: int | None = None,
+):
+    """
+    Renders one video per axis of `outputs` ({axis: mp4 path}) of the frames
+    in `joint_positions` (frames, joints in PLANT_JOINT_IDS order). From
+    frame `attach_from` on the target follows the forearm.
+
+    Frames are split in chunks of FRAMES_PER_TASK rendered by `workers`
+    processes (default: one per core), each with its own DIRECT client, and
+    streamed in order to the ffmpeg encoders; all axes render concurrently.
+    """
+    joint_positions = np.asarray(joint_positions, dtype=np.float64)
+    workers = workers or os.cpu_count() or 1
+    n_frames = len(joint_positions)
+    follow = np.zeros(n_frames, dtype=bool)
+    attach_joints = None
+    if attach_from is not None and attach_from < n_frames:
+        follow[attach_from:] = True
+        attach_joints = joint_positions[attach_from]
+
+    tasks = [
+        (axis, start)
+        for start in range(0, n_frames, FRAMES_PER_TASK)
+        for axis in outputs
+    ]
+    encoders = {
+        axis: open_encoder(path, CAMERA_WIDTH, CAMERA_HEIGHT, framerate)
+        for axis, path in outputs.items()
+    }
+    try:
+        # spawn: the caller may be a threaded engine process, unsafe to fork
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(*_target_args(config), attach_joints),
+        ) as pool:
+            # bounded look-ahead: only a few chunks of raw frames held at a time
+            max_pending = 2 * workers
+            pending = deque()
+            for axis, start in tasks:
+                chunk = slice(start, start + FRAMES_PER_TASK)
+                pending.append(
+                    (
+                        axis,
+                        pool.submit(
+                            _render_frames, axis, joint_positions[chunk], follow[chunk]
+                        ),
+                    )
+                )
+                if len(pending) >= max_pending:
+                    axis_done, fut = pending.popleft()
+                    encoders[axis_done].stdin.write(fut.result())
+            while pending:
+                axis_done, fut = pending.popleft()
+                encoders[axis_done].stdin.write(fut.result())
+    finally:
+        for encoder in encoders.values():
+            close_encoder(encoder)
@@ -3,6 +3,7 @@
 import argparse
 import dataclasses
 import datetime
+import sqlite3
 import sys
 from pathlib import Path
 
@@ -11,8 +12,12 @@ import structlog
 from complete_control.config import paths
 from complete_control.config.paths import RUNS_DIR, RunPaths
 from complete_control.config.ResultMeta import ResultMeta
+from complete_control.config.run_catalog import RunCatalog
 from complete_control.neural.plot_utils import plot_controller_outputs
-from complete_control.plant.plant_plotting import plot_plant_outputs
+from complete_control.plant.plant_plotting import (
+    animate_joint_space_chains,
+    plot_plant_outputs,
+)
 from complete_control.utils_common.draw_schema import draw_schema
 from complete_control.utils_common.draw_schema_svg import draw_schema as draw_schema_svg
 from complete_control.utils_common.results import gather_metas
@@ -51,6 +56,14 @@ def parse_selection(selection_str: str, total_length: int) -> list[int]:
 
 def find_most_recent_run() -> Path | None:
     """Finds the most recent run directory in RUNS_DIR."""
+    try:
+        latest_dir = RunCatalog().latest()
+        if latest_dir is not None:
+            return latest_dir
+    except sqlite3.Error:
+        # no RUNS_DIR or unreadable catalog: fall back to the directory listing
+        pass
+    # empty catalog: runs saved before it existed
     try:
         subdirs = [d for d in RUNS_DIR.iterdir() if d.is_dir()]
         if not subdirs:
@@ -90,8 +103,28 @@ def main():
         default="svg",
         help="Schema generation method: 'matplotlib' (old hardcoded) or 'svg' (new template-based)",
     )
+    parser.add_argument(
+        "--animate-chains",
+        type=str,
+        nargs="+",
+        default=None,
+        metavar="ID",
+        help="Only render the joint space animation of the chain of each ID, in parallel",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes rendering --animate-chains (default: one per core)",
+    )
     args = parser.parse_args()
 
+    if args.animate_chains:
+        chains = [list(reversed(gather_metas(id))) for id in args.animate_chains]
+        videos = animate_joint_space_chains(chains, workers=args.workers)
+        log.info("Joint space animations complete.", videos=[str(v) for v in videos])
+        return
+
     metas = None
     run_dir = None
 
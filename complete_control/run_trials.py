@@ -8,13 +8,18 @@ import structlog
 # Ensure we can import from the current directory
 sys.path.append(str(Path(__file__).parent.resolve()))
 
-from nrp_start_sim import run_trial
-
 log = structlog.get_logger()
 
 
-def run_trial_nrp(trial_num: int, total_trials: int, parent_id: str, label: str) -> str:
-    log.info(f"--- Starting NRP Trial {trial_num}/{total_trials} ---")
+def run_trial_nrp(
+    trial_num: int, total_trials: int, parent_id: str, label: str, runner: str = "nrp"
+) -> str:
+    if runner == "local":
+        from local_start_sim import run_trial
+    else:
+        from nrp_start_sim import run_trial
+
+    log.info(f"--- Starting {runner} Trial {trial_num}/{total_trials} ---")
 
     if parent_id:
         log.info(f"Continuing from parent run: {parent_id}")
@@ -49,6 +54,17 @@ def main():
         help="The simulation backend to use (default: '').",
         default="",
     )
+    parser.add_argument(
+        "--runner",
+        choices=["nrp", "local"],
+        help="Run each trial through NRP or in-process, without NRP (default: nrp).",
+        default="nrp",
+    )
+    parser.add_argument(
+        "--persistent",
+        action="store_true",
+        help="Build the network once and chain all trials on it (local runner only).",
+    )
     args = parser.parse_args()
 
     if args.num_trials <= 0:
@@ -66,10 +82,27 @@ def main():
     log.info(f"Working directory: {os.getcwd()}")
     log.info(f"Starting NRP simulation series of {args.num_trials} trials.")
 
+    if args.persistent:
+        if args.runner != "local":
+            log.error("--persistent requires --runner local.")
+            sys.exit(1)
+        from local_start_sim import run_chain
+
+        try:
+            run_ids = run_chain(args.num_trials, current_parent_id, args.label)
+        except KeyboardInterrupt:
+            log.warning("Simulation chain interrupted by user.")
+            sys.exit(130)
+        except Exception:
+            log.error("Persistent simulation chain failed.", exc_info=True)
+            sys.exit(1)
+        log.info("All trials completed successfully.", run_ids=run_ids)
+        return
+
     for i in range(args.num_trials):
         try:
             run_id = run_trial_nrp(
-                i + 1, args.num_trials, current_parent_id, args.label
+                i + 1, args.num_trials, current_parent_id, args.label, args.runner
             )
 
             current_parent_id = run_id
@@ -141,7 +141,7 @@ def draw_schema(metas: list[ResultMeta], scale_factor: float = 0.005):
     def get_p_path(name):
         key = p_map.get(name)
         if key and key in p:
-            return p[key][2]
+            return p[key].path
         return None
 
     components_raw = {
@@ -15,6 +15,7 @@ Arrows are ignored, so include them as you want to see them.
 """
 
 import base64
+import io
 import shutil
 from pathlib import Path
 from xml.etree import ElementTree as ET
@@ -53,7 +54,7 @@ def prep_temp_dir(run_paths: RunPaths):
 def embed_image_in_svg(
     svg_tree: ET.ElementTree,
     placeholder_id: str,
-    image_path: Path,
+    image: bytes | Path,
     preserve_aspect: bool = True,
     padding: int = 5,
 ):
@@ -63,7 +64,7 @@ def embed_image_in_svg(
     Args:
         svg_tree: Parsed SVG tree
         placeholder_id: ID of the placeholder rect
-        image_path: Path to the image to embed
+        image: PNG (bytes) or path of the image to embed
         preserve_aspect: If True, fit image within bounds preserving aspect ratio
         padding: Pixels of border to show around image (default: 5)
     """
@@ -85,13 +86,14 @@ def embed_image_in_svg(
     height = float(placeholder.get("height", 100))
 
     # Read and encode image
-    with open(image_path, "rb") as f:
-        img_data = base64.b64encode(f.read()).decode("ascii")
+    if isinstance(image, Path):
+        image = image.read_bytes()
+    img_data = base64.b64encode(image).decode("ascii")
 
     if preserve_aspect:
         from PIL import Image
 
-        img = Image.open(image_path)
+        img = Image.open(io.BytesIO(image))
         img_width, img_height = img.size
         img_aspect = img_width / img_height
         box_aspect = width / height
@@ -154,7 +156,7 @@ def embed_image_in_svg(
 
 
 def create_schema_from_template(
-    tree: ET.ElementTree, output_path: Path, id2plot_path: dict[str, Path]
+    tree: ET.ElementTree, output_path: Path, id2plot: dict[str, bytes | Path]
 ):
     """
     Generate final schema by inserting plots into SVG template.
@@ -162,13 +164,13 @@ def create_schema_from_template(
     Args:
         tree: Parsed SVG template tree
         output_path: Where to save final SVG
-        id2plot_path: Dict mapping placeholder_id -> plot image path
+        id2plot: Dict mapping placeholder_id -> plot image (PNG bytes or path)
     """
-    for placeholder_id, plot_path in id2plot_path.items():
-        if plot_path and plot_path.exists():
-            embed_image_in_svg(tree, placeholder_id, plot_path, preserve_aspect=True)
+    for placeholder_id, plot in id2plot.items():
+        if isinstance(plot, bytes) or (plot and plot.exists()):
+            embed_image_in_svg(tree, placeholder_id, plot, preserve_aspect=True)
         else:
-            log.warning(f"Plot not found for '{placeholder_id}': {plot_path}")
+            log.warning(f"Plot not found for '{placeholder_id}': {plot}")
 
     tree.write(output_path, encoding="utf-8", xml_declaration=True)
 
@@ -241,7 +243,7 @@ def draw_schema(metas: list[ResultMeta]):
     tree = ET.parse(template_path)
     root = tree.getroot()
 
-    id2plot_path = {}
+    id2plot = {}
 
     for elem in root.iter():
         placeholder_id = elem.get("id")
@@ -249,19 +251,19 @@ def draw_schema(metas: list[ResultMeta]):
             continue
 
         if placeholder_id == "joint_space_plot":
-            id2plot_path[placeholder_id] = joint_plot_path
+            id2plot[placeholder_id] = joint_plot_path
             continue
 
         plot_key = parse_plot_key_from_id(placeholder_id)
 
         if plot_key in p:
-            plot_path = p[plot_key][2]
-            id2plot_path[placeholder_id] = plot_path
+            # embedded straight from the rendered PNG, not re-read from disk
+            id2plot[placeholder_id] = p[plot_key].png
 
-    log.info(f"Mapped {len(id2plot_path)} plots to template placeholders")
+    log.info(f"Mapped {len(id2plot)} plots to template placeholders")
 
     output_svg = run_paths.figures_receiver / "whole_controller_schema.svg"
-    create_schema_from_template(tree, output_svg, id2plot_path)
+    create_schema_from_template(tree, output_svg, id2plot)
 
     log.info(f"Schema generation complete: {output_svg}")
 
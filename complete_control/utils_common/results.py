@@ -1,20 +1,16 @@
 import datetime
 import random
 import string
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Type, TypeVar
+from typing import Optional
 
 import numpy as np
-from config import paths
 from config.MasterParams import MasterParams
 from config.ResultMeta import ResultMeta
-from neural.CerebellumHandlerPopulations import CerebellumHandlerPopulationsRecordings
-from neural.CerebellumPopulations import CerebellumPopulationsRecordings
-from neural.ControllerPopulations import ControllerPopulationsRecordings
-from neural.neural_models import PopulationSpikes
-from neural.result_models import NeuralResultManifest
+from neural.neural_models import WEIGHT_CHECKPOINT_SUFFIX, PopulationSpikes
+from neural.result_models import POP_CACHE_SIZE, LazyNeuralResultManifest
 from plant.plant_models import EEData, JointData, PlantPlotData
-from pydantic import BaseModel
 from utils_common.custom_types import NdArray
 from utils_common.generate_signals import PlannerData
 
@@ -32,33 +28,41 @@ def make_trial_id(
     return f"{timestamp_str}_{suffix}-{label}"
 
 
-def read_weights(master_params: MasterParams) -> list[Path] | None:
+def read_parent_neural(
+    master_params: MasterParams,
+) -> LazyNeuralResultManifest | None:
     parent_id = master_params.parent_id
     if len(parent_id) == 0:
         return None
 
-    p = [i for i in paths.RUNS_DIR.glob(f"{parent_id}*") if i.is_dir()]
-    if len(p) != 1:
-        raise ValueError(f"found {len(p)} parent(s) for key='{parent_id}'")
-
-    rp = paths.RunPaths.from_run_id(p[0].name, create_if_not_present=False)
-    with open(rp.meta_result, "r") as f:
-        res = ResultMeta.model_validate_json(f.read())
-    with open(rp.params_json, "r") as f:
-        par = MasterParams.model_validate_json(f.read())
+    res = ResultMeta.from_id(parent_id)
+    par = res.load_params()
 
     if not par.USE_CEREBELLUM:
         raise ValueError(f"specified run unsuitable for param loading")
 
-    neural = res.load_neural()
+    return res.load_neural_lazy()
+
+
+def read_weights(master_params: MasterParams) -> list[Path] | None:
+    neural = read_parent_neural(master_params)
+    if neural is None or neural.weights is None:
+        return None
+
+    # checkpoints pruned after being stored in the chain's weight history
+    for path in neural.weights:
+        if not path.exists() and neural.weight_history is not None:
+            from neural.weight_history import WeightHistory
+
+            projection = path.name.removesuffix(WEIGHT_CHECKPOINT_SUFFIX)
+            WeightHistory(neural.weight_history).export_checkpoint(
+                projection, master_params.parent_id, path
+            )
     return neural.weights
 
 
 def gather_metas(id: str):
-    meta = ResultMeta.from_id(id)
-    if meta.parent is None or len(meta.parent) == 0:
-        return [meta]
-    return [meta, *gather_metas(meta.parent)]
+    return ResultMeta.chain_from_id(id)
 
 
 def extract_time_move_trajectories(ms: list[ResultMeta]):
@@ -155,6 +159,11 @@ def concatenate_population_spikes(
         [p.times + i * d for p, (i, d) in zip(valid_pops, enumerate(trial_duration_ms))]
     )
 
+    # precomputed counts are only usable if every trial has them
+    rates = None
+    if all(p is not None and p.rates for p in pops):
+        rates = [r for p in pops for r in p.rates]
+
     return PopulationSpikes(
         label=ref.label,
         gids=ref.gids,
@@ -162,94 +171,50 @@ def concatenate_population_spikes(
         times=all_times,
         population_size=ref.population_size,
         neuron_model=ref.neuron_model,
+        rates=rates,
     )
 
 
-T = TypeVar("T", bound=BaseModel)
-
-
-def concatenate_population_recordings(
-    recordings: list[Optional[T]],
-    recording_type: Type[T],
-    trial_durations_ms: list[float],
-) -> Optional[T]:
+class LazyNeuralResults:
     """
-    Generic function to concatenate population recordings.
-
-    Works for ControllerPopulationsRecordings, CerebellumPopulationsRecordings,
-    and CerebellumHandlerPopulationsRecordings.
-
-    Args:
-        recordings: List of recording objects (can contain None values)
-        recording_type: The class type to instantiate (e.g., ControllerPopulationsRecordings)
-
-    Returns:
-        Concatenated recording object, or None if all inputs are None
+    Concatenated populations of several results, shifted by the trial durations.
+    Each population is only read (from every result) and concatenated when
+    `get_pop` asks for it. The last `cache_size` populations are kept.
     """
-    valid_recordings = [r for r in recordings if r is not None]
-
-    if not valid_recordings:
-        return None
 
-    field_names = recording_type.model_fields.keys()
-    concatenated_data = {}
-    for field in field_names:
-        pops = [getattr(rec, field) for rec in valid_recordings]
-        concatenated_pop = concatenate_population_spikes(pops, trial_durations_ms)
-        concatenated_data[field] = (
-            concatenated_pop.model_dump() if concatenated_pop is not None else None
-        )
-
-    return recording_type(**concatenated_data)
-
-
-def concatenate_neural_results(
-    result_metas: list[ResultMeta],
-) -> NeuralResultManifest:
-    """
-    Concatenates NeuralResultManifest, shifting times by trial duration (different durations are ok).
-    Verifies consistent GIDs, label, neuron model, population size.
-    """
-    if not result_metas:
-        raise ValueError("Cannot concatenate empty list of ResultMeta")
-
-    neural_results = [meta.load_neural() for meta in result_metas]
-    trial_durations_ms = [
-        meta.load_params().simulation.duration_ms for meta in result_metas
-    ]
-
-    use_cerebellum_values = [nr.use_cerebellum for nr in neural_results]
-    if len(set(use_cerebellum_values)) > 1:
-        raise ValueError(
-            f"Inconsistent use_cerebellum values: {use_cerebellum_values}. "
-            "All results must have the same use_cerebellum setting."
+    def __init__(
+        self, result_metas: list[ResultMeta], cache_size: int = POP_CACHE_SIZE
+    ):
+        if not result_metas:
+            raise ValueError("Cannot concatenate empty list of ResultMeta")
+
+        # concatenated populations are cached here, not in every trial
+        self.neural_results = [meta.load_neural_lazy(0) for meta in result_metas]
+        self.trial_durations_ms = [
+            meta.load_params().simulation.duration_ms for meta in result_metas
+        ]
+
+        use_cerebellum_values = [nr.use_cerebellum for nr in self.neural_results]
+        if len(set(use_cerebellum_values)) > 1:
+            raise ValueError(
+                f"Inconsistent use_cerebellum values: {use_cerebellum_values}. "
+                "All results must have the same use_cerebellum setting."
+            )
+        self.use_cerebellum = use_cerebellum_values[0]
+
+        weights = [nr.weights for nr in self.neural_results if nr.weights is not None]
+        self.weights = weights if weights else None
+        self.get_pop = lru_cache(maxsize=cache_size)(self._get_pop)
+
+    def has_pop(self, pop_name: str | None) -> bool:
+        """Whether any result recorded `pop_name`, without decoding it."""
+        return any(nr.has_pop(pop_name) for nr in self.neural_results)
+
+    def _get_pop(self, pop_name: str | None) -> PopulationSpikes | None:
+        if not pop_name:
+            return None
+        # only the population being concatenated is decoded, one trial at a time
+        return concatenate_population_spikes(
+            [nr.get_pop(pop_name) for nr in self.neural_results],
+            self.trial_durations_ms,
         )
-
-    controller = concatenate_population_recordings(
-        [nr.controller for nr in neural_results],
-        ControllerPopulationsRecordings,
-        trial_durations_ms,
-    )
-
-    cerebellum = concatenate_population_recordings(
-        [nr.cerebellum for nr in neural_results],
-        CerebellumPopulationsRecordings,
-        trial_durations_ms,
-    )
-
-    cerebellum_handler = concatenate_population_recordings(
-        [nr.cerebellum_handler for nr in neural_results],
-        CerebellumHandlerPopulationsRecordings,
-        trial_durations_ms,
-    )
-
-    weights = [nr.weights for nr in neural_results if nr.weights is not None]
-    weights_result = weights if weights else None
-
-    return NeuralResultManifest.model_construct(
-        controller=controller,
-        cerebellum=cerebellum,
-        cerebellum_handler=cerebellum_handler,
-        weights=weights_result,  # list[list[Path]] or None
-        use_cerebellum=neural_results[0].use_cerebellum,
-    )
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from enum import Enum
 
 import numpy as np
@@ -97,3 +98,79 @@ def get_current_section(curr_time_ms: float, mp: MasterParams):
         return TrialSection.TIME_END_TRIAL
     else:
         return TrialSection.TIME_POST
+
+
+# sections in which the controller network is not simulated: the plant runs
+# open loop and ignores the neural output
+OPEN_LOOP_SECTIONS = (
+    TrialSection.TIME_GRASP,
+    TrialSection.TIME_POST,
+    TrialSection.TIME_END_TRIAL,
+)
+
+
+def neural_step_time_ms(step: int, resolution_ms: float) -> float:
+    """Start time of `step` as seen by the neural side (NRP clock, integer ns)."""
+    return round(step * resolution_ms * 1e6) * 1e-9 * 1000
+
+
+def first_open_loop_step(mp: MasterParams) -> int:
+    """First step whose section is in OPEN_LOOP_SECTIONS (sim_steps if none)."""
+    for step in range(mp.simulation.sim_steps):
+        t_ms = neural_step_time_ms(step, mp.simulation.resolution)
+        if get_current_section(t_ms, mp) in OPEN_LOOP_SECTIONS:
+            return step
+    return mp.simulation.sim_steps
+
+
+def cosim_iterations(mp: MasterParams) -> int:
+    """
+    Co-simulation windows that have to be exchanged per trial. Once the plant
+    has consumed the neural commands of an open-loop step, all later commands
+    are the same and the plant fast-forwards to the end of the trial.
+    """
+    window = mp.simulation.cosim_window_steps
+    open_loop_step = first_open_loop_step(mp)
+    # first window whose predecessor ends in the open-loop phase
+    fast_forward_window = -(-(open_loop_step + 1) // window)
+    return min(fast_forward_window + 1, mp.simulation.cosim_windows)
+
+
+@dataclass(frozen=True)
+class TrialChain:
+    """
+    Trials run back to back on a single NEST network, without ResetKernel in
+    between. NEST only advances through the closed-loop steps of a trial, so
+    trial `i` starts at NEST step `i * trial_steps`. Models that index their
+    inputs by absolute step (`simulation_steps` buffers) are sized for the whole
+    chain and get the per-trial signals tiled with `tile`.
+    """
+
+    n_trials: int
+    trial_steps: int
+    sim_steps: int
+    resolution: float
+
+    @classmethod
+    def from_params(cls, mp: MasterParams, n_trials: int = 1) -> "TrialChain":
+        sim = mp.simulation
+        trial_steps = first_open_loop_step(mp) if n_trials > 1 else sim.sim_steps
+        return cls(n_trials, trial_steps, sim.sim_steps, sim.resolution)
+
+    @property
+    def network_steps(self) -> int:
+        """Steps the network can be run for: all trials but the last are cut at `trial_steps`."""
+        return (self.n_trials - 1) * self.trial_steps + self.sim_steps
+
+    def offset_ms(self, trial: int) -> float:
+        """NEST time at which `trial` (0-based) starts."""
+        return trial * self.trial_steps * self.resolution
+
+    def tile(self, signal):
+        """Repeats a per-trial signal (first axis: steps) for every trial of the chain."""
+        if self.n_trials == 1:
+            return signal
+        signal = np.asarray(signal)
+        return np.concatenate(
+            [signal[: self.trial_steps]] * (self.n_trials - 1) + [signal]
+        )
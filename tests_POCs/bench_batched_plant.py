@@ -0,0 +1,113 @@
+"""
+Benchmark of the per-arm cost of BatchedPlantSimulator against one
+PlantSimulator per trial, for batches of growing size, on a full trial with a
+PD controller in place of the network.
+
+The same trial is batched N times; the PyBullet backend is only measured if
+pybullet is installed. Needs the environment of a simulation (RUNS_PATH,
+BSB_NETWORK_FILE, ...) to build the config.
+
+usage: python bench_batched_plant.py [--arms 1 4 16 64 256] [--steps 1000]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from timeit import default_timer as timer
+
+sys.path.append(str(Path(__file__).parents[1] / "complete_control"))
+
+import numpy as np
+from config.core_models import PlantBackend
+from config.MasterParams import MasterParams
+from config.module_params import (
+    ModuleContainerConfig,
+    PlannerModuleConfig,
+    TrajGeneratorType,
+)
+from config.paths import RunPaths
+from config.plant_config import PlantConfig
+from plant.batched_plant import BatchedPlantSimulator
+from plant.plant_simulator import PlantSimulator
+
+
+def make_config(backend: PlantBackend) -> PlantConfig:
+    run_paths = RunPaths.from_run_id(f"bench_batched_plant_{backend.value}")
+    master = MasterParams.from_runpaths(
+        run_paths,
+        parent_id="",
+        PLANT_BACKEND=backend,
+        modules=ModuleContainerConfig(
+            planner=PlannerModuleConfig(trajgen_type=TrajGeneratorType.MOCKED)
+        ),
+    )
+    return PlantConfig(master)
+
+
+def pd_rates(pos, vel, config: PlantConfig):
+    torque = 2.0 * (config.target_joint_pos_rad - pos) - 0.1 * vel
+    rate = torque * config.SCALE_TORQUE
+    return np.maximum(rate, 0.0), np.maximum(-rate, 0.0)
+
+
+def run_single(config: PlantConfig, n_steps: int) -> float:
+    simulator = PlantSimulator(config)
+    pos, vel, sim_time_s = config.initial_joint_pos_rad, 0.0, 0.0
+    start = timer()
+    for step in range(n_steps):
+        rate_pos, rate_neg = pd_rates(pos, vel, config)
+        pos, vel, _, _, _ = simulator.run_simulation_step(
+            float(rate_pos), float(rate_neg), sim_time_s, step
+        )
+        sim_time_s += config.RESOLUTION_S
+    elapsed = timer() - start
+    simulator.plant.disconnect()
+    return elapsed / n_steps * 1e6
+
+
+def run_batched(config: PlantConfig, n_arms: int, n_steps: int) -> float:
+    simulator = BatchedPlantSimulator([config] * n_arms)
+    pos = np.full(n_arms, config.initial_joint_pos_rad)
+    vel = np.zeros(n_arms)
+    sim_time_s = 0.0
+    start = timer()
+    for step in range(n_steps):
+        rates_pos, rates_neg = pd_rates(pos, vel, config)
+        pos, vel, _, _, _ = simulator.run_simulation_step(
+            rates_pos, rates_neg, sim_time_s, step
+        )
+        sim_time_s += config.RESOLUTION_S
+    elapsed = timer() - start
+    simulator.plant.disconnect()
+    return elapsed / n_steps / n_arms * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--arms", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--steps", type=int, default=1000)
+    args = parser.parse_args()
+
+    backends = [PlantBackend.NUMPY]
+    try:
+        import pybullet  # noqa: F401
+
+        backends.append(PlantBackend.PYBULLET)
+    except ImportError:
+        print("pybullet not installed: NumPy backend only")
+
+    for backend in backends:
+        config = make_config(backend)
+        n_steps = min(args.steps, len(config.time_vector_total_s))
+        single = run_single(config, n_steps)
+        print(f"{backend.value}: one PlantSimulator {single:.1f} us/step")
+        for n_arms in args.arms:
+            per_arm = run_batched(config, n_arms, n_steps)
+            print(
+                f"{backend.value}: {n_arms} arms {per_arm:.1f} us/step per arm "
+                f"({single / per_arm:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark for merging NEST ascii spike files, as done by PopView.collect.
+
+Writes a synthetic recording directory (one file per virtual process, with a
+small share of duplicated events) and compares the line-by-line merge that
+PopView.collect used to do against merge_spike_files.
+
+usage: python bench_collapse_spikes.py [--n-spikes 10000000] [--skip-legacy]
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parents[1] / "complete_control"))
+
+from neural.population_view import merge_spike_files
+
+HEADER = (
+    "# NEST version: 3.8\n"
+    "# RecordingBackendASCII version: 2\n"
+    "# Recorder label: bench_pop\n"
+    "sender\ttime_ms\n"
+)
+
+
+def write_synthetic_dir(
+    dir: Path,
+    n_spikes: int,
+    n_files: int,
+    n_neurons: int,
+    duration_ms: float,
+    dup_fraction: float,
+    seed: int = 0,
+) -> list[Path]:
+    rng = np.random.default_rng(seed)
+    senders = rng.integers(1, n_neurons + 1, size=n_spikes)
+    times = np.round(rng.uniform(0, duration_ms, size=n_spikes), 3)
+    n_dup = int(n_spikes * dup_fraction)
+    files = []
+    for i, idx in enumerate(np.array_split(np.arange(n_spikes), n_files)):
+        # re-write some events of the previous chunk to exercise deduplication
+        idx = np.concatenate([idx, idx[: n_dup // n_files] - 1]).clip(0)
+        path = dir / f"bench_pop-{n_neurons + 1}-{i}.dat"
+        with open(path, "w") as f:
+            f.write(HEADER)
+            np.savetxt(
+                f,
+                np.column_stack([senders[idx], times[idx]]),
+                fmt=["%d", "%.3f"],
+                delimiter="\t",
+            )
+        files.append(path)
+    return files
+
+
+def legacy_merge(files: list[Path]) -> tuple[np.ndarray, np.ndarray]:
+    """The merge PopView.collect used before merge_spike_files."""
+    senders = []
+    times = []
+    combined_data = []
+    for f in files:
+        with open(f, "r") as fd:
+            lines = fd.readlines()
+            for line in lines:
+                if line.startswith("#") or line.startswith("sender"):
+                    continue
+                combined_data.append(line.strip())
+    unique_lines = list(set(combined_data))
+    for line in unique_lines:
+        sender, time = line.split()
+        senders.append(int(sender))
+        times.append(float(time))
+    return np.array(senders), np.array(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-spikes", type=int, default=10_000_000)
+    parser.add_argument("--n-files", type=int, default=8)
+    parser.add_argument("--n-neurons", type=int, default=28_000)
+    parser.add_argument("--duration-ms", type=float, default=1500.0)
+    parser.add_argument("--dup-fraction", type=float, default=0.01)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = timer()
+        files = write_synthetic_dir(
+            Path(tmp),
+            args.n_spikes,
+            args.n_files,
+            args.n_neurons,
+            args.duration_ms,
+            args.dup_fraction,
+        )
+        size = sum(f.stat().st_size for f in files)
+        print(
+            f"wrote {args.n_spikes} spikes in {len(files)} files "
+            f"({size / 2**20:.1f} MiB) in {timer() - start:.1f} s"
+        )
+
+        start = timer()
+        senders, times = merge_spike_files(files)
+        t_new = timer() - start
+        print(f"merge_spike_files: {t_new:.2f} s, {len(senders)} unique spikes")
+
+        if args.skip_legacy:
+            return
+
+        start = timer()
+        senders_old, times_old = legacy_merge(files)
+        t_old = timer() - start
+        print(
+            f"legacy merge:            {t_old:.2f} s, {len(senders_old)} unique spikes"
+        )
+        print(f"speedup: {t_old / t_new:.1f}x")
+
+        order = np.lexsort((senders_old, times_old))
+        same = np.array_equal(senders_old[order], senders) and np.array_equal(
+            times_old[order], times
+        )
+        print(f"identical events: {same}")
+
+
+if __name__ == "__main__":
+    main()
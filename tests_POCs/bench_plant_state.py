@@ -0,0 +1,94 @@
+"""
+Benchmark for the per-step plant overhead of PlantSimulator.run_simulation_step:
+reading the joint and end-effector state and recording it.
+
+Compares the path run_simulation_step used to take (three getJointState calls
+into JointStates, getLinkState into lists, JointData/EEData.record_step per
+joint) against one read_plant_state recorded as a PlantRecorder row, on the arm
+URDF in a DIRECT client, with and without stepping the simulation.
+
+usage: python bench_plant_state.py [--steps 20000]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from timeit import default_timer as timer
+
+sys.path.append(str(Path(__file__).parents[1] / "complete_control"))
+
+import pybullet as p
+from config.paths import EMBODIMENT_ASSETS
+from plant.plant_models import (
+    EEData,
+    JointData,
+    JointState,
+    JointStates,
+    PlantRecorder,
+)
+from plant.robotic_plant import PLANT_JOINT_IDS, load_robot, read_plant_state
+
+HAND_LINK_ID = PLANT_JOINT_IDS[2]
+
+
+def legacy_step(client, robot, joint_data, ee_data, step):
+    s, e, h = (
+        p.getJointState(robot, j, physicsClientId=client) for j in PLANT_JOINT_IDS
+    )
+    states = JointStates(
+        shoulder=JointState(s[0], s[1]),
+        elbow=JointState(e[0], e[1]),
+        hand=JointState(h[0], h[1]),
+    )
+    ee_state = p.getLinkState(
+        robot, HAND_LINK_ID, computeLinkVelocity=True, physicsClientId=client
+    )
+    ee_pos, ee_vel = list(ee_state[0]), list(ee_state[6])
+    for i, state in enumerate(states):
+        joint_data[i].record_step(step, state.pos, state.vel, 0.0)
+    ee_data.record_step(step, ee_pos, ee_vel)
+
+
+def batched_step(client, robot, recorder, step):
+    state = read_plant_state(p, client, robot)
+    recorder.record(step, state, (0.0, 0.0, 0.0))
+
+
+def run(n_steps: int, simulate: bool, batched: bool) -> float:
+    client = p.connect(p.DIRECT)
+    p.setAdditionalSearchPath(str(EMBODIMENT_ASSETS), physicsClientId=client)
+    robot = load_robot(p, client)
+    recorder = PlantRecorder(n_steps)
+    joint_data = [JointData.empty(n_steps) for _ in PLANT_JOINT_IDS]
+    ee_data = EEData.empty(n_steps)
+
+    start = timer()
+    for step in range(n_steps):
+        if batched:
+            batched_step(client, robot, recorder, step)
+        else:
+            legacy_step(client, robot, joint_data, ee_data, step)
+        if simulate:
+            p.stepSimulation(physicsClientId=client)
+    elapsed = timer() - start
+    p.disconnect(physicsClientId=client)
+    return elapsed / n_steps * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for simulate in (False, True):
+        legacy = run(args.steps, simulate, batched=False)
+        batched = run(args.steps, simulate, batched=True)
+        what = "state + record + stepSimulation" if simulate else "state + record"
+        print(
+            f"{what}: legacy {legacy:.1f} us/step, batched {batched:.1f} us/step "
+            f"({legacy / batched:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
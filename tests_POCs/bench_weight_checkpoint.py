@@ -0,0 +1,131 @@
+"""
+Benchmark for writing and reading plastic-weight checkpoints.
+
+Compares the pretty-printed SynapseBlock JSON that save_conn_weights used to
+write against the binary weight checkpoint (save_weight_checkpoint /
+iter_weight_shards) on a synthetic PF->PC-like projection: file size, write
+time and time to read back the weights of the synapses of a subset of targets
+(what each rank does on restore).
+
+usage: python bench_weight_checkpoint.py [--n-synapses 1000000] [--skip-legacy]
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parents[1] / "complete_control"))
+
+from neural.neural_models import (
+    SYNAPSE_WEIGHT_DTYPE,
+    Synapse,
+    SynapseBlock,
+    SynapseRecording,
+    SynapseWeights,
+    iter_weight_shards,
+    save_weight_checkpoint,
+)
+
+MODELS = ["stdp_synapse_alpha", "stdp_synapse_sinexp"]
+
+
+def synthetic_weights(n_synapses: int, n_targets: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    synapses = np.zeros(n_synapses, dtype=SYNAPSE_WEIGHT_DTYPE)
+    synapses["source"] = rng.integers(1, 200_000, n_synapses)
+    synapses["target"] = 200_000 + rng.integers(0, n_targets, n_synapses)
+    synapses["synapse_id"] = 40
+    synapses["delay"] = 1.0
+    synapses["model_id"] = rng.integers(0, len(MODELS), n_synapses)
+    synapses["port"] = np.arange(n_synapses) % 5000
+    synapses["weight"] = rng.random(n_synapses)
+    return SynapseWeights("grc", "pc", synapses, MODELS)
+
+
+def to_block(weights: SynapseWeights) -> SynapseBlock:
+    s = weights.synapses
+    return SynapseBlock(
+        source_pop_label=weights.source_pop_label,
+        target_pop_label=weights.target_pop_label,
+        synapse_recordings=[
+            SynapseRecording(
+                syn=Synapse(
+                    source=src,
+                    target=tgt,
+                    syn_id=sid,
+                    synapse_model=MODELS[mid],
+                    delay=d,
+                    port=port,
+                ),
+                weight=w,
+            )
+            for src, tgt, sid, d, mid, port, w in s.tolist()
+        ],
+    )
+
+
+def read_targets(path: Path, targets: np.ndarray) -> int:
+    n = 0
+    for synapses, _ in iter_weight_shards(path):
+        n += int(np.isin(synapses["target"], targets).sum())
+    return n
+
+
+def size_of(path: Path) -> int:
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.iterdir())
+    return path.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-synapses", type=int, default=1_000_000)
+    parser.add_argument("--n-targets", type=int, default=200)
+    parser.add_argument("--read-fraction", type=float, default=0.25)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    weights = synthetic_weights(args.n_synapses, args.n_targets)
+    targets = 200_000 + np.arange(int(args.n_targets * args.read_fraction))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ckpt = Path(tmp) / "grc>pc.weights"
+        start = timer()
+        save_weight_checkpoint(ckpt, weights)
+        t_write = timer() - start
+        start = timer()
+        n_read = read_targets(ckpt, targets)
+        t_read = timer() - start
+        print(
+            f"checkpoint: {size_of(ckpt) / 2**20:.1f} MiB, write {t_write:.2f} s, "
+            f"read {t_read:.2f} s ({n_read} synapses)"
+        )
+
+        if args.skip_legacy:
+            return
+
+        block = to_block(weights)
+        legacy = Path(tmp) / "grc>pc.json"
+        start = timer()
+        with open(legacy, "w") as f:
+            f.write(block.model_dump_json(indent=2))
+        t_write_old = timer() - start
+        start = timer()
+        n_read_old = read_targets(legacy, targets)
+        t_read_old = timer() - start
+        print(
+            f"JSON block: {size_of(legacy) / 2**20:.1f} MiB, write {t_write_old:.2f} s, "
+            f"read {t_read_old:.2f} s ({n_read_old} synapses)"
+        )
+        print(
+            f"size: {size_of(legacy) / size_of(ckpt):.1f}x smaller, "
+            f"write: {t_write_old / t_write:.1f}x, read: {t_read_old / t_read:.1f}x faster"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark for snapshotting plastic synaptic weights, as done by
+Controller.record_synaptic_weights at the end of a trial.
+
+Builds a plastic all-to-all projection in NEST and compares the per-connection
+GetStatus + pydantic path that record_synaptic_weights used to take against
+the bulk SynapseWeights.from_connections snapshot, in time and peak (Python
+heap) memory.
+
+usage: python bench_weight_snapshot.py [--n-pre 2000] [--n-post 500] [--skip-legacy]
+"""
+
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parents[1] / "complete_control"))
+
+import nest
+from neural.neural_models import (
+    Synapse,
+    SynapseBlock,
+    SynapseRecording,
+    SynapseWeights,
+)
+
+SYNAPSE_MODEL = "stdp_synapse"
+
+
+def build_projection(n_pre: int, n_post: int, seed: int = 0):
+    nest.ResetKernel()
+    nest.set_verbosity("M_ERROR")
+    nest.rng_seed = seed + 1
+    pre = nest.Create("parrot_neuron", n_pre)
+    post = nest.Create("iaf_psc_alpha", n_post)
+    nest.Connect(
+        pre,
+        post,
+        "all_to_all",
+        {
+            "synapse_model": SYNAPSE_MODEL,
+            "weight": nest.random.uniform(0.0, 1.0),
+        },
+    )
+    return pre, post
+
+
+def legacy_snapshot(pre, post) -> SynapseBlock:
+    """The snapshot record_synaptic_weights took before SynapseWeights."""
+    conns = []
+    conns.extend(
+        nest.GetConnections(source=pre, target=post, synapse_model=SYNAPSE_MODEL) or []
+    )
+    recs = []
+    for conn in conns:
+        st = nest.GetStatus(
+            conn,
+            [
+                "source",
+                "target",
+                "synapse_id",
+                "delay",
+                "synapse_model",
+                "weight",
+                "port",
+            ],
+        )
+        (
+            source_neur,
+            target_neur,
+            synapse_id,
+            delay,
+            synapse_model,
+            weight,
+            port,
+        ) = st[0]
+        recs.append(
+            SynapseRecording(
+                syn=Synapse(
+                    source=source_neur,
+                    target=target_neur,
+                    syn_id=synapse_id,
+                    synapse_model=synapse_model,
+                    delay=delay,
+                    port=port,
+                ),
+                weight=weight,
+            )
+        )
+    return SynapseBlock(
+        source_pop_label="pre", target_pop_label="post", synapse_recordings=recs
+    )
+
+
+def bulk_snapshot(pre, post) -> SynapseWeights:
+    conns = [nest.GetConnections(source=pre, target=post, synapse_model=SYNAPSE_MODEL)]
+    return SynapseWeights.from_connections("pre", "post", conns)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = timer()
+    res = fn(*args)
+    elapsed = timer() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-pre", type=int, default=2000)
+    parser.add_argument("--n-post", type=int, default=500)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    start = timer()
+    pre, post = build_projection(args.n_pre, args.n_post)
+    print(
+        f"built {args.n_pre * args.n_post} {SYNAPSE_MODEL} synapses "
+        f"in {timer() - start:.1f} s"
+    )
+
+    snap, t_new, m_new = measure(bulk_snapshot, pre, post)
+    print(
+        f"bulk snapshot:   {t_new:.2f} s, peak {m_new / 2**20:.1f} MiB, "
+        f"{len(snap)} synapses"
+    )
+
+    if args.skip_legacy:
+        return
+
+    block, t_old, m_old = measure(legacy_snapshot, pre, post)
+    print(
+        f"legacy snapshot: {t_old:.2f} s, peak {m_old / 2**20:.1f} MiB, "
+        f"{len(block.synapse_recordings)} synapses"
+    )
+    print(f"speedup: {t_old / t_new:.1f}x, memory: {m_old / m_new:.1f}x less")
+
+    old, _ = block.to_weight_array()
+    same = all(
+        np.array_equal(old[k], snap.synapses[k])
+        for k in ("source", "target", "synapse_id", "port", "weight")
+    )
+    print(f"identical snapshots: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,16 @@
-import json
 from pathlib import Path
 
-from complete_control.neural.neural_models import PopulationSpikes
+from complete_control.neural.result_models import LazyNeuralResultManifest
 
 
-def load_and_display_population_data(filepath: Path):
+def load_and_display_population_data(filepath: Path, pop_name: str = "planner_p"):
     """
-    Loads a PopulationSpikes JSON file and prints its contents.
+    Loads a single population out of a neural_data.json manifest and prints its contents.
     """
     if not filepath.exists():
         print(f"Error: File not found at {filepath}")
         print(
-            "Please ensure you have a generated population result file (e.g., planner_p.json) in a 'data' directory."
+            "Please ensure you have a generated neural result manifest (neural_data.json) in a run directory."
         )
         print(
             "You can generate one by running a simulation that uses the updated data_handling.py."
@@ -19,10 +18,10 @@ def load_and_display_population_data(filepath: Path):
         return
 
     try:
-        with open(filepath, "r") as f:
-            data = json.load(f)
+        # only `pop_name` is decoded
+        manifest = LazyNeuralResultManifest(filepath)
 
-        pop_spikes = PopulationSpikes.model_validate(data)
+        pop_spikes = manifest.get_pop(pop_name)
 
         print(f"--- Population Data for: {pop_spikes.label} ---")
         print(f"Population Size: {pop_spikes.population_size}")
@@ -43,7 +42,7 @@ def load_and_display_population_data(filepath: Path):
 
 
 if __name__ == "__main__":
-    sample_file_path = Path("../runs/20250703_163058/data/neural/planner_p.json")
+    sample_file_path = Path("../runs/20250703_163058/neural_data.json")
 
     print(f"Attempting to load data from: {sample_file_path}")
     load_and_display_population_data(sample_file_path)
@@ -1,4 +1,4 @@
-from complete_control.neural.neural_models import PopulationSpikes
+from complete_control.neural.neural_models import PopulationSpikes, SpikeIndex
 from complete_control.config import paths
 from complete_control.neural.nest_adapter import nest, initialize_nest
 import numpy as np
@@ -428,9 +428,9 @@ def set_cereb_error(N, N_trials, t_trial, sn_p, sn_n, dcn_p, dcn_n, state_p, sta
 
 
 def connect_generators_from_file(sn, sn_data, N200=None):
-    senders = sn_data.senders
     times = sn_data.times
     gids = sn_data.gids
+    index = sn_data.index()
     spike_gen = []
 
     if N200 is not None:
@@ -439,8 +439,7 @@ def connect_generators_from_file(sn, sn_data, N200=None):
         use_gids = gids
 
     for gid in use_gids:
-        neuron_spike_times = times[senders == gid]
-        neuron_spike_times = np.unique(np.sort(neuron_spike_times))
+        neuron_spike_times = np.unique(times[index.neuron_events_by_gid(gid)])
         sg = nest.Create(
             "spike_generator", 1, params={"spike_times": neuron_spike_times}
         )
@@ -506,12 +505,15 @@ def generate_param_plot(data, pop_name, param_name, plots_path, plot_one_n=True)
     times = np.array(data["times"])
     param = np.array(data[param_name])
 
+    gids = np.unique(senders)
+    index = SpikeIndex(gids, senders, times)
+
     fig = plt.figure(figsize=(10, 6))
 
     # take one neuron (id=sender)
     if plot_one_n:
-        gid = np.unique(senders)[0]
-        mask = senders == gid
+        gid = gids[0]
+        mask = index.neuron_events(0)
         plt.plot(times[mask], param[mask])
         plt.title(f"{pop_name} - {param_name} - neuron {gid}")
         # if param_name == "CV_fbk" or param_name == "CV_pred":
@@ -519,8 +521,8 @@ def generate_param_plot(data, pop_name, param_name, plots_path, plot_one_n=True)
 
     # plot all neurons
     else:
-        for gid in np.unique(senders):
-            mask = senders == gid
+        for i, gid in enumerate(gids):
+            mask = index.neuron_events(i)
             plt.plot(
                 times[mask], param[mask], color=(0, 0, 0, 0.05), label=f"Neuron {gid}"
             )